@@ -1,7 +1,10 @@
 import os
 import boto3
 import json
+import base64
+import binascii
 from fastapi import FastAPI, HTTPException, Request
+from starlette.formparsers import MultiPartParser
 from datetime import datetime,timezone
 import logging
 
@@ -31,23 +34,73 @@ def load_secrets():
     for key, value in secrets.items():
         os.environ[key] = str(value)
 
-load_secrets()
+# Replay runs offline from recorded responses and needs no secrets.
+if os.getenv("REPLAY_MODE", "off").strip().lower() != "replay":
+    load_secrets()
 
 from src.orchestration.orchestrator import Orchestrator
+from src.tools.search_tools.listing_search import start_listing_watcher
+from src.tools.image_uploads import UPLOAD_MAX_BYTES, UPLOAD_MAX_IMAGES, UPLOAD_SPOOL_BYTES, UploadError, upload_store
+
+# Keep multipart image parts in memory up to the same size as uploads held by the store.
+MultiPartParser.spool_max_size = UPLOAD_SPOOL_BYTES
 
 app = FastAPI(title="DH-Agent Server", version="1.0.0")
 agent = Orchestrator()
+start_listing_watcher()
+
+def decode_base64_image(image, index: int) -> tuple[bytes, str]:
+    """Accepts {"data": <base64 or data URL>, "filename": ...} or a bare base64 / data URL string."""
+    if isinstance(image, str):
+        image = {"data": image}
+    data = str(image.get("data", ""))
+    filename = image.get("filename") or f"image_{index}"
+    if data.startswith("data:"):
+        data = data.split(",", 1)[-1]
+    if len(data) * 3 // 4 > UPLOAD_MAX_BYTES + 3:
+        raise UploadError(f"Uploaded image '{filename}' exceeds the limit of {UPLOAD_MAX_BYTES} bytes.", 413)
+    try:
+        return base64.b64decode(data, validate=True), filename
+    except (binascii.Error, ValueError):
+        raise UploadError(f"Uploaded image '{filename}' is not valid base64.")
+
+async def read_invocation(request: Request) -> tuple[str, list[tuple[bytes, str]]]:
+    """
+    Read the prompt and any uploaded images from either request shape:
+        application/json: {"input": {"prompt": ..., "images": [{"filename": ..., "data": <base64>}]}}
+        multipart/form-data: a 'prompt' field and one or more 'images' file parts.
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        async with request.form(max_files=UPLOAD_MAX_IMAGES) as form:
+            images = []
+            for part in form.getlist("images"):
+                if isinstance(part, str):
+                    continue
+                if part.size is not None and part.size > UPLOAD_MAX_BYTES:
+                    raise UploadError(f"Uploaded image '{part.filename}' exceeds the limit of {UPLOAD_MAX_BYTES} bytes.", 413)
+                images.append((await part.read(), part.filename or f"image_{len(images)}"))
+            return str(form.get("prompt") or ""), images
+
+    body = await request.json()
+    payload = body.get("input", {})
+    images = payload.get("images") or []
+    if len(images) > UPLOAD_MAX_IMAGES:
+        raise UploadError(f"At most {UPLOAD_MAX_IMAGES} images can be uploaded per request.", 413)
+    return payload.get("prompt"), [decode_base64_image(image, i) for i, image in enumerate(images)]
 
 @app.post("/invocations")
 async def invoke_agent(request: Request):
     try:
-        body = await request.json()
-        user_message = body.get("input", {}).get("prompt")
+        user_message, images = await read_invocation(request)
 
         if not user_message:
             raise HTTPException(status_code=400, detail="No prompt found")
 
-        result = agent.ask(user_message)
+        with upload_store.request_scope(images) as uploads:
+            if uploads:
+                handles = "\n".join(f"{u.handle} ({u.filename})" for u in uploads)
+                user_message = f"{user_message}\n\nUploaded images:\n{handles}"
+            result = agent.ask(user_message)
         return {
             "output": {
                 "message": result,
@@ -56,6 +109,10 @@ async def invoke_agent(request: Request):
             }
         }
 
+    except HTTPException:
+        raise
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent processing failed: {str(e)}")
 
@@ -0,0 +1,119 @@
+"""
+Microbenchmark the per-call overhead of creating boto3 clients versus the shared registry.
+
+Measures two things for each service the tools use (s3, bedrock-runtime, s3vectors):
+    construction: boto3.client(...) per call (before) vs get_client(...) (after)
+    per-call:     an S3 head_bucket with a new client per call (before) vs one shared, tuned
+                  client (after), which also reuses its warm connection pool
+The per-call benchmark runs against a local stand-in S3 endpoint by default so it needs no
+network or credentials; pass --live to run it against the real aw04-data bucket instead.
+
+Usage:
+    uv run python scripts/benchmark_boto3_clients.py \
+        [--iterations 50] [--live]
+"""
+
+import argparse
+import http.server
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import boto3
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.aws_clients import client_config, get_client
+
+REGION = os.getenv("AWS_REGION", "us-east-1")
+BUCKET_NAME = "aw04-data"
+SERVICES = ["s3", "bedrock-runtime", "s3vectors"]
+
+
+class StandInS3(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def summarize(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 3),
+    }
+
+
+def time_calls(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--live", action="store_true", help="Run the per-call benchmark against the real S3 bucket")
+    args = parser.parse_args()
+
+    results = {"iterations": args.iterations, "region": REGION, "construction": {}, "per_call": {}}
+    print(f"{'='*60}")
+    print(f"{'construction':<24}{'before (mean)':>18}{'after (mean)':>18}")
+    print(f"{'='*60}")
+    for service in SERVICES:
+        before = summarize(time_calls(lambda: boto3.client(service, region_name=REGION), args.iterations))
+        after = summarize(time_calls(lambda: get_client(service, REGION), args.iterations))
+        results["construction"][service] = {"before": before, "after": after}
+        print(f"{service:<24}{before['mean_ms']:>16.3f}ms{after['mean_ms']:>16.3f}ms")
+
+    server = None
+    kwargs = {}
+    if not args.live:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInS3)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        kwargs = {"endpoint_url": f"http://127.0.0.1:{server.server_port}",
+                  "aws_access_key_id": "benchmark", "aws_secret_access_key": "benchmark"}
+
+    def new_client_call():
+        boto3.client("s3", region_name=REGION, **kwargs).head_bucket(Bucket=BUCKET_NAME)
+
+    shared = (boto3.session.Session().client("s3", region_name=REGION, config=client_config("s3"), **kwargs)
+              if not args.live else get_client("s3", REGION))
+
+    def shared_client_call():
+        shared.head_bucket(Bucket=BUCKET_NAME)
+
+    shared_client_call()
+    before = summarize(time_calls(new_client_call, args.iterations))
+    after = summarize(time_calls(shared_client_call, args.iterations))
+    results["per_call"] = {"target": "live" if args.live else "stand-in", "before": before, "after": after}
+    print(f"\n{'per-call head_bucket':<24}{before['mean_ms']:>16.3f}ms{after['mean_ms']:>16.3f}ms")
+    print(f"{'':<24}{'p95 ' + str(before['p95_ms']) + 'ms':>18}{'p95 ' + str(after['p95_ms']) + 'ms':>18}")
+    if server:
+        server.shutdown()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = Path("evaluation/results") / "boto3_clients"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / f"{timestamp}.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {(out_dir / f'{timestamp}.json').absolute()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark the two multi-candidate comparison modes used by get_image_comparisons.
+
+For each query image, retrieves the top-k runway candidates from the vector index and
+compares them with the query once per mode:
+    batched:    one Nova Pro request with the query and all candidates
+    concurrent: one pairwise Nova Pro request per candidate, run in parallel
+The vision cache is disabled so every run reaches the model. Records latency per mode and
+how often the two modes assign the same relation category to a candidate.
+
+Usage:
+    uv run python scripts/benchmark_image_comparison.py \
+        --images path/to/query1.jpg path/to/query2.png \
+        [--top-k 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ["VISION_CACHE_PATH"] = ""
+
+from src.tools.archive_tools.image_input import (
+    compare_batched,
+    compare_concurrent,
+    parse_relations,
+    search_vectors,
+)
+from src.tools.image_uploads import read_image_source
+from src.tools.embeddings import get_image_embedding
+from src.tools.image_preprocessing import tier_for
+
+MODES = {"batched": compare_batched, "concurrent": compare_concurrent}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", nargs="+", required=True)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    tier = tier_for("get_image_comparison")
+    rows = []
+    for image_path in args.images:
+        query_bytes, query_format = read_image_source(image_path)
+        embedding = get_image_embedding(query_bytes, query_format, tier_for("image_retrieve"))
+        candidates = [r["key"] for r in search_vectors(embedding, top_k=args.top_k)]
+        if not candidates:
+            print(f"{image_path}: no candidates, skipping")
+            continue
+
+        row = {"image": image_path, "candidates": candidates}
+        for mode, compare in MODES.items():
+            start = time.perf_counter()
+            try:
+                text = compare(query_bytes, query_format, candidates, tier)
+            except Exception as e:
+                print(f"{image_path} [{mode}] FAILED: {e}")
+                text = ""
+            row[f"{mode}_latency_s"] = round(time.perf_counter() - start, 3)
+            row[f"{mode}_relations"] = parse_relations(text)
+
+        batched, concurrent = row["batched_relations"], row["concurrent_relations"]
+        compared = [n for n in range(1, len(candidates) + 1) if n in batched and n in concurrent]
+        row["agreement"] = round(sum(batched[n] == concurrent[n] for n in compared) / len(compared), 4) if compared else None
+        rows.append(row)
+        print(f"{image_path}: batched {row['batched_latency_s']:.2f}s, concurrent {row['concurrent_latency_s']:.2f}s, "
+              f"agreement {row['agreement']}")
+
+    print(f"\n{'='*52}")
+    print(f"{'mode':<12}{'avg latency':>14}{'parsed':>12}")
+    print(f"{'='*52}")
+    for mode in MODES:
+        if not rows:
+            break
+        parsed = sum(len(r[f"{mode}_relations"]) for r in rows)
+        total = sum(len(r["candidates"]) for r in rows)
+        print(f"{mode:<12}{sum(r[f'{mode}_latency_s'] for r in rows) / len(rows):>13.2f}s{f'{parsed}/{total}':>12}")
+    agreements = [r["agreement"] for r in rows if r["agreement"] is not None]
+    if agreements:
+        print(f"\nCategory agreement (batched vs concurrent): {sum(agreements) / len(agreements):.3f}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = Path("evaluation/results") / "image_comparison"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / f"{timestamp}.json", "w") as f:
+        json.dump({"top_k": args.top_k, "tier": tier, "rows": rows}, f, indent=2)
+    print(f"\nResults saved to: {(out_dir / f'{timestamp}.json').absolute()}")
+
+
+if __name__ == "__main__":
+    main()
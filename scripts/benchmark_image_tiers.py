@@ -0,0 +1,271 @@
+"""
+Benchmark the image resolution tiers used before VLM and embedding calls.
+
+Runs each stage once per tier and compares it against the original images:
+    details:    the get_image_details vision call over each sampled look; records payload size,
+                latency and token overlap with the answer produced from the original images
+    comparison: the batched get_image_comparisons call for each query image against its top-k
+                candidates; records payload size, latency and how often the relation category
+                matches the original-tier call
+    retrieval:  image_retrieve's embedding and vector search for each query image; records the
+                top-1 distance, top-k overlap with the original-tier query and, for crops of
+                archive images, whether the source image is still the top-1 result within
+                IMAGE_RETRIEVE_MAX_DISTANCE
+The vector index is populated at the retrieval tier, so the retrieval stage shows what the
+distance cutoff would need to be if the query tier were changed.
+
+Query images for the comparison and retrieval stages are --images if given, otherwise held-out
+centre crops of the first image of each sampled look. The vision and embedding caches are
+disabled so every run reaches the model.
+
+Usage:
+    uv run python scripts/benchmark_image_tiers.py \
+        [--looks 1 7 23] \
+        [--query "Describe the closures on the outerwear."] \
+        [--images path/to/query1.jpg path/to/query2.png] \
+        [--stages details comparison retrieval] \
+        [--top-k 3]
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ["VISION_CACHE_PATH"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+from src.tools.archive_tools.collection_inventory import look_index
+from src.tools.archive_tools.image_input import (
+    IMAGE_RETRIEVE_MAX_DISTANCE,
+    archive_image_key,
+    compare_batched,
+    parse_relations,
+    search_vectors,
+)
+from src.tools.archive_tools.look_analysis import analyze_images
+from src.tools.embeddings import get_image_embedding
+from src.tools.image_cache import image_cache
+from src.tools.image_preprocessing import IMAGE_TIERS, encode_image_bytes, get_archive_images_base64, tier_for
+from src.tools.image_uploads import read_image_source
+
+DEFAULT_QUERY = "List every visible item and describe its closures, hems and hardware."
+STAGES = ["details", "comparison", "retrieval"]
+# Fraction of each side kept when cropping an archive image into a held-out query.
+CROP_FRACTION = 0.8
+TIERS = ["original"] + [t for t in IMAGE_TIERS if t != "original"]
+
+
+def tokens(text: str) -> set[str]:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def agreement(answer: str, reference: str) -> float:
+    a, b = tokens(answer), tokens(reference)
+    if not a or not b:
+        return 0.0
+    return round(len(a & b) / len(a | b), 4)
+
+
+def centre_crop(image_bytes: bytes) -> bytes:
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        width, height = img.size
+        dx, dy = int(width * (1 - CROP_FRACTION) / 2), int(height * (1 - CROP_FRACTION) / 2)
+        out = io.BytesIO()
+        img.convert("RGB").crop((dx, dy, width - dx, height - dy)).save(out, format="JPEG", quality=90)
+        return out.getvalue()
+
+
+def query_images(image_paths: list[str] | None, looks: list[int]) -> list[dict]:
+    """Query images as {"name", "bytes", "format", "source"}; source is the archive filename for crops."""
+    if image_paths:
+        queries = []
+        for path in image_paths:
+            image_bytes, image_format = read_image_source(path)
+            queries.append({"name": path, "bytes": image_bytes, "format": image_format, "source": None})
+        return queries
+
+    queries = []
+    for look_number in looks:
+        look = look_index.get(look_number)
+        if not look or not look["image_keys"]:
+            continue
+        key = look["image_keys"][0]
+        try:
+            cropped = centre_crop(image_cache.get_bytes(key))
+        except Exception as e:
+            print(f"Look {look_number}: could not crop {key}: {e}")
+            continue
+        queries.append({"name": f"crop of {os.path.basename(key)}", "bytes": cropped, "format": "jpeg",
+                        "source": os.path.basename(key)})
+    return queries
+
+
+def bench_details(looks: list[int], query: str) -> list[dict]:
+    rows = []
+    for look_number in looks:
+        look = look_index.get(look_number)
+        if not look or not look["image_keys"]:
+            print(f"Look {look_number}: no images, skipping")
+            continue
+
+        answers = {}
+        for tier in TIERS:
+            images = get_archive_images_base64(look["image_keys"], tier)
+            payload_bytes = sum(len(b64) for b64 in images.values())
+
+            start = time.perf_counter()
+            try:
+                answers[tier] = analyze_images(look["image_keys"], query, tier)
+            except Exception as e:
+                print(f"Look {look_number} [details/{tier}] FAILED: {e}")
+                continue
+            latency = time.perf_counter() - start
+
+            rows.append({
+                "look": look_number,
+                "tier": tier,
+                "images": len(images),
+                "payload_bytes": payload_bytes,
+                "latency_s": round(latency, 3),
+                "agreement_vs_original": agreement(answers[tier], answers.get("original", "")),
+            })
+            print(f"Look {look_number} [details/{tier}] {payload_bytes / 1024:.0f} KB, {latency:.2f}s, "
+                  f"agreement {rows[-1]['agreement_vs_original']}")
+    return rows
+
+
+def bench_comparison(queries: list[dict], top_k: int) -> list[dict]:
+    rows = []
+    for q in queries:
+        embedding = get_image_embedding(q["bytes"], q["format"], tier_for("image_retrieve"))
+        candidates = [r["key"] for r in search_vectors(embedding, top_k=top_k)]
+        if not candidates:
+            print(f"{q['name']}: no candidates, skipping")
+            continue
+
+        relations = {}
+        for tier in TIERS:
+            query_b64, _ = encode_image_bytes(q["bytes"], q["format"], tier)
+            images = get_archive_images_base64([archive_image_key(c) for c in candidates], tier)
+            payload_bytes = len(query_b64) + sum(len(b64) for b64 in images.values())
+
+            start = time.perf_counter()
+            try:
+                relations[tier] = parse_relations(compare_batched(q["bytes"], q["format"], candidates, tier))
+            except Exception as e:
+                print(f"{q['name']} [comparison/{tier}] FAILED: {e}")
+                continue
+            latency = time.perf_counter() - start
+
+            reference = relations.get("original", {})
+            compared = [n for n in relations[tier] if n in reference]
+            rows.append({
+                "query": q["name"],
+                "tier": tier,
+                "candidates": candidates,
+                "payload_bytes": payload_bytes,
+                "latency_s": round(latency, 3),
+                "relations": relations[tier],
+                "agreement_vs_original": (round(sum(relations[tier][n] == reference[n] for n in compared) / len(compared), 4)
+                                          if compared else 0.0),
+            })
+            print(f"{q['name']} [comparison/{tier}] {payload_bytes / 1024:.0f} KB, {latency:.2f}s, "
+                  f"agreement {rows[-1]['agreement_vs_original']}")
+    return rows
+
+
+def bench_retrieval(queries: list[dict], top_k: int) -> list[dict]:
+    rows = []
+    for q in queries:
+        reference = []
+        for tier in TIERS:
+            start = time.perf_counter()
+            try:
+                results = search_vectors(get_image_embedding(q["bytes"], q["format"], tier), top_k=top_k)
+            except Exception as e:
+                print(f"{q['name']} [retrieval/{tier}] FAILED: {e}")
+                continue
+            latency = time.perf_counter() - start
+
+            keys = [r["key"] for r in results]
+            if tier == "original":
+                reference = keys
+            top_distance = results[0].get("distance", 1.0) if results else None
+            rows.append({
+                "query": q["name"],
+                "tier": tier,
+                "latency_s": round(latency, 3),
+                "top_keys": keys,
+                "top_distance": round(top_distance, 4) if top_distance is not None else None,
+                "overlap_vs_original": round(len(set(keys) & set(reference)) / len(reference), 4) if reference else 0.0,
+                "source_found": (bool(keys) and keys[0] == q["source"] and top_distance <= IMAGE_RETRIEVE_MAX_DISTANCE
+                                 if q["source"] else None),
+            })
+            print(f"{q['name']} [retrieval/{tier}] top distance {rows[-1]['top_distance']}, "
+                  f"overlap {rows[-1]['overlap_vs_original']}, source found {rows[-1]['source_found']}")
+    return rows
+
+
+def print_summary(stage: str, rows: list[dict], columns: dict[str, str]) -> None:
+    print(f"\n{'='*60}\n{stage}\n{'='*60}")
+    print(f"{'tier':<10}" + "".join(f"{label:>16}" for label in columns.values()))
+    for tier in TIERS:
+        tier_rows = [r for r in rows if r["tier"] == tier]
+        if not tier_rows:
+            continue
+        line = f"{tier:<10}"
+        for field in columns:
+            values = [float(r[field]) for r in tier_rows if r.get(field) is not None]
+            if field == "payload_bytes":
+                values = [v / 1024 for v in values]
+            line += f"{sum(values) / len(values):>16.3f}" if values else f"{'-':>16}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--looks", nargs="+", type=int, default=[1, 12, 23, 34, 45])
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--images", nargs="+", help="Query images for the comparison and retrieval stages")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {"query": args.query, "tiers": IMAGE_TIERS, "tool_tiers": {t: tier_for(t) for t in
+               ("get_image_details", "get_image_comparison", "image_retrieve")},
+               "max_distance": IMAGE_RETRIEVE_MAX_DISTANCE}
+    queries = query_images(args.images, args.looks) if {"comparison", "retrieval"} & set(args.stages) else []
+
+    if "details" in args.stages:
+        results["details"] = bench_details(args.looks, args.query)
+        print_summary("details", results["details"],
+                      {"payload_bytes": "avg KB", "latency_s": "avg latency s", "agreement_vs_original": "avg agreement"})
+    if "comparison" in args.stages:
+        results["comparison"] = bench_comparison(queries, args.top_k)
+        print_summary("comparison", results["comparison"],
+                      {"payload_bytes": "avg KB", "latency_s": "avg latency s", "agreement_vs_original": "avg agreement"})
+    if "retrieval" in args.stages:
+        results["retrieval"] = bench_retrieval(queries, args.top_k)
+        print_summary("retrieval", results["retrieval"],
+                      {"latency_s": "avg latency s", "top_distance": "avg top dist", "overlap_vs_original": "avg overlap",
+                       "source_found": "source found"})
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = Path("evaluation/results") / "image_tiers"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / f"{timestamp}.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {(out_dir / f'{timestamp}.json').absolute()}")
+
+
+if __name__ == "__main__":
+    main()
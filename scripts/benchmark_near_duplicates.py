@@ -0,0 +1,142 @@
+"""
+Measure the false-positive rate of the perceptual hash near-duplicate shortcut on held-out runway crops.
+
+For each sampled runway image, makes held-out query variants that mimic user photos of the
+official image (random crops of 70-95% of each side, downscaled and JPEG re-encoded) and
+matches them under each threshold setting in two ways:
+    in-index:  against the full index; a match on the image's own look is a true positive,
+               a match on any other look is a false positive
+    held-out:  against the index without the image's look, so any match is a false positive,
+               the case of a user photo of a look that is not in the archive
+Reports, per (pHash limit, dHash limit, margin) setting, the true-positive rate and both
+false-positive rates. The shortcut's defaults are PHASH_MAX_DISTANCE, DHASH_MAX_DISTANCE and
+PHASH_MIN_MARGIN.
+
+Usage:
+    uv run python scripts/benchmark_near_duplicates.py \
+        [--index data/phash_index.json] \
+        [--images 200] [--variants 3] \
+        [--phash 4 6 8] [--dhash 6 8 10] [--margins 0 5 10 15]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.archive_tools.phash_index import (
+    DHASH_MAX_DISTANCE,
+    PHASH_INDEX_PATH,
+    PHASH_MAX_DISTANCE,
+    PHASH_MIN_MARGIN,
+    PerceptualHashIndex,
+    dhash,
+    phash,
+)
+from src.tools.image_cache import image_cache
+
+
+def held_out_variant(image_bytes: bytes, rng: random.Random) -> Image.Image:
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = img.convert("RGB")
+        width, height = img.size
+        w, h = int(width * rng.uniform(0.7, 0.95)), int(height * rng.uniform(0.7, 0.95))
+        left, top = rng.randint(0, width - w), rng.randint(0, height - h)
+        cropped = img.crop((left, top, left + w, top + h))
+        cropped.thumbnail((rng.choice([512, 800, 1080]),) * 2, Image.LANCZOS)
+        out = io.BytesIO()
+        cropped.save(out, format="JPEG", quality=rng.randint(60, 90))
+    return Image.open(io.BytesIO(out.getvalue()))
+
+
+def without_look(index: PerceptualHashIndex, look: str) -> PerceptualHashIndex:
+    keep = index.looks != look
+    return PerceptualHashIndex(
+        keys=[k for k, kept in zip(index.keys, keep) if kept],
+        variants=[v for v, kept in zip(index.variants, keep) if kept],
+        phashes=index.phashes[keep],
+        dhashes=index.dhashes[keep],
+        info=index.info,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default=PHASH_INDEX_PATH)
+    parser.add_argument("--images", type=int, default=200, help="Runway images sampled")
+    parser.add_argument("--variants", type=int, default=3, help="Held-out variants per image")
+    parser.add_argument("--phash", nargs="+", type=int, default=[4, 6, 8])
+    parser.add_argument("--dhash", nargs="+", type=int, default=[6, 8, 10])
+    parser.add_argument("--margins", nargs="+", type=int, default=[0, 5, 10, 15])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index = PerceptualHashIndex.open(args.index)
+    look_by_key = {key: str(look) for key, look in zip(index.keys, index.looks)}
+    rng = random.Random(args.seed)
+    keys = sorted(set(index.keys))
+    keys = rng.sample(keys, min(args.images, len(keys)))
+    print(f"Index: {len(index)} images; sampling {len(keys)} images x {args.variants} variants")
+
+    queries = []
+    for i, key in enumerate(keys):
+        try:
+            image_bytes = image_cache.get_bytes(key)
+        except Exception as e:
+            print(f"[{i+1}/{len(keys)}] FAILED {key}: {e}")
+            continue
+        for _ in range(args.variants):
+            with held_out_variant(image_bytes, rng) as img:
+                queries.append({"key": key, "look": look_by_key[key],
+                                "phash": phash(img), "dhash": dhash(img)})
+    held_out = {look: without_look(index, look) for look in {q["look"] for q in queries}}
+
+    settings = [(p, d, m) for p in args.phash for d in args.dhash for m in args.margins]
+    rows = []
+    for max_phash, max_dhash, margin in settings:
+        true_pos = wrong_look = held_out_pos = 0
+        for q in queries:
+            match = index.match_hashes(q["phash"], q["dhash"], max_phash, max_dhash, margin)
+            if match and look_by_key[match["key"]] == q["look"]:
+                true_pos += 1
+            elif match:
+                wrong_look += 1
+            if held_out[q["look"]].match_hashes(q["phash"], q["dhash"], max_phash, max_dhash, margin):
+                held_out_pos += 1
+        n = len(queries) or 1
+        rows.append({
+            "phash": max_phash,
+            "dhash": max_dhash,
+            "margin": margin,
+            "default": (max_phash, max_dhash, margin) == (PHASH_MAX_DISTANCE, DHASH_MAX_DISTANCE, PHASH_MIN_MARGIN),
+            "true_positive_rate": round(true_pos / n, 4),
+            "wrong_look_rate": round(wrong_look / n, 4),
+            "held_out_false_positive_rate": round(held_out_pos / n, 4),
+        })
+
+    print(f"\n{'='*72}")
+    print(f"{'pHash':>6}{'dHash':>6}{'margin':>8}{'TPR':>10}{'wrong look':>12}{'held-out FPR':>14}")
+    print(f"{'='*72}")
+    for r in rows:
+        marker = "  <- default" if r["default"] else ""
+        print(f"{r['phash']:>6}{r['dhash']:>6}{r['margin']:>8}{r['true_positive_rate']:>10.3f}"
+              f"{r['wrong_look_rate']:>12.3f}{r['held_out_false_positive_rate']:>14.3f}{marker}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = Path("evaluation/results") / "near_duplicates"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / f"{timestamp}.json", "w") as f:
+        json.dump({"images": len(keys), "variants": args.variants, "queries": len(queries), "rows": rows}, f, indent=2)
+    print(f"\nResults saved to: {(out_dir / f'{timestamp}.json').absolute()}")
+
+
+if __name__ == "__main__":
+    main()
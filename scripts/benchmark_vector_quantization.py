@@ -0,0 +1,120 @@
+"""
+Recall@k benchmark for reduced-dimension and quantized local vector indexes.
+
+Uses the full-precision local index (3072-dim float32) as ground truth. Every runway
+image vector is used as a query against the other images (leave-one-out), and each
+configuration's top-k is compared with the exact top-k from the full index.
+
+Each configuration is built the way it would ship: quantized indexes searched with re-ranking
+keep vectors.f32, those without drop it. Storage is the measured size of every index file on
+disk (metadata sidecar included), in total and per vector.
+
+Truncation and quantization also shift cosine distances, so IMAGE_RETRIEVE_MAX_DISTANCE (tuned on
+the full index) does not carry over. Each configuration reports its top-1 distance distribution and
+the cutoff that passes the same share of queries as IMAGE_RETRIEVE_MAX_DISTANCE does on the full
+index; record it with scripts/export_vector_index.py --max-distance.
+
+Usage:
+    uv run python scripts/benchmark_vector_quantization.py \
+        [--index data/vector_index] \
+        [--k 3] \
+        [--dimensions 3072 1024 384 256] \
+        [--noise 0.0]   # add Gaussian noise to queries to mimic user photos of a look
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.archive_tools.image_input import IMAGE_RETRIEVE_MAX_DISTANCE
+from src.tools.archive_tools.vector_index import LocalVectorIndex, VECTOR_INDEX_PATH, normalize_rows
+
+
+def top_k_excluding(index: LocalVectorIndex, query: np.ndarray, k: int, exclude: str, rerank: bool) -> list[dict]:
+    results = index.query(query, k + 1, rerank=rerank)
+    return [r for r in results if r["key"] != exclude][:k]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default=VECTOR_INDEX_PATH)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--dimensions", nargs="+", type=int, default=[3072, 1024, 384, 256])
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--max-distance", type=float, default=IMAGE_RETRIEVE_MAX_DISTANCE,
+                        help="Cutoff tuned on the full index, mapped onto each configuration")
+    args = parser.parse_args()
+
+    reference = LocalVectorIndex.open(args.index)
+    if reference.quantization != "float32":
+        raise SystemExit("The reference index must be float32 for ground truth")
+    full = np.asarray(reference.vectors)
+    queries = full
+    if args.noise:
+        rng = np.random.default_rng(0)
+        queries = normalize_rows(full + rng.normal(scale=args.noise, size=full.shape))
+    print(f"Reference: {len(reference)} vectors x {reference.dimension}, k={args.k}, noise={args.noise}")
+
+    truth = [top_k_excluding(reference, q, args.k, key, rerank=False) for q, key in zip(queries, reference.keys)]
+    reference_top1 = np.array([t[0]["distance"] for t in truth if t])
+    passing_share = float(np.mean(reference_top1 <= args.max_distance))
+    truth = [[r["key"] for r in t] for t in truth]
+    print(f"Cutoff {args.max_distance} passes {passing_share:.1%} of top-1 results on the reference index")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for dimension in args.dimensions:
+            if dimension > reference.dimension:
+                continue
+            for quantization in ("float32", "int8", "binary"):
+                for rerank in ([False, True] if quantization != "float32" else [False]):
+                    index = LocalVectorIndex.build(
+                        os.path.join(tmp, f"{dimension}_{quantization}_{rerank}"),
+                        keys=reference.keys,
+                        vectors=full,
+                        metadata=reference.metadata,
+                        dimension=dimension,
+                        quantization=quantization,
+                        keep_float32=rerank,
+                    )
+                    hits = 0
+                    top1 = []
+                    start = time.perf_counter()
+                    for q, key, expected in zip(queries, reference.keys, truth):
+                        found = top_k_excluding(index, q, args.k, key, rerank=rerank)
+                        hits += len({r["key"] for r in found} & set(expected))
+                        top1.extend(r["distance"] for r in found[:1])
+                    elapsed = time.perf_counter() - start
+                    p10, p50, p90 = np.quantile(top1, [0.1, 0.5, 0.9])
+                    rows.append({
+                        "dimension": dimension,
+                        "quantization": quantization,
+                        "rerank": rerank,
+                        "recall": hits / (len(truth) * args.k),
+                        "disk_bytes": index.disk_bytes(),
+                        "bytes_per_vector": index.disk_bytes() / len(index),
+                        "query_ms": elapsed / len(truth) * 1000,
+                        "top1_p10": p10,
+                        "top1_p50": p50,
+                        "top1_p90": p90,
+                        "max_distance": float(np.quantile(top1, passing_share)),
+                    })
+
+    print(f"\n{'='*132}")
+    print(f"{'dim':>6}{'quantization':>14}{'rerank':>8}{f'recall@{args.k}':>12}{'disk MB':>12}{'bytes/vec':>12}{'query ms':>12}"
+          f"{'top1 p10':>12}{'top1 p50':>12}{'top1 p90':>12}{'max dist':>12}")
+    print(f"{'='*132}")
+    for r in rows:
+        print(f"{r['dimension']:>6}{r['quantization']:>14}{str(r['rerank']):>8}{r['recall']:>12.3f}"
+              f"{r['disk_bytes'] / 1024 / 1024:>12.2f}{r['bytes_per_vector']:>12.0f}{r['query_ms']:>12.3f}"
+              f"{r['top1_p10']:>12.3f}{r['top1_p50']:>12.3f}{r['top1_p90']:>12.3f}{r['max_distance']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
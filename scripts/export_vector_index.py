@@ -0,0 +1,92 @@
+"""
+Export the S3 vector index into the local memory-mapped index used by image_retrieve.
+
+Reads every vector (data + metadata) from the vector bucket, writes vectors.f32,
+metadata.json and an optional quantized copy to the local index directory (with
+--drop-float32, only the quantized copy and metadata, without re-ranking), and optionally
+uploads them to aw04-data/vector_index/ so deployed workers can download them at startup.
+A truncated or quantized index shifts cosine distances; pass the image_retrieve cutoff that
+scripts/benchmark_vector_quantization.py suggests for it as --max-distance.
+
+Usage:
+    uv run python scripts/export_vector_index.py \
+        [--vector-bucket aw04-image-vectors] \
+        [--index-name images] \
+        [--output data/vector_index] \
+        [--dimension 1024] [--quantization int8] [--drop-float32] \
+        [--max-distance 0.27] \
+        [--upload]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.aws_clients import get_client
+from src.tools.archive_tools.vector_index import LocalVectorIndex, VECTOR_INDEX_PATH, upload_index
+
+REGION = os.getenv("AWS_REGION", "us-east-1")
+
+s3vectors = get_client("s3vectors", REGION)
+
+
+def list_all_vectors(vector_bucket: str, index_name: str) -> list[dict]:
+    vectors = []
+    kwargs = {
+        "vectorBucketName": vector_bucket,
+        "indexName": index_name,
+        "returnData": True,
+        "returnMetadata": True,
+    }
+    while True:
+        response = s3vectors.list_vectors(**kwargs)
+        vectors.extend(response.get("vectors", []))
+        next_token = response.get("nextToken")
+        if not next_token:
+            return vectors
+        kwargs["nextToken"] = next_token
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vector-bucket", default="aw04-image-vectors")
+    parser.add_argument("--index-name", default="images")
+    parser.add_argument("--output", default=VECTOR_INDEX_PATH)
+    parser.add_argument("--upload", action="store_true", help="Upload the exported index to S3")
+    parser.add_argument("--dimension", type=int, help="Truncate vectors to this many leading components (1024, 384, 256)")
+    parser.add_argument("--quantization", choices=["float32", "int8", "binary"], default="float32")
+    parser.add_argument("--drop-float32", action="store_true",
+                        help="Store only the quantized copy of a quantized index (smaller, no re-ranking)")
+    parser.add_argument("--max-distance", type=float,
+                        help="image_retrieve distance cutoff for this dimension and quantization "
+                             "(see scripts/benchmark_vector_quantization.py); defaults to IMAGE_RETRIEVE_MAX_DISTANCE")
+    args = parser.parse_args()
+
+    vectors = sorted(list_all_vectors(args.vector_bucket, args.index_name), key=lambda v: v["key"])
+    print(f"Fetched {len(vectors)} vectors from {args.vector_bucket}/{args.index_name}")
+
+    index = LocalVectorIndex.build(
+        args.output,
+        keys=[v["key"] for v in vectors],
+        vectors=[v["data"]["float32"] for v in vectors],
+        metadata=[v.get("metadata", {}) for v in vectors],
+        dimension=args.dimension,
+        quantization=args.quantization,
+        keep_float32=not args.drop_float32,
+        source=f"s3vectors:{args.vector_bucket}/{args.index_name}",
+        **({"max_distance": args.max_distance} if args.max_distance else {}),
+    )
+    print(f"Wrote {len(index)} x {index.dimension} {index.quantization} index to {args.output} "
+          f"({index.disk_bytes() / 1024 / 1024:.1f} MB on disk)")
+
+    if args.upload:
+        upload_index(args.output)
+        print("Uploaded index to S3")
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
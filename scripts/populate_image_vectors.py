@@ -9,64 +9,61 @@ Usage:
         --vector-bucket <bucket-name> \
         --index-name <index-name> \
         [--create]   # pass to create the bucket + index if they don't exist yet
+        [--local-index data/vector_index]   # also write the local memory-mapped index
+        [--upload-local-index]              # and upload it to aw04-data/vector_index/
+        [--local-quantization int8] [--local-drop-float32]   # quantized local index, optionally without float32 rows
+        [--phash-index data/phash_index.json] [--upload-phash-index]   # perceptual hash index for near-duplicates
+
+Set IMAGE_CACHE_DIR to reuse downloaded images across runs. Embeddings are cached in
+EMBEDDING_CACHE_PATH, so re-runs skip unchanged images. Images are embedded at image_retrieve's
+tier (IMAGE_TIER_RETRIEVAL), so the index matches query embeddings and the cache entries are
+shared with image_retrieve.
 """
 
 import argparse
-import base64
-import json
 import os
+import sys
 import time
-import boto3
 from botocore.exceptions import ClientError
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.aws_clients import get_client
+from src.tools.image_cache import ImageCache, IMAGE_CACHE_MAX_BYTES, IMAGE_CACHE_DIR, IMAGE_CACHE_DISK_MAX_BYTES
+from src.tools.archive_tools.phash_index import PerceptualHashIndex, image_hashes, upload_phash_index
+from src.tools.archive_tools.vector_index import LocalVectorIndex, upload_index
+from src.tools.embeddings import EMBEDDING_DIM, embedding_cache, get_image_embedding
+from src.tools.image_preprocessing import tier_for
+
 REGION = os.getenv("AWS_REGION", "us-east-1")
 S3_BUCKET = "aw04-data"
 IMAGE_PREFIX = "images/"
-MODEL_ID = "amazon.nova-2-multimodal-embeddings-v1:0"
-EMBEDDING_DIM = 3072
 BATCH_SIZE = 10
 
-s3 = boto3.client("s3", region_name=REGION)
-bedrock = boto3.client("bedrock-runtime", region_name=REGION)
-s3vectors = boto3.client("s3vectors", region_name=REGION)
-
-
-def embed_image(image_bytes: bytes, image_format: str) -> list[float]:
-    body = json.dumps({
-        "schemaVersion": "nova-multimodal-embed-v1",
-        "taskType": "SINGLE_EMBEDDING",
-        "singleEmbeddingParams": {
-            "embeddingPurpose": "IMAGE_RETRIEVAL",
-            "embeddingDimension": EMBEDDING_DIM,
-            "image": {
-                "detailLevel": "STANDARD_IMAGE",
-                "format": image_format,
-                "source": {
-                    "bytes": base64.b64encode(image_bytes).decode("utf-8")
-                }
-            }
-        }
-    })
-
-    response = bedrock.invoke_model(
-        modelId=MODEL_ID,
-        body=body,
-        accept="application/json",
-        contentType="application/json"
-    )
-
-    result = json.loads(response["body"].read())
-    return result["embeddings"][0]["embedding"]
+s3 = get_client("s3", REGION)
+bedrock = get_client("bedrock-runtime", REGION)
+s3vectors = get_client("s3vectors", REGION)
+image_cache = ImageCache(
+    bucket=S3_BUCKET,
+    max_bytes=IMAGE_CACHE_MAX_BYTES,
+    disk_dir=IMAGE_CACHE_DIR,
+    disk_max_bytes=IMAGE_CACHE_DISK_MAX_BYTES,
+    s3_client=s3,
+)
 
 
 def list_images() -> list[str]:
     keys = []
+    etags = {}
     paginator = s3.get_paginator("list_objects_v2")
     for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=IMAGE_PREFIX):
         for obj in page.get("Contents", []):
             key = obj["Key"]
             if key.lower().endswith((".jpg", ".jpeg", ".png")):
                 keys.append(key)
+                if obj.get("ETag"):
+                    etags[key] = obj["ETag"]
+    image_cache.register_etags(etags)
     return keys
 
 
@@ -101,15 +98,26 @@ def main():
     parser.add_argument("--vector-bucket", required=True)
     parser.add_argument("--index-name", required=True)
     parser.add_argument("--create", action="store_true", help="Create bucket and index if they don't exist")
+    parser.add_argument("--local-index", help="Directory to write the local memory-mapped vector index to")
+    parser.add_argument("--upload-local-index", action="store_true", help="Upload the local index to S3")
+    parser.add_argument("--local-dimension", type=int, help="Truncate local index vectors to this many leading components")
+    parser.add_argument("--local-quantization", choices=["float32", "int8", "binary"], default="float32")
+    parser.add_argument("--local-drop-float32", action="store_true",
+                        help="Store only the quantized copy of a quantized local index (smaller, no re-ranking)")
+    parser.add_argument("--phash-index", help="Path to write the perceptual hash index (JSON) to")
+    parser.add_argument("--upload-phash-index", action="store_true", help="Upload the perceptual hash index to S3")
     args = parser.parse_args()
 
     if args.create:
         create_bucket_and_index(args.vector_bucket, args.index_name)
 
     image_keys = list_images()
-    print(f"Found {len(image_keys)} images to index")
+    tier = tier_for("image_retrieve")
+    print(f"Found {len(image_keys)} images to index at tier {tier}")
 
     batch = []
+    indexed = []
+    hashes = {}
     for i, key in enumerate(image_keys):
         filename = key.split("/")[-1]
         fmt = filename.rsplit(".", 1)[-1].lower()
@@ -117,14 +125,17 @@ def main():
             fmt = "jpeg"
 
         try:
-            image_bytes = s3.get_object(Bucket=S3_BUCKET, Key=key)["Body"].read()
-            embedding = embed_image(image_bytes, fmt)
+            image_bytes = image_cache.get_bytes(key)
+            if args.phash_index:
+                hashes[key] = image_hashes(image_bytes)
+            embedding = get_image_embedding(image_bytes, fmt, tier, bedrock=bedrock)
 
             batch.append({
                 "key": filename,
                 "data": {"float32": embedding},
                 "metadata": {"filename": filename}
             })
+            indexed.append(batch[-1])
 
             print(f"[{i+1}/{len(image_keys)}] Embedded {filename}")
 
@@ -150,6 +161,32 @@ def main():
         )
         print(f"  Stored final batch of {len(batch)}")
 
+    if args.local_index and indexed:
+        index = LocalVectorIndex.build(
+            args.local_index,
+            keys=[v["key"] for v in indexed],
+            vectors=[v["data"]["float32"] for v in indexed],
+            metadata=[v["metadata"] for v in indexed],
+            dimension=args.local_dimension,
+            quantization=args.local_quantization,
+            keep_float32=not args.local_drop_float32,
+            source=f"s3vectors:{args.vector_bucket}/{args.index_name}",
+        )
+        print(f"Wrote local index of {len(index)} vectors to {args.local_index} "
+              f"({index.disk_bytes() / 1024 / 1024:.1f} MB on disk)")
+        if args.upload_local_index:
+            upload_index(args.local_index)
+            print("Uploaded local index to S3")
+
+    if args.phash_index and hashes:
+        phash_index = PerceptualHashIndex.build(args.phash_index, hashes, source=f"s3://{S3_BUCKET}/{IMAGE_PREFIX}")
+        print(f"Wrote perceptual hash index of {len(phash_index)} images to {args.phash_index}")
+        if args.upload_phash_index:
+            upload_phash_index(args.phash_index)
+            print("Uploaded perceptual hash index to S3")
+
+    print(f"Image cache: {image_cache.stats()}")
+    print(f"Embedding cache: {embedding_cache.stats()}")
     print("Done.")
 
 
@@ -0,0 +1,63 @@
+"""
+Batch job that precomputes the visual description of every runway look.
+
+Runs the structured description prompt (DESCRIPTION_PROMPT: DETAIL_PROMPT with a JSON output
+schema) once per look and stores the parsed per-item fields and the topics they cover in
+aw04-data/descriptions/, versioned by prompt hash and image ETags. Looks whose output does not
+parse as the schema are reported as failed and not stored.
+Looks whose stored description is still current are skipped unless --force is set.
+
+Usage:
+    uv run python scripts/precompute_look_descriptions.py \
+        [--looks 1 2 3]   # defaults to every look in the collection
+        [--force]         # regenerate even if the stored description is current
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.archive_tools.collection_inventory import look_index
+from src.tools.archive_tools.look_descriptions import description_store
+from src.tools.archive_tools.look_analysis import DESCRIPTION_VERSION, describe_look, look_image_etags
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--looks", nargs="+", type=int)
+    parser.add_argument("--force", action="store_true", help="Regenerate current descriptions")
+    args = parser.parse_args()
+
+    look_numbers = args.looks or look_index.look_numbers()
+    print(f"Prompt version {DESCRIPTION_VERSION}, {len(look_numbers)} looks")
+
+    generated, skipped, failed = 0, 0, 0
+    for i, look_number in enumerate(look_numbers):
+        look = look_index.get(look_number)
+        if not look or not look["image_keys"]:
+            print(f"[{i+1}/{len(look_numbers)}] Look {look_number}: no images, skipping")
+            skipped += 1
+            continue
+
+        if not args.force and description_store.get(look_number, DESCRIPTION_VERSION, look_image_etags(look)):
+            print(f"[{i+1}/{len(look_numbers)}] Look {look_number}: current, skipping")
+            skipped += 1
+            continue
+
+        try:
+            description = describe_look(look)
+            record = description_store.save(look_number, description, DESCRIPTION_VERSION, look_image_etags(look))
+            print(f"[{i+1}/{len(look_numbers)}] Look {look_number}: stored {len(description['items'])} items, "
+                  f"covers {', '.join(record['coverage'])}")
+            generated += 1
+        except Exception as e:
+            print(f"[{i+1}/{len(look_numbers)}] Look {look_number}: FAILED {e}")
+            failed += 1
+
+    print(f"Done. Generated {generated}, skipped {skipped}, failed {failed}.")
+
+
+if __name__ == "__main__":
+    main()
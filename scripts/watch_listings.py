@@ -0,0 +1,53 @@
+"""
+Refresh the local listing index that listing_search serves fresh item queries from.
+
+Searches marketplace listings for every item in the archive (by name and reference code),
+pre-filters and liveness-checks them, and records them with first-seen/last-seen timestamps
+and price history. Runs one pass by default; --loop keeps watching, as the server does with
+LISTING_WATCHER=true.
+
+Usage:
+    uv run python scripts/watch_listings.py \
+        [--index data/listing_index.sqlite] \
+        [--item "Suede Moto Boot"] \
+        [--loop] [--interval 21600]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.search_tools.listing_index import LISTING_INDEX_PATH, LISTING_WATCH_INTERVAL, ListingIndex, ListingWatcher
+from src.tools.search_tools.listing_search import load_watch_items, watch_listing_item
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default=LISTING_INDEX_PATH)
+    parser.add_argument("--item", action="append", help="Only watch items with this name (repeatable)")
+    parser.add_argument("--loop", action="store_true", help="Keep watching every --interval seconds")
+    parser.add_argument("--interval", type=int, default=LISTING_WATCH_INTERVAL)
+    args = parser.parse_args()
+
+    index = ListingIndex(args.index)
+    names = {n.lower() for n in args.item or []}
+
+    def load_items():
+        items = load_watch_items()
+        return [i for i in items if not names or i["name"].lower() in names]
+
+    watcher = ListingWatcher(index, watch_listing_item, load_items, interval=args.interval)
+    while True:
+        counts = watcher.run_once()
+        print(f"Watched {counts['items']} items: {counts['listings']} listings recorded, {counts['failures']} failures")
+        print(f"Index: {args.index} {index.stats()}")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from src.tools.record_replay import install as install_record_replay
+
+# Must run before any boto3 client is created, so record/replay also covers module-level clients.
+install_record_replay()
@@ -6,11 +6,31 @@ from strands.vended_plugins.steering.context_providers.ledger_provider import Le
 from strands.models import BedrockModel
 from strands.types.content import Message
 from PIL import Image
-import os
+from src.tools.image_uploads import image_source_exists, is_upload_handle
 
 if TYPE_CHECKING:
     from strands import Agent as AgentType
 
+VALID_IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+def query_image_guidance(source) -> Guide | None:
+    """Guidance for an unusable query image (upload handle or local path), or None if it is usable."""
+    if not image_source_exists(source):
+        return Guide(reason="Image path or upload handle does not exist.")
+    if not str(source).lower().endswith(VALID_IMAGE_EXTS):
+        return Guide(reason=f"Invalid extension. Use: {', '.join(VALID_IMAGE_EXTS)}")
+    if is_upload_handle(source):
+        # Uploads are verified when the request is received.
+        return None
+    try:
+        with Image.open(source) as img:
+            img.verify()
+    except Exception:
+        return Guide(reason="The file is corrupted or not a valid image.")
+    return None
+
+
 class ToneDecision(BaseModel):
     """Structured output for output evaluation."""
 
@@ -90,7 +110,7 @@ Please provide a new response."""
                 return Guide(reason="Remove brand names/seasons from tool input. Use core subject only.")
 
         # --- WORKFLOW 1: LOOK COMPOSITION SEQUENCE ---
-        if tool_name == "get_look_composition":
+        if tool_name in ("get_look_composition", "get_look_description"):
             look_num = args.get("look_number")
 
             if not look_num:
@@ -119,27 +139,15 @@ Please provide a new response."""
             if len(filenames) == 0:
                 return Guide(reason="You must provide at least one filename to analyze.")
 
-            valid_exts = (".png", ".jpg", ".jpeg", ".gif", ".webp")
             for f in filenames:
-                if not str(f).lower().endswith(valid_exts):
-                    return Guide(reason=f"Invalid extension. Use: {', '.join(valid_exts)}")
+                if not str(f).lower().endswith(VALID_IMAGE_EXTS):
+                    return Guide(reason=f"Invalid extension. Use: {', '.join(VALID_IMAGE_EXTS)}")
 
         # --- WORKFLOW 2: IMAGE VALIDATION ---
         if tool_name == "image_retrieve":
-            val = args.get("image_path")
-            valid_exts = (".png", ".jpg", ".jpeg", ".gif", ".webp")
-
-            if not val or not os.path.exists(str(val)):
-                return Guide(reason="Image path does not exist.")
-
-            if not str(val).lower().endswith(valid_exts):
-                return Guide(reason=f"Invalid extension. Use: {', '.join(valid_exts)}")
-
-            try:
-                with Image.open(val) as img:
-                    img.verify()
-            except Exception:
-                return Guide(reason="The file is corrupted or not a valid image.")
+            guidance = query_image_guidance(args.get("image_path"))
+            if guidance:
+                return guidance
             
         if tool_name == "get_cloudfront_url":
             ir_success = any(c["tool_name"] == "image_retrieve" and c["status"] == "success" for c in ledger)
@@ -150,21 +158,27 @@ Please provide a new response."""
             if args.get("query_filename") == args.get("retrieved_filename"):
                 return Guide(reason="Comparison requires two different images. Duplicate images were provided.")
 
-            valid_exts = (".png", ".jpg", ".jpeg", ".gif", ".webp")
-
             query_filename = args.get("query_filename")
-            if not query_filename or not os.path.exists(str(query_filename)):
-                return Guide(reason="Query image path does not exist.")
-            if not str(query_filename).lower().endswith(valid_exts):
-                return Guide(reason=f"Invalid extension. Use: {', '.join(valid_exts)}")
-            try:
-                with Image.open(query_filename) as img:
-                    img.verify()
-            except Exception:
-                return Guide(reason="The file is corrupted or not a valid image.")
+            guidance = query_image_guidance(query_filename)
+            if guidance:
+                return guidance
 
             retrieved_filename = args.get("retrieved_filename")
-            if not retrieved_filename or not str(retrieved_filename).lower().endswith(valid_exts):
-                return Guide(reason=f"Invalid or missing retrieved filename. Use: {', '.join(valid_exts)}")
+            if not retrieved_filename or not str(retrieved_filename).lower().endswith(VALID_IMAGE_EXTS):
+                return Guide(reason=f"Invalid or missing retrieved filename. Use: {', '.join(VALID_IMAGE_EXTS)}")
+
+        if tool_name == "get_image_comparisons":
+            query_filename = args.get("query_filename")
+            guidance = query_image_guidance(query_filename)
+            if guidance:
+                return guidance
+
+            retrieved_filenames = args.get("retrieved_filenames")
+            if not retrieved_filenames or not isinstance(retrieved_filenames, list):
+                return Guide(reason="Provide the retrieved archival images as a non-empty list of filenames or URLs.")
+            if query_filename in retrieved_filenames:
+                return Guide(reason="Comparison requires two different images. The query image is in the retrieved list.")
+            if any(not str(f).lower().endswith(VALID_IMAGE_EXTS) for f in retrieved_filenames):
+                return Guide(reason=f"Invalid retrieved filename. Use: {', '.join(VALID_IMAGE_EXTS)}")
 
         return Proceed(reason="Tool input matches workflow requirements.")
\ No newline at end of file
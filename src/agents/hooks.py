@@ -1,7 +1,7 @@
-import boto3
 from strands import tool
 from strands.hooks import HookRegistry, HookProvider, BeforeToolCallEvent, BeforeInvocationEvent, MessageAddedEvent, AfterInvocationEvent, AfterNodeCallEvent, AfterModelCallEvent, AfterMultiAgentInvocationEvent
 from threading import Lock
+from src.tools.aws_clients import get_client
 
 class LimitToolCounts(HookProvider):
     """Limits the number of times tools can be called per agent invocation"""
@@ -40,11 +40,37 @@ class LimitToolCounts(HookProvider):
                 f"DO NOT CALL THIS TOOL ANYMORE "
             )
 
+class ToolInputCallback(HookProvider):
+    """Passes a tool's input to a callback as soon as the tool is about to run"""
+
+    def __init__(self, tool_name: str, callback):
+        """
+        Initializer.
+
+        Args:
+            tool_name: Name of the tool to watch.
+            callback: Called with the tool input dict. Exceptions are swallowed so the
+                tool call itself is never affected.
+        """
+        self.tool_name = tool_name
+        self.callback = callback
+
+    def register_hooks(self, registry: HookRegistry) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.on_tool_call)
+
+    def on_tool_call(self, event: BeforeToolCallEvent) -> None:
+        if event.tool_use["name"] != self.tool_name:
+            return
+        try:
+            self.callback(event.tool_use.get("input", {}))
+        except Exception as e:
+            print(f"[HOOK] {self.tool_name} callback failed: {e}")
+
 class NotifyOnlyGuardrailsHook(HookProvider):
     def __init__(self, guardrail_id: str, guardrail_version: str):
         self.guardrail_id = guardrail_id
         self.guardrail_version = guardrail_version
-        self.bedrock_client = boto3.client("bedrock-runtime", "us-east-1") # change to your AWS region
+        self.bedrock_client = get_client("bedrock-runtime", "us-east-1") # change to your AWS region
 
     def register_hooks(self, registry: HookRegistry) -> None:
         registry.add_callback(MessageAddedEvent, self.check_user_input) # Here you could use BeforeInvocationEvent instead
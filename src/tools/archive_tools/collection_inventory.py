@@ -1,19 +1,23 @@
 from strands import tool, Agent
 from strands.models import BedrockModel
+from src.tools.aws_clients import get_client
 from src.agents.hooks import LimitToolCounts
-import boto3
+from src.tools.archive_tools.look_index import LookIndex
+from src.tools.archive_tools.look_descriptions import description_store
+from src.tools.image_cache import image_cache
 import csv
 import io
-import os
 import logging
 import pandas as pd
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-s3 = boto3.client('s3', region_name=os.getenv("AWS_REGION"))
+s3 = get_client('s3')
 
 BUCKET_NAME = 'aw04-data'
 FOLDER_PREFIX = 'looks/'
+IMAGE_FOLDER = 'images/'
+CLOUDFRONT_DOMAIN = 'https://d39bzdkvoca64w.cloudfront.net'
 
 SCHEMA_CONTEXT = """
 DataFrame variable: df
@@ -77,8 +81,40 @@ def load_full_collection():
             logger.error(f"Error reading {obj['Key']}: {str(e)}")
     return all_items
 
-FULL_COLLECTION = load_full_collection()
-df_archive = pd.DataFrame(FULL_COLLECTION)
+def list_image_keys():
+    keys = []
+    etags = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=IMAGE_FOLDER):
+        for obj in page.get('Contents', []):
+            keys.append(obj['Key'])
+            etags[obj['Key']] = obj.get('ETag', '')
+    image_cache.register_etags({key: etag for key, etag in etags.items() if etag})
+    return keys
+
+look_index = LookIndex(CLOUDFRONT_DOMAIN)
+
+
+def refresh_collection():
+    """Reload the collection from S3 and rebuild the look index and descriptions alongside it."""
+    global FULL_COLLECTION, df_archive
+    items = load_full_collection()
+    try:
+        image_keys = list_image_keys()
+    except Exception as e:
+        logger.error(f"Error listing images under {IMAGE_FOLDER}: {str(e)}")
+        image_keys = []
+    look_index.build(items, image_keys)
+    try:
+        description_store.load()
+    except Exception as e:
+        logger.error(f"Error loading look descriptions: {str(e)}")
+    FULL_COLLECTION = items
+    df_archive = pd.DataFrame(items)
+
+FULL_COLLECTION = []
+df_archive = pd.DataFrame()
+refresh_collection()
 
 
 def result_to_string(result) -> str:
@@ -0,0 +1,183 @@
+import logging
+import os
+import re
+
+from src.tools.archive_tools.look_index import LookIndex
+from src.tools.archive_tools.phash_index import look_of
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# Score bonus for a candidate whose look satisfies every parsed filter.
+HYBRID_METADATA_WEIGHT = float(os.getenv("HYBRID_METADATA_WEIGHT", "0.05"))
+# Score bonus for a candidate whose look also has other images among the candidates.
+HYBRID_CONSENSUS_WEIGHT = float(os.getenv("HYBRID_CONSENSUS_WEIGHT", "0.02"))
+# Candidates scoring more than this below the best candidate are dropped.
+HYBRID_SCORE_MARGIN = float(os.getenv("HYBRID_SCORE_MARGIN", "0.08"))
+
+# Query words that name a category without using the category value itself.
+CATEGORY_SYNONYMS = {
+    "Outerwear": ["jacket", "coat", "blazer", "bomber", "peacoat", "overcoat", "parka"],
+    "Top": ["shirt", "t-shirt", "tee", "knit", "sweater", "jumper", "cardigan", "vest"],
+    "Bottom": ["trousers", "pants", "jeans", "denim", "skirt"],
+    "Footwear": ["boot", "boots", "sneaker", "sneakers", "shoe", "shoes", "footwear"],
+    "Accessories": ["belt", "scarf", "bag", "bracelet", "necklace", "brooch", "gloves",
+                    "eyewear", "sunglasses", "glasses", "accessory", "accessories"],
+}
+# Everyday words that only name a garment after a determiner or an attribute, as in "this top" or
+# "a black tie", but not in "top left" or "tie-dye".
+AMBIGUOUS_CATEGORY_WORDS = {
+    "Top": ["top", "tops"],
+    "Bottom": ["bottom", "bottoms"],
+    "Accessories": ["tie", "ring"],
+}
+GARMENT_DETERMINERS = ["this", "that", "these", "those", "a", "my", "his", "her", "their"]
+# Links between a garment and a following color, material or pattern, as in "a jacket in black".
+GARMENT_LINKS = ["is", "are", "in", "made of", "made from"]
+
+# Look index item fields used for each filter.
+FILTER_FIELDS = {
+    "category": ["Category"],
+    "color": ["Primary Color", "Secondary Color(s)"],
+    "material": ["Primary Outer Material", "Secondary Outer Material(s)"],
+    "pattern": ["Pattern"],
+}
+FILTER_PLACEHOLDERS = {"none", "no secondary color", "not available", "to be updated", ""}
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"[a-z0-9\-]+", text.lower()))
+
+
+def _alternation(phrases) -> str:
+    """Regex alternation of the phrases, longest first, that never matches when there are none."""
+    phrases = sorted({p for p in phrases if p}, key=len, reverse=True)
+    return "|".join(re.escape(p) for p in phrases) or "(?!)"
+
+
+def _mentions(text: str, phrase: str, in_context) -> bool:
+    """Whether any whole-word occurrence of the phrase satisfies in_context(text, match)."""
+    return any(in_context(text, m) for m in re.finditer(rf"(?<![a-z]){re.escape(phrase)}(?![a-z])", text))
+
+
+def look_attributes(look_index: LookIndex, look_number) -> dict[str, set[str]]:
+    """Lowercased category, color, material and pattern values across the items of a look."""
+    look = look_index.get(look_number)
+    attributes = {name: set() for name in FILTER_FIELDS}
+    for item in (look or {}).get("items", []):
+        for name, fields in FILTER_FIELDS.items():
+            for field in fields:
+                for value in str(item.get(field, "")).split(","):
+                    value = value.strip().lower()
+                    if value not in FILTER_PLACEHOLDERS:
+                        attributes[name].add(value)
+    return attributes
+
+
+def parse_query_filters(query: str, look_index: LookIndex) -> dict[str, set[str]]:
+    """
+    Metadata filters named in the query text, using the values present in the collection.
+
+    A color, material or pattern only counts when it describes a garment ("black leather jacket",
+    "a coat in grey"), so "on a black background" selects nothing. Everyday category words such as
+    "top" and "tie" only count after a determiner or an attribute ("this top", "a black tie").
+
+    Returns:
+        Filter name -> lowercased values, only for filters the query mentions, e.g.
+        {"category": {"outerwear"}, "color": {"black"}}.
+    """
+    text = query.lower()
+    vocabulary = {name: set() for name in FILTER_FIELDS}
+    for look_number in look_index.look_numbers():
+        for name, values in look_attributes(look_index, look_number).items():
+            vocabulary[name] |= values
+
+    attribute_words = {w for name in ("color", "material", "pattern") for v in vocabulary[name] for w in _words(v)}
+    ambiguous = {w: c.lower() for c, words in AMBIGUOUS_CATEGORY_WORDS.items() for w in words}
+    garments = _alternation([*(w for ws in CATEGORY_SYNONYMS.values() for w in ws), *ambiguous, *vocabulary["category"]])
+    attribute_run = rf"(?:[\s,/&\-]+(?:{_alternation(attribute_words | {'and', 'or'})})(?![a-z]))*"
+    garment_follows = re.compile(rf"{attribute_run}[\s,/&\-]+(?:{garments})(?![a-z])")
+    garment_precedes = re.compile(rf"(?<![a-z])(?:{garments})(?:\s+(?:{_alternation(GARMENT_LINKS)}))?\s*$")
+    garment_word_after = re.compile(
+        rf"(?<![a-z])(?:{_alternation(GARMENT_DETERMINERS + sorted(attribute_words))})(?![a-z]){attribute_run}\s+$")
+
+    def describes_garment(text: str, match: re.Match) -> bool:
+        return bool(garment_follows.match(text, match.end()) or garment_precedes.search(text[:match.start()]))
+
+    def names_garment(text: str, match: re.Match) -> bool:
+        return bool(garment_word_after.search(text[:match.start()])) and text[match.end():match.end() + 1] != "-"
+
+    filters = {}
+    for name, values in vocabulary.items():
+        if name == "category":
+            in_context = lambda text, match: match.group(0) not in ambiguous or names_garment(text, match)
+        else:
+            in_context = describes_garment
+        # Prefer the longest phrases so 'dark grey' does not also select 'grey'.
+        found = set()
+        for value in sorted(values, key=len, reverse=True):
+            if _mentions(text, value, in_context) and not any(value in f for f in found):
+                found.add(value)
+        if found:
+            filters[name] = found
+
+    words = _words(text)
+    categories = {c.lower() for c, synonyms in CATEGORY_SYNONYMS.items() if words & set(synonyms)}
+    categories |= {c for w, c in ambiguous.items() if _mentions(text, w, names_garment)}
+    if categories:
+        filters["category"] = filters.get("category", set()) | categories
+    return filters
+
+
+def rerank_candidates(candidates: list[dict], query: str, look_index: LookIndex, top_k: int,
+                      max_distance: float) -> list[dict]:
+    """
+    Filter vector search candidates by query metadata and re-rank them.
+
+    Each candidate keeps its vector similarity and gains a bonus for the share of parsed filters its
+    look satisfies and for other candidates from the same look. When filters are present, candidates
+    whose look satisfies none of them are dropped, unless that would drop every candidate.
+
+    Args:
+        candidates: search_vectors() results: {"key", "distance", "metadata"}.
+        query: The user's text, used for metadata filters. May be empty.
+        max_distance: Vector distance cutoff applied before re-ranking.
+
+    Returns:
+        Up to top_k candidates with "score", "similarity", "look_number" and "matched_filters" added,
+        best first, excluding any that score more than HYBRID_SCORE_MARGIN below the best.
+    """
+    filters = parse_query_filters(query, look_index) if query else {}
+    pool = [c for c in candidates if c.get("distance", 1.0) <= max_distance]
+    if not pool:
+        return []
+
+    looks = [look_of(c.get("metadata", {}).get("filename", c.get("key", ""))) for c in pool]
+    scored = []
+    for candidate, look in zip(pool, looks):
+        attributes = look_attributes(look_index, look) if look.isdigit() else {name: set() for name in FILTER_FIELDS}
+        matched = sorted(name for name, values in filters.items() if values & attributes[name])
+        similarity = 1.0 - candidate.get("distance", 1.0)
+        metadata_score = len(matched) / len(filters) if filters else 0.0
+        consensus = (looks.count(look) - 1) / max(len(pool) - 1, 1)
+        scored.append({
+            **candidate,
+            "similarity": round(similarity, 4),
+            "score": round(similarity + HYBRID_METADATA_WEIGHT * metadata_score + HYBRID_CONSENSUS_WEIGHT * consensus, 4),
+            "look_number": int(look) if look.isdigit() else None,
+            "matched_filters": matched,
+        })
+
+    if filters:
+        filtered = [c for c in scored if c["matched_filters"]]
+        if filtered:
+            scored = filtered
+        else:
+            logger.info(f"No candidates match query filters {filters}, keeping unfiltered candidates")
+
+    scored.sort(key=lambda c: c["score"], reverse=True)
+    best = scored[0]["score"]
+    results = [c for c in scored if c["score"] >= best - HYBRID_SCORE_MARGIN][:top_k]
+    logger.info(f"Hybrid retrieval: {len(candidates)} candidates, filters {filters}, kept {len(results)}")
+    return results
@@ -1,23 +1,53 @@
 from strands import tool
 import json
-import base64
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 import os
-import boto3
+import logging
 from strands import Agent, tool
 from strands_tools import stop
 from strands.models import BedrockModel
+from src.tools.aws_clients import get_client
 from src.agents.hooks import LimitToolCounts
 from src.agents.handlers import AgentSteeringHandler
+from src.tools.image_cache import image_cache
+from src.tools.image_uploads import image_source_exists, read_image_source
+from src.tools.image_preprocessing import encode_image_bytes, get_archive_image_base64, get_archive_images_base64, tier_for
+from src.tools.archive_tools.collection_inventory import look_index
+from src.tools.archive_tools.hybrid_retrieval import HYBRID_CANDIDATES, rerank_candidates
+from src.tools.archive_tools.phash_index import get_phash_index, look_of
+from src.tools.archive_tools.vector_index import VECTOR_INDEX_RERANK, get_local_index
+from src.tools.embeddings import EMBEDDING_DIM, embedding_cache, get_image_embedding
+from src.tools.vision_cache import prompt_version, vision_cache, vision_cache_key
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
 
 VECTOR_BUCKET = "aw04-image-vectors"
 VECTOR_INDEX = "images"
-EMBEDDING_MODEL_ID = "amazon.nova-2-multimodal-embeddings-v1:0"
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "local")
+# "hybrid": wider vector search, metadata filters and re-ranking; "vector": raw top-3 by distance.
+IMAGE_RETRIEVAL_MODE = os.getenv("IMAGE_RETRIEVAL_MODE", "hybrid")
+# "batched": one request with the query and all candidates; "concurrent": parallel pairwise requests.
+COMPARISON_MODE = os.getenv("COMPARISON_MODE", "batched")
+# Cosine distance cutoff for image_retrieve results, valid for embeddings at the retrieval tier and
+# full-dimension float32 vectors. A local index built smaller records its own cutoff (max_distance).
+IMAGE_RETRIEVE_MAX_DISTANCE = float(os.getenv("IMAGE_RETRIEVE_MAX_DISTANCE", "0.3"))
+NEAR_DUPLICATE_SHORTCUT = os.getenv("NEAR_DUPLICATE_SHORTCUT", "true").lower() == "true"
+# Confirm a perceptual hash candidate with one side-by-side comparison before skipping retrieval.
+NEAR_DUPLICATE_CONFIRM = os.getenv("NEAR_DUPLICATE_CONFIRM", "true").lower() == "true"
+IMAGE_PATH_PATTERN = re.compile(r"[^\s'\"`]+\.(?:png|jpe?g|gif|webp)", re.IGNORECASE)
+RELATION_CATEGORIES = ["Direct match", "Strong relation", "Weak relation", "No relation"]
+VISION_MODEL_ID = "amazon.nova-pro-v1:0"
 
 BUCKET_NAME = 'aw04-data'
 IMAGE_FOLDER = 'images/'
 CLOUDFRONT_DOMAIN = 'https://d39bzdkvoca64w.cloudfront.net'
 
+comparison_pool = ThreadPoolExecutor(max_workers=int(os.getenv("COMPARISON_WORKERS", "3")), thread_name_prefix="image-compare")
+
 bedrock_model = BedrockModel(
     model_id="us.amazon.nova-2-lite-v1:0",
     temperature=0.0,
@@ -41,7 +71,8 @@ Role:
 Retrieve the most relevant images related to the image using the image_retrieve and get_cloudfront_url tools.
 
 Guidelines:
-Pass the image path (PNG, JPEG/JPG, GIF, or WebP formats) from the query into the image_path parameter of the image_retrieve tool.
+Pass the image path (PNG, JPEG/JPG, GIF, or WebP formats) or upload handle (upload://...) from the query into the image_path parameter of the image_retrieve tool.
+Pass the user's question (without the image path) into the query parameter of the image_retrieve tool.
 For every file path or filename returned by image_retrieve, you MUST call the get_cloudfront_url tool to generate a valid access link.
 If no image is found, or no image path is provided, use the stop tool with reason IMAGE_NOT_AVAILABLE.
 If retrieve returns no results or an error, use the stop tool with reason INFO_NOT_AVAILABLE.
@@ -63,11 +94,11 @@ kb_handler = AgentSteeringHandler(
 
 IMAGE_READER_PROMPT = """
 Role:
-Compare the query image against the retrieved archival image using the get_image_comparison tool.
+Compare the query image against the retrieved archival images using the get_image_comparisons tool.
 
 Guidelines:
-Call get_image_comparison with the query image path and the retrieved archival image.
-If get_image_comparison returns an error, use the stop tool with reason COMPARISON_ERROR.
+Call get_image_comparisons once with the query image path and the list of all retrieved archival images.
+If get_image_comparisons returns an error, use the stop tool with reason COMPARISON_ERROR.
 """
 
 comparison_handler = AgentSteeringHandler(
@@ -81,6 +112,18 @@ comparison_handler = AgentSteeringHandler(
     """
 )
 
+BATCH_COMPARISON_PROMPT = """
+Role:
+Analyze IMAGE A (Query) against each numbered candidate image (Retrieved) to verify visual relevance.
+
+Guidelines:
+Judge each candidate independently against IMAGE A; do not compare candidates with each other.
+Categorize each connection as one of the following: Direct match, Strong relation, Weak relation, No relation.
+Output a short analysis of IMAGE A, then one block per candidate in the form:
+Candidate <number> (<filename>): <category> - <one-sentence summary of the relationship>
+Finish with a line "Ranking:" listing the candidate numbers from most to least related.
+"""
+
 SYNTHESIS_PROMPT = """
 Role:
 Synthesize a final answer based on visual and knowledge base information.
@@ -92,67 +135,70 @@ If visual and KB data conflict, report the discrepancy rather than picking one.
 Only state a definitive answer when the evidence clearly supports it.
 """
 
+def retrieval_max_distance() -> float:
+    """
+    Distance cutoff for search_vectors() results: the one recorded with the local index, which may be
+    truncated or quantized, else IMAGE_RETRIEVE_MAX_DISTANCE.
+    """
+    local_index = get_local_index(EMBEDDING_DIM) if VECTOR_SEARCH_BACKEND == "local" else None
+    return (local_index.info.get("max_distance") if local_index is not None else None) or IMAGE_RETRIEVE_MAX_DISTANCE
+
+def search_vectors(embedding: list[float], top_k: int) -> list[dict]:
+    """
+    Cosine top-k over the runway image vectors.
+
+    Uses the local memory-mapped index unless VECTOR_SEARCH_BACKEND is 's3vectors', and falls
+    back to s3vectors if the local index is missing or the query fails. The local index may be
+    built at a reduced dimension; the query embedding is truncated to match. Results use the
+    s3vectors shape: {"key", "distance", "metadata"}.
+    """
+    local_index = get_local_index(EMBEDDING_DIM) if VECTOR_SEARCH_BACKEND == "local" else None
+    if local_index is not None:
+        try:
+            return local_index.query(embedding, top_k, rerank=VECTOR_INDEX_RERANK)
+        except Exception as e:
+            logger.warning(f"Local vector search failed, falling back to s3vectors: {str(e)}")
+
+    s3vectors = get_client('s3vectors')
+    query_response = s3vectors.query_vectors(
+        vectorBucketName=VECTOR_BUCKET,
+        indexName=VECTOR_INDEX,
+        queryVector={"float32": embedding},
+        topK=top_k,
+        returnMetadata=True,
+        returnDistance=True
+    )
+    return query_response.get("vectors", [])
+
 @tool
-def image_retrieve(image_path: str) -> str:
+def image_retrieve(image_path: str, query: str = "") -> str:
     """
     Perform image-retrieval from the image knowledge base.
 
     Use this tool when a query requires direct visual inspection of garments, accessories, layering, closures, construction details, or physical attributes that cannot be reliably inferred from metadata alone.
 
     Args:
-    image_path (str): The image to use as a retrieval key.
+    image_path (str): The image to use as a retrieval key: an upload handle (upload://...) or a local file path.
+    query (str): The user's question about the image, used to filter and re-rank results by category, color, material and pattern.
 
     Returns:
     A structured textual analysis based only on confirmed visual observations.
     """
     region = os.getenv("AWS_REGION")
-    bedrock = boto3.client('bedrock-runtime', region_name=region)
-    s3vectors = boto3.client('s3vectors', region_name=region)
-    max_distance = 0.3
+    bedrock = get_client('bedrock-runtime', region)
+    max_distance = retrieval_max_distance()
 
     try:
-        with open(image_path, "rb") as image_file:
-            image_bytes = image_file.read()
-
-        image_format = image_path.split('.')[-1].lower()
-        if image_format == 'jpg':
-            image_format = 'jpeg'
-
-        embed_body = json.dumps({
-            "schemaVersion": "nova-multimodal-embed-v1",
-            "taskType": "SINGLE_EMBEDDING",
-            "singleEmbeddingParams": {
-                "embeddingPurpose": "IMAGE_RETRIEVAL",
-                "embeddingDimension": 3072,
-                "image": {
-                    "detailLevel": "STANDARD_IMAGE",
-                    "format": image_format,
-                    "source": {
-                        "bytes": base64.b64encode(image_bytes).decode("utf-8")
-                    }
-                }
-            }
-        })
-
-        embed_response = bedrock.invoke_model(
-            modelId=EMBEDDING_MODEL_ID,
-            body=embed_body,
-            accept="application/json",
-            contentType="application/json"
-        )
-        embedding = json.loads(embed_response["body"].read())["embeddings"][0]["embedding"]
-
-        query_response = s3vectors.query_vectors(
-            vectorBucketName=VECTOR_BUCKET,
-            indexName=VECTOR_INDEX,
-            queryVector={"float32": embedding},
-            topK=3,
-            returnMetadata=True,
-            returnDistance=True
-        )
-
-        results = query_response.get("vectors", [])
-        filtered = [r for r in results if r.get("distance", 1.0) <= max_distance]
+        image_bytes, image_format = read_image_source(image_path)
+        embedding = get_image_embedding(image_bytes, image_format, tier_for("image_retrieve"), bedrock=bedrock)
+        logger.info(f"Embedding cache stats: {embedding_cache.stats()}")
+
+        if IMAGE_RETRIEVAL_MODE == "hybrid":
+            results = search_vectors(embedding, top_k=HYBRID_CANDIDATES)
+            filtered = rerank_candidates(results, query, look_index, top_k=3, max_distance=max_distance)
+        else:
+            results = search_vectors(embedding, top_k=3)
+            filtered = [r for r in results if r.get("distance", 1.0) <= max_distance]
 
         if not filtered:
             return f"No results found below distance threshold of {max_distance}."
@@ -161,9 +207,13 @@ def image_retrieve(image_path: str) -> str:
         for r in filtered:
             filename = r.get("metadata", {}).get("filename", r.get("key", "Unknown"))
             distance = r.get("distance", 1.0)
-            score = round(1 - distance, 4)
+            score = r.get("score", round(1 - distance, 4))
             formatted.append(f"\nScore: {score}")
             formatted.append(f"Document ID: {filename}")
+            if r.get("look_number"):
+                formatted.append(f"Look Number: {r['look_number']}")
+            if r.get("matched_filters"):
+                formatted.append(f"Matches query: {', '.join(r['matched_filters'])}")
             formatted.append("")
 
         return f"Retrieved {len(filtered)} results:\n" + "\n".join(formatted)
@@ -187,77 +237,226 @@ def get_cloudfront_url(image_filename: str):
     
     return full_url
 
+def archive_image_key(retrieved_filename: str) -> str:
+    return f"{IMAGE_FOLDER}{os.path.basename(urlparse(retrieved_filename).path)}"
+
+def invoke_vision(content_blocks: list[dict], max_new_tokens: int) -> str:
+    bedrock = get_client('bedrock-runtime')
+    body = json.dumps({
+        "inferenceConfig": {
+            "max_new_tokens": max_new_tokens,
+            "temperature": 0.0
+        },
+        "messages": [
+            {
+                "role": "user",
+                "content": content_blocks
+            }
+        ]
+    })
+
+    response = bedrock.invoke_model(
+        modelId=VISION_MODEL_ID,
+        body=body
+    )
+
+    response_body = json.loads(response.get("body").read())
+    return response_body["output"]["message"]["content"][0]["text"]
+
+def compare_pair(query_bytes: bytes, query_format: str, retrieved_filename: str, tier: str) -> str:
+    """Side-by-side comparison of the query image against one archive image."""
+    image_key = archive_image_key(retrieved_filename)
+    retrieved_b64 = get_archive_image_base64(image_key, tier)
+    logger.info(f"Image cache stats: {image_cache.stats()}")
+
+    cache_key = vision_cache_key(
+        VISION_MODEL_ID,
+        prompt_version(COMPARISON_PROMPT, VISION_MODEL_ID, tier),
+        [hashlib.sha256(query_bytes).hexdigest(), image_cache.etag(image_key)],
+        "",
+        ordered=True,
+    )
+    cached = vision_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Vision cache hit: {vision_cache.stats()}")
+        return cached
+
+    query_b64, query_format = encode_image_bytes(query_bytes, query_format, tier)
+    content_blocks = [
+        {"text": "IMAGE A (Query):"},
+        {"image": {"format": query_format, "source": {"bytes": query_b64}}},
+        {"text": "IMAGE B (Retrieved):"},
+        {"image": {"format": "jpeg", "source": {"bytes": retrieved_b64}}},
+        {"text": COMPARISON_PROMPT},
+    ]
+    text = invoke_vision(content_blocks, 800)
+    vision_cache.put(cache_key, text)
+    return text
+
+def compare_batched(query_bytes: bytes, query_format: str, retrieved_filenames: list[str], tier: str) -> str:
+    """
+    One multimodal request comparing the query image against every candidate, with a ranked verdict.
+
+    Candidates keep their position in retrieved_filenames as their number, as in compare_concurrent;
+    candidates whose image could not be fetched are reported as errors under their own number.
+    """
+    image_keys = [archive_image_key(f) for f in retrieved_filenames]
+    fetched = get_archive_images_base64(image_keys, tier)
+    if not fetched:
+        raise ValueError("none of the retrieved images could be fetched.")
+    numbered = [(i, key) for i, key in enumerate(image_keys, start=1) if key in fetched]
+    failed = [(i, key) for i, key in enumerate(image_keys, start=1) if key not in fetched]
+    failures = "\n".join(f"Candidate {i} ({os.path.basename(key)}): Error - the image could not be fetched."
+                         for i, key in failed)
+
+    cache_key = vision_cache_key(
+        VISION_MODEL_ID,
+        prompt_version(BATCH_COMPARISON_PROMPT, VISION_MODEL_ID, tier),
+        [hashlib.sha256(query_bytes).hexdigest()] + [f"{i}:{image_cache.etag(key)}" for i, key in numbered],
+        "",
+        ordered=True,
+    )
+    cached = vision_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Vision cache hit: {vision_cache.stats()}")
+        return f"{cached}\n\n{failures}" if failures else cached
+
+    query_b64, query_format = encode_image_bytes(query_bytes, query_format, tier)
+    content_blocks = [
+        {"text": "IMAGE A (Query):"},
+        {"image": {"format": query_format, "source": {"bytes": query_b64}}},
+    ]
+    for i, key in numbered:
+        content_blocks.append({"text": f"Candidate {i} ({os.path.basename(key)}):"})
+        content_blocks.append({"image": {"format": "jpeg", "source": {"bytes": fetched[key]}}})
+    content_blocks.append({"text": BATCH_COMPARISON_PROMPT})
+
+    text = invoke_vision(content_blocks, 400 + 300 * len(numbered))
+    vision_cache.put(cache_key, text)
+    if failures:
+        logger.warning(f"Batched comparison without {len(failed)} unfetched candidates")
+        return f"{text}\n\n{failures}"
+    return text
+
+def compare_concurrent(query_bytes: bytes, query_format: str, retrieved_filenames: list[str], tier: str) -> str:
+    """Pairwise comparisons of the query image against each candidate, run in parallel."""
+    futures = {
+        filename: comparison_pool.submit(compare_pair, query_bytes, query_format, filename, tier)
+        for filename in retrieved_filenames
+    }
+    sections = []
+    for i, (filename, future) in enumerate(futures.items(), start=1):
+        try:
+            analysis = future.result()
+        except Exception as e:
+            analysis = f"Error comparing with {filename}: {str(e)}"
+        sections.append(f"Candidate {i} ({os.path.basename(urlparse(filename).path)}):\n{analysis}")
+    return "\n\n".join(sections)
+
+def first_relation(text: str) -> str | None:
+    """The first relation category stated in a comparison, or None."""
+    found = [(text.lower().find(c.lower()), c) for c in RELATION_CATEGORIES if c.lower() in text.lower()]
+    return min(found)[1] if found else None
+
+def parse_relations(text: str) -> dict[int, str]:
+    """Map each 'Candidate <n>' section of a comparison to the first relation category it states."""
+    relations = {}
+    sections = re.split(r"(?im)^\W*candidate\s+(\d+)", text)
+    for number, section in zip(sections[1::2], sections[2::2]):
+        relation = first_relation(section)
+        if relation and int(number) not in relations:
+            relations[int(number)] = relation
+    return relations
+
 @tool
 def get_image_comparison(query_filename: str, retrieved_filename: str):
     """
     Perform a direct side-by-side visual comparison between a query image and a single archival look image.
 
     Args:
-    query_filename (str): Local path to the user's query image.
+    query_filename (str): The user's query image: an upload handle (upload://...) or a local file path.
     retrieved_filename (str): The filename or URL of the archival image.
 
     Returns:
     A analysis and comparison of the images.
     """
-    region = os.getenv("AWS_REGION")
-    s3 = boto3.client('s3', region_name=region)
-    bedrock = boto3.client('bedrock-runtime', region_name=region)
-
     try:
-        content_blocks = []
-
-        with open(query_filename, "rb") as f:
-            query_bytes = f.read()
-        
-        content_blocks.append({"text": "IMAGE A (Query):"})
-        content_blocks.append({
-            "image": {
-                "format": "jpeg",
-                "source": {"bytes": base64.b64encode(query_bytes).decode("utf-8")}
-            }
-        })
+        query_bytes, query_format = read_image_source(query_filename)
+        return compare_pair(query_bytes, query_format, retrieved_filename, tier_for("get_image_comparison"))
+    except Exception as e:
+        return f"Error comparing {query_filename} and {retrieved_filename}: {str(e)}"
 
-        clean_retrieved = os.path.basename(urlparse(retrieved_filename).path)
-        image_key = f"{IMAGE_FOLDER}{clean_retrieved}"
+@tool
+def get_image_comparisons(query_filename: str, retrieved_filenames: list[str]):
+    """
+    Compare a query image against several retrieved archival images at once.
 
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=image_key)
-        retrieved_bytes = response['Body'].read()
+    Use this instead of calling get_image_comparison once per candidate.
 
-        content_blocks.append({"text": "IMAGE B (Retrieved):"})
-        content_blocks.append({
-            "image": {
-                "format": "jpeg",
-                "source": {"bytes": base64.b64encode(retrieved_bytes).decode("utf-8")}
-            }
-        })
-
-        content_blocks.append({
-            "text": COMPARISON_PROMPT
-        })
-
-        body = json.dumps({
-            "inferenceConfig": {
-                "max_new_tokens": 800,
-                "temperature": 0.0
-            },
-            "messages": [
-                {
-                    "role": "user",
-                    "content": content_blocks
-                }
-            ]
-        })
-
-        response = bedrock.invoke_model(
-            modelId="amazon.nova-pro-v1:0",
-            body=body
-        )
-
-        response_body = json.loads(response.get("body").read())
-        return response_body["output"]["message"]["content"][0]["text"]
+    Args:
+    query_filename (str): The user's query image: an upload handle (upload://...) or a local file path.
+    retrieved_filenames (list[str]): The filenames or URLs of the retrieved archival images.
 
+    Returns:
+    A per-candidate analysis with a relationship category for each candidate.
+    """
+    try:
+        if isinstance(retrieved_filenames, str):
+            retrieved_filenames = [f.strip().strip('"').strip("'") for f in retrieved_filenames.strip("[]").split(",") if f.strip()]
+        retrieved_filenames = list(dict.fromkeys(retrieved_filenames))
+        query_bytes, query_format = read_image_source(query_filename)
+        tier = tier_for("get_image_comparison")
+        if COMPARISON_MODE == "batched" and len(retrieved_filenames) > 1:
+            return compare_batched(query_bytes, query_format, retrieved_filenames, tier)
+        return compare_concurrent(query_bytes, query_format, retrieved_filenames, tier)
     except Exception as e:
-        return f"Error comparing {query_filename} and {retrieved_filename}: {str(e)}"
+        return f"Error comparing {query_filename} and {retrieved_filenames}: {str(e)}"
+
+def near_duplicate_match(query: str) -> dict | None:
+    """
+    Match the query image against the perceptual hash index of runway images.
+
+    Returns:
+        The index match plus the query image path and look number, or None when the query has no
+        readable image, no index is available or the image is not clearly a near-duplicate of a
+        single look. A match is only a candidate until confirm_near_duplicate accepts it.
+    """
+    index = get_phash_index()
+    if index is None:
+        return None
+    for image_path in IMAGE_PATH_PATTERN.findall(query):
+        if not image_source_exists(image_path):
+            continue
+        match = index.match(read_image_source(image_path)[0])
+        if match and look_of(match["key"]).isdigit():
+            match["query_image"] = image_path
+            match["look_number"] = int(look_of(match["key"]))
+            return match
+    return None
+
+def confirm_near_duplicate(match: dict) -> str | None:
+    """
+    Confirm a near-duplicate candidate with one side-by-side comparison against the matched image.
+
+    Returns:
+        The comparison when it judges the images a Direct match, otherwise None.
+    """
+    query_bytes, query_format = read_image_source(match["query_image"])
+    comparison = compare_pair(query_bytes, query_format, match["key"], tier_for("get_image_comparison"))
+    relation = first_relation(comparison)
+    if relation != "Direct match":
+        logger.info(f"Near-duplicate candidate {match['key']} not confirmed: {relation}")
+        return None
+    return comparison
+
+def near_duplicate_metadata(match: dict) -> str:
+    look = look_index.get(match["look_number"]) or {"items": [], "image_urls": []}
+    return json.dumps({
+        "look_number": match["look_number"],
+        "matched_image": get_cloudfront_url(match["key"]),
+        "look_images": look["image_urls"],
+        "items": look["items"],
+    }, default=str)
 
 @tool 
 def get_image_input(query: str) -> str:
@@ -270,17 +469,48 @@ def get_image_input(query: str) -> str:
     Returns:
     An answer to the query and image.
     """
+    synthesis_agent = Agent(model=bedrock_model,
+        system_prompt=SYNTHESIS_PROMPT, callback_handler=None)
+
+    if NEAR_DUPLICATE_SHORTCUT:
+        try:
+            match = near_duplicate_match(query)
+        except Exception as e:
+            logger.warning(f"Near-duplicate lookup failed, using full retrieval: {str(e)}")
+            match = None
+        if match:
+            logger.info(f"Near-duplicate candidate: {match}")
+            candidate = (f"The query image is a near-duplicate candidate ({match['variant']} region) of the official "
+                         f"runway image {match['key']} for look {match['look_number']}, by perceptual hash (pHash "
+                         f"distance {match['phash_distance']}/64, dHash distance {match['dhash_distance']}/64, "
+                         f"{match['margin']} closer than any other look).")
+            if NEAR_DUPLICATE_CONFIRM:
+                try:
+                    comparison = confirm_near_duplicate(match)
+                except Exception as e:
+                    logger.warning(f"Near-duplicate confirmation failed, using full retrieval: {str(e)}")
+                    comparison = None
+                if comparison:
+                    return synthesis_agent(f"Synthesize a final result for this query. "
+                                           f"Query: {query}"
+                                           f"Knowledge base metadata: {near_duplicate_metadata(match)}. "
+                                           f"Visual validation analysis: {candidate} A side-by-side comparison "
+                                           f"with that image found: {comparison}")
+            else:
+                return synthesis_agent(f"Synthesize a final result for this query. "
+                                       f"Query: {query}"
+                                       f"Knowledge base metadata: {near_duplicate_metadata(match)}. "
+                                       f"Visual validation analysis: {candidate} It has not been visually compared; "
+                                       f"treat it as a likely match, not a confirmed one.")
+
     limit_retrieve_hook = LimitToolCounts(max_tool_counts={"image_retrieve": 3, "get_cloudfront_url": 3})
-    limit_visual_hook = LimitToolCounts(max_tool_counts={"get_image_comparison": 3})
+    limit_visual_hook = LimitToolCounts(max_tool_counts={"get_image_comparisons": 2})
 
     retrieval_agent = Agent(model=bedrock_model,
         system_prompt=IMAGE_KB_PROMPT, tools=[image_retrieve, get_cloudfront_url, stop], hooks=[limit_retrieve_hook], plugins=[kb_handler], callback_handler=None)
 
     visual_agent = Agent(model=bedrock_model,
-        system_prompt=IMAGE_READER_PROMPT, tools=[get_image_comparison, stop], hooks=[limit_visual_hook], plugins=[comparison_handler], callback_handler=None)
-
-    synthesis_agent = Agent(model=bedrock_model,
-        system_prompt=SYNTHESIS_PROMPT, callback_handler=None)
+        system_prompt=IMAGE_READER_PROMPT, tools=[get_image_comparisons, stop], hooks=[limit_visual_hook], plugins=[comparison_handler], callback_handler=None)
 
     kb_results = retrieval_agent(f"From the image in the query, retrieve the best match image(s). "
                                  f"Query: {query}.")
@@ -1,8 +1,6 @@
 from strands import tool
 import os
-import boto3
 import json
-import base64
 from urllib.parse import urlparse
 import csv
 import io
@@ -11,8 +9,15 @@ import logging
 from strands import Agent, tool
 from strands.models import BedrockModel
 from strands_tools import retrieve, stop
-from src.agents.hooks import LimitToolCounts
+from src.tools.aws_clients import get_client
+from src.agents.hooks import LimitToolCounts, ToolInputCallback
 from src.agents.handlers import AgentSteeringHandler
+from src.tools.archive_tools.collection_inventory import look_index
+from src.tools.archive_tools.look_descriptions import COVERAGE_FIELDS, description_store, parse_description
+from src.tools.archive_tools.look_prefetch import LookPrefetcher, look_numbers_in_text
+from src.tools.image_cache import image_cache
+from src.tools.image_preprocessing import get_archive_images_base64, tier_for
+from src.tools.vision_cache import prompt_version, vision_cache, vision_cache_key
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -21,6 +26,7 @@ BUCKET_NAME = 'aw04-data'
 IMAGE_FOLDER = 'images/'
 FOLDER_PREFIX = 'looks/'
 CLOUDFRONT_DOMAIN = 'https://d39bzdkvoca64w.cloudfront.net'
+VISION_MODEL_ID = "amazon.nova-pro-v1:0"
 
 bedrock_model = BedrockModel(
     model_id="us.amazon.nova-2-lite-v1:0",
@@ -71,14 +77,51 @@ kb_handler = AgentSteeringHandler(
 )
 
 
+DESCRIPTION_PROMPT = DETAIL_PROMPT + """
+Output:
+Return only a JSON object, with no other text, in this form:
+{
+  "items": [
+    {
+      "garment": "type of garment or accessory",
+      "position": "where it is worn or layered",
+      "colors": ["single-word colors"],
+      "materials": ["visible materials or textures"],
+      "construction": "seams, cut, silhouette and other construction details",
+      "closures": "visible hardware, or the reasoned concealed closure",
+      "hem": "hem finish, turn-ups, raw edges or contrast lining",
+      "hardware": ["buttons, zippers, buckles, studs and other hardware"],
+      "details": ["any other notable details"]
+    }
+  ],
+  "jewelry": ["jewelry on wrists, fingers and neck; empty list if none"],
+  "layers": {"neckline": 0, "sleeve": 0},
+  "unclear": ["details that could not be determined from the images"]
+}
+List items top to bottom. Use null for a field that does not apply to an item.
+"""
+DESCRIPTION_QUERY = "Describe every visible item in this look in full detail."
+DESCRIPTION_TIER = "original"
+DESCRIPTION_MAX_TOKENS = 2500
+DESCRIPTION_VERSION = prompt_version(DESCRIPTION_PROMPT + DESCRIPTION_QUERY, VISION_MODEL_ID, DESCRIPTION_TIER)
+
+
+def has_current_description(look_number) -> bool:
+    look = look_index.get(look_number)
+    return bool(look) and description_store.get(look_number, DESCRIPTION_VERSION, look_image_etags(look)) is not None
+
+
+look_prefetcher = LookPrefetcher(look_index, is_described=has_current_description)
+
 VISUAL_PROMPT = """
 Role:
 Analyze look images for fit, silhouette, texture, and aesthetic details.
 
 Guidelines:
 Extract the look number from the retrieved results.
-Find the exact CloudFront URLs listed under "Image URLs:" in the retrieved results.
-Pass those exact URLs to get_image_details. Do NOT construct, modify, or guess filenames.
+First call get_look_description with the look number. It returns a structured description and the topics it covers.
+If the query's topic is listed under "Covers" and is not listed under "Unclear", answer from the description.
+Only if no description is available, the topic is not covered, or it is unclear, find the exact CloudFront URLs listed under "Image URLs:" in the retrieved results and pass those exact URLs to get_image_details. Do NOT construct, modify, or guess filenames.
 """
 
 visual_handler = AgentSteeringHandler(
@@ -116,7 +159,12 @@ def get_look_composition(look_number: str):
     Returns: 
     A JSON containing a list of every item in the requested look, and a list of image URLs for the look.
     """
-    s3 = boto3.client('s3', region_name=os.getenv("AWS_REGION"))
+    look = look_index.get(look_number)
+    if look and look["items"]:
+        return json.dumps({"items": look["items"], "image_filenames": look["image_urls"]}, ensure_ascii=False)
+
+    logger.info(f"Look {look_number} not in look index, falling back to S3")
+    s3 = get_client('s3')
     prefix = f"{IMAGE_FOLDER}look{look_number}_"
     image_objects = s3.list_objects_v2(
         Bucket=BUCKET_NAME, 
@@ -159,6 +207,115 @@ def parse_filenames_from_string(filenames_str):
     urls = [p.strip().strip('"').strip("'") for p in parts if p.strip()]
     return urls
 
+def look_image_etags(look: dict) -> dict[str, str | None]:
+    return {key: image_cache.etag(key) for key in look["image_keys"]}
+
+@tool
+def get_look_description(look_number: str):
+    """
+    Retrieve the precomputed visual description of a runway look.
+
+    Use this tool before get_image_details. The description lists every visible item with garment, position, colors, materials, construction, closures, hem, hardware and details, plus jewelry and layers, generated offline from the look's runway images.
+
+    Args:
+    look_number (str): The unique identifier for the look, e.g., "1".
+
+    Returns:
+    The topics the description covers, the details it could not determine, and the description as JSON; or a message stating that none is available.
+    """
+    look = look_index.get(look_number)
+    if not look or not look["image_keys"]:
+        return f"No precomputed description is available for Look {look_number}."
+
+    record = description_store.get(look_number, DESCRIPTION_VERSION, look_image_etags(look))
+    if not record:
+        logger.info(f"No current precomputed description for Look {look_number}")
+        return f"No precomputed description is available for Look {look_number}."
+
+    covered = record["coverage"]
+    missing = [topic for topic in list(COVERAGE_FIELDS) + ["jewelry", "layers"] if topic not in covered]
+    return (
+        f"Covers: {', '.join(covered) or 'none'}\n"
+        f"Not covered: {', '.join(missing) or 'none'}\n"
+        f"Unclear: {'; '.join(record['description']['unclear']) or 'none'}\n"
+        f"Description:\n{json.dumps(record['description'], ensure_ascii=False, indent=1)}"
+    )
+
+def describe_look(look: dict) -> dict:
+    """Run the structured description prompt over a look's images and parse the result."""
+    text = analyze_images(look["image_keys"], DESCRIPTION_QUERY, DESCRIPTION_TIER, DESCRIPTION_MAX_TOKENS,
+                          prompt=DESCRIPTION_PROMPT)
+    return parse_description(text)
+
+def analyze_images(image_keys: list[str], query: str, tier: str, max_new_tokens: int = 700,
+                   prompt: str = DETAIL_PROMPT) -> str:
+    """
+    Run a vision prompt (DETAIL_PROMPT by default) over archive images at the given resolution tier.
+
+    Images that cannot be fetched are skipped; raises if none could be fetched.
+    """
+    version = prompt_version(prompt + str(max_new_tokens), VISION_MODEL_ID, tier)
+    etags = [image_cache.etag(key) for key in image_keys]
+    if all(etags):
+        cached = vision_cache.get(vision_cache_key(VISION_MODEL_ID, version, etags, query))
+        if cached is not None:
+            logger.info(f"Vision cache hit: {vision_cache.stats()}")
+            return cached
+
+    bedrock = get_client('bedrock-runtime')
+    images = get_archive_images_base64(image_keys, tier)
+    logger.info(f"Image cache stats: {image_cache.stats()}")
+
+    if not images:
+        raise ValueError("none of the images could be fetched.")
+
+    cache_key = vision_cache_key(VISION_MODEL_ID, version, [image_cache.etag(key) for key in images], query)
+    if not all(etags):
+        cached = vision_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    content_blocks = []
+    for image_b64 in images.values():
+        content_blocks.append({
+            "image": {
+                "format": "jpeg",
+                "source": {
+                    "bytes": image_b64
+                }
+            }
+        })
+
+    content_blocks.append({
+        "text": prompt
+    })
+    content_blocks.append({
+        "text": f"Query: {query}"
+    })
+
+    body = json.dumps({
+        "inferenceConfig": {
+            "max_new_tokens": max_new_tokens,
+            "temperature": 0.0
+        },
+        "messages": [
+            {
+                "role": "user",
+                "content": content_blocks
+            }
+        ]
+    })
+
+    response = bedrock.invoke_model(
+        modelId=VISION_MODEL_ID,
+        body=body
+    )
+
+    response_body = json.loads(response.get("body").read())
+    text = response_body["output"]["message"]["content"][0]["text"]
+    vision_cache.put(cache_key, text)
+    return text
+
 @tool
 def get_image_details(image_filenames: list[str], query: str):
     """
@@ -173,8 +330,6 @@ def get_image_details(image_filenames: list[str], query: str):
     Returns:
     A structured textual analysis based only on confirmed visual observations.
     """
-    s3 = boto3.client('s3', region_name=os.getenv("AWS_REGION"))
-    bedrock = boto3.client('bedrock-runtime', region_name=os.getenv("AWS_REGION"))
     try:
         if not image_filenames:
             return "Error: No image filenames provided."
@@ -182,52 +337,10 @@ def get_image_details(image_filenames: list[str], query: str):
         if isinstance(image_filenames, str):
             image_filenames = parse_filenames_from_string(image_filenames)
 
-        content_blocks = []
-
-        for filename in image_filenames:
-            parsed = urlparse(filename)
-            clean_filename = os.path.basename(parsed.path)
-            image_key = f"images/{clean_filename}"
-
-            response = s3.get_object(Bucket=BUCKET_NAME, Key=image_key)
-            image_bytes = response['Body'].read()
-
-            content_blocks.append({
-                "image": {
-                    "format": "jpeg",
-                    "source": {
-                        "bytes": base64.b64encode(image_bytes).decode("utf-8")
-                    }
-                }
-            })
-
-        content_blocks.append({
-            "text": DETAIL_PROMPT
-        })
-        content_blocks.append({
-            "text": f"Query: {query}"
-        })
-
-        body = json.dumps({
-            "inferenceConfig": {
-                "max_new_tokens": 700,
-                "temperature": 0.0
-            },
-            "messages": [
-                {
-                    "role": "user",
-                    "content": content_blocks
-                }
-            ]
-        })
-
-        response = bedrock.invoke_model(
-            modelId="amazon.nova-pro-v1:0",
-            body=body
-        )
-
-        response_body = json.loads(response.get("body").read())
-        return response_body["output"]["message"]["content"][0]["text"]
+        image_keys = [f"{IMAGE_FOLDER}{os.path.basename(urlparse(filename).path)}" for filename in image_filenames]
+        tier = tier_for("get_image_details")
+        look_prefetcher.consume(image_keys, tier)
+        return analyze_images(image_keys, query, tier)
 
     except Exception as e:
         return f"Error analyzing images {image_filenames}: {str(e)}"
@@ -246,22 +359,30 @@ def get_look_analysis(query: str) -> str:
     A structured textual analysis.
     """
     limit_retrieve = LimitToolCounts(max_tool_counts={"retrieve": 3})
-    limit_image_details = LimitToolCounts(max_tool_counts={"get_image_details": 3})
+    limit_image_details = LimitToolCounts(max_tool_counts={"get_look_description": 3, "get_image_details": 3})
+
+    prefetch = look_prefetcher.session(tier_for("get_image_details"))
+    for look_number in look_numbers_in_text(query):
+        prefetch.prefetch_look(look_number)
+    prefetch_hook = ToolInputCallback("get_look_composition", lambda args: prefetch.prefetch_look(args.get("look_number")))
 
     kb_agent = Agent(model=bedrock_model,
-        system_prompt=KB_PROMPT, tools=[retrieve, get_look_composition, stop], hooks=[limit_retrieve], plugins=[kb_handler], callback_handler=None)
+        system_prompt=KB_PROMPT, tools=[retrieve, get_look_composition, stop], hooks=[limit_retrieve, prefetch_hook], plugins=[kb_handler], callback_handler=None)
     visual_agent = Agent(model=bedrock_model,
-        system_prompt=VISUAL_PROMPT, tools=[get_image_details, stop], hooks=[limit_image_details], plugins=[visual_handler], callback_handler=None)
+        system_prompt=VISUAL_PROMPT, tools=[get_look_description, get_image_details, stop], hooks=[limit_image_details], plugins=[visual_handler], callback_handler=None)
     synthesis_agent = Agent(model=bedrock_model,
         system_prompt=SYNTHESIS_PROMPT, callback_handler=None)
 
-    kb_results = kb_agent(f"Retrieve the look number and composition based on this query: "
-                          f"Query: {query}.")
-    if not str(kb_results).strip():
-        return "No matching look number found in the knowledge base."
-    visual_results = visual_agent(f"Answer the query based on the retrieved look number and composition. "
-                                  f"Query: {query}. "
-                                  f"Retrieved results: {str(kb_results)}.")
+    try:
+        kb_results = kb_agent(f"Retrieve the look number and composition based on this query: "
+                              f"Query: {query}.")
+        if not str(kb_results).strip():
+            return "No matching look number found in the knowledge base."
+        visual_results = visual_agent(f"Answer the query based on the retrieved look number and composition. "
+                                      f"Query: {query}. "
+                                      f"Retrieved results: {str(kb_results)}.")
+    finally:
+        prefetch.close()
     if not str(visual_results).strip():
         return "Visual analysis for this look is currently unavailable."
     response = synthesis_agent(f"Synthesize a final result for the query based on the visual and textual results. "
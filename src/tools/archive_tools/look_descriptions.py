@@ -0,0 +1,143 @@
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from threading import Lock
+
+from src.tools.aws_clients import get_client
+from src.tools.archive_tools.look_index import parse_look_number
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+BUCKET_NAME = 'aw04-data'
+DESCRIPTIONS_PREFIX = 'descriptions/'
+
+# Per-item fields of a structured description, and the look-level fields around them.
+ITEM_FIELDS = ["garment", "position", "colors", "materials", "construction", "closures", "hem", "hardware", "details"]
+LOOK_FIELDS = ["items", "jewelry", "layers", "unclear"]
+# Topics a description can answer, each backed by the fields that must be filled in for it.
+COVERAGE_FIELDS = {
+    "garments": ["garment"],
+    "colors": ["colors"],
+    "materials": ["materials"],
+    "construction": ["construction"],
+    "closures": ["closures"],
+    "hems": ["hem"],
+    "hardware": ["hardware"],
+    "details": ["details"],
+}
+
+
+def _filled(value) -> bool:
+    if isinstance(value, str):
+        return bool(value.strip()) and "unclear" not in value.lower()
+    if isinstance(value, (list, dict)):
+        return any(_filled(v) for v in (value.values() if isinstance(value, dict) else value))
+    return value is not None
+
+
+def parse_description(text: str) -> dict:
+    """
+    Parse the JSON object returned by the structured description prompt.
+
+    Raises:
+        ValueError: If the text holds no JSON object or it lacks the per-item fields.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("description is not a JSON object")
+    description = json.loads(match.group(0))
+    items = description.get("items")
+    if not isinstance(items, list) or not items:
+        raise ValueError("description has no items")
+    for item in items:
+        if not isinstance(item, dict) or not item.get("garment"):
+            raise ValueError(f"description item without a garment: {item}")
+    parsed = {field: description.get(field) for field in LOOK_FIELDS}
+    parsed["items"] = [{field: item.get(field) for field in ITEM_FIELDS} for item in items]
+    unclear = parsed["unclear"] or []
+    parsed["unclear"] = [unclear] if isinstance(unclear, str) else [str(u) for u in unclear]
+    return parsed
+
+
+def description_coverage(description: dict) -> list[str]:
+    """Topics the description answers: filled in for at least one item, or at look level for jewelry and layers."""
+    covered = [topic for topic, fields in COVERAGE_FIELDS.items()
+               if any(_filled(item.get(f)) for item in description["items"] for f in fields)]
+    covered += [field for field in ("jewelry", "layers") if description.get(field) is not None]
+    return covered
+
+
+class LookDescriptionStore:
+    """Precomputed structured per-look visual descriptions, versioned by prompt hash and image ETags."""
+
+    def __init__(self, bucket: str, prefix: str, s3_client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._s3 = s3_client
+        self._records = {}
+        self._lock = Lock()
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = get_client('s3')
+        return self._s3
+
+    def load(self) -> None:
+        records = {}
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                if not obj['Key'].endswith('.json'):
+                    continue
+                try:
+                    content = self.s3.get_object(Bucket=self.bucket, Key=obj['Key'])
+                    record = json.loads(content['Body'].read().decode('utf-8'))
+                    records[int(record['look_number'])] = record
+                except Exception as e:
+                    logger.error(f"Error reading {obj['Key']}: {str(e)}")
+        with self._lock:
+            self._records = records
+        logger.info(f"Loaded {len(records)} precomputed look descriptions")
+
+    def save(self, look_number: int, description: dict, version: str, image_etags: dict[str, str]) -> dict:
+        record = {
+            "look_number": look_number,
+            "version": version,
+            "image_etags": image_etags,
+            "description": description,
+            "coverage": description_coverage(description),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}look_{look_number}.json",
+            Body=json.dumps(record, ensure_ascii=False).encode('utf-8'),
+            ContentType='application/json',
+        )
+        with self._lock:
+            self._records[look_number] = record
+        return record
+
+    def get(self, look_number, version: str, image_etags: dict[str, str]) -> dict | None:
+        """
+        Return the stored description for a look if it is still current.
+
+        A record is current only if it was produced with the same prompt version and
+        the same image ETags, so re-shot or re-uploaded images invalidate it.
+        """
+        number = parse_look_number(look_number)
+        if number is None:
+            return None
+        with self._lock:
+            record = self._records.get(number)
+        if not record or record.get("version") != version:
+            return None
+        if record.get("image_etags") != image_etags:
+            return None
+        return record
+
+
+description_store = LookDescriptionStore(BUCKET_NAME, DESCRIPTIONS_PREFIX)
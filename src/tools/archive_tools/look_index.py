@@ -0,0 +1,84 @@
+import re
+import logging
+from threading import Lock
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Runway images are named look<number>_<suffix>, where the suffix is usually a sequence number
+# ('look3_2.jpg') but may be a name ('look3_back.jpg').
+LOOK_IMAGE_PATTERN = re.compile(r'look(\d+)_([^/.]*)')
+
+
+def parse_look_number(look_number) -> int | None:
+    """Normalize inputs such as 5, "5", " look 5 " or "Look5" to an int."""
+    clean_id = str(look_number).strip().lower().replace('look', '').strip()
+    if not clean_id.isdigit():
+        return None
+    return int(clean_id)
+
+
+def image_sort_key(key: str):
+    """Order by look, then numbered images by number, then images with a named suffix by key."""
+    match = LOOK_IMAGE_PATTERN.search(key.split('/')[-1])
+    if not match:
+        return (float('inf'), 1, 0, key)
+    suffix = match.group(2)
+    if not suffix.isdigit():
+        return (int(match.group(1)), 1, 0, key)
+    return (int(match.group(1)), 0, int(suffix), key)
+
+
+class LookIndex:
+    """In-memory look number -> item rows and runway images, shared by the archive tools."""
+
+    def __init__(self, cloudfront_domain: str):
+        self.cloudfront_domain = cloudfront_domain
+        self._looks = {}
+        self._lock = Lock()
+
+    def build(self, items: list[dict], image_keys: list[str]) -> None:
+        """
+        Rebuild the index from collection rows and S3 image keys.
+
+        Args:
+            items: Collection rows, each carrying an int 'Look Number'.
+            image_keys: S3 keys under the image folder, e.g. 'images/look3_2.jpg'.
+        """
+        looks = {}
+        for row in items:
+            look = looks.setdefault(row['Look Number'], {"items": [], "image_keys": []})
+            look["items"].append({k: v for k, v in row.items() if k != 'Look Number'})
+
+        for key in image_keys:
+            if not key.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            match = LOOK_IMAGE_PATTERN.search(key.split('/')[-1])
+            if not match:
+                continue
+            look = looks.setdefault(int(match.group(1)), {"items": [], "image_keys": []})
+            look["image_keys"].append(key)
+
+        for look in looks.values():
+            look["image_keys"].sort(key=image_sort_key)
+            look["image_urls"] = [f"{self.cloudfront_domain}/{key}" for key in look["image_keys"]]
+
+        with self._lock:
+            self._looks = looks
+        logger.info(f"Look index built: {len(looks)} looks, {sum(len(l['image_keys']) for l in looks.values())} images")
+
+    def get(self, look_number) -> dict | None:
+        number = parse_look_number(look_number)
+        if number is None:
+            return None
+        with self._lock:
+            return self._looks.get(number)
+
+    def look_numbers(self) -> list[int]:
+        with self._lock:
+            return sorted(self._looks)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._looks)
@@ -0,0 +1,119 @@
+import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from src.tools.archive_tools.look_index import parse_look_number
+from src.tools.image_preprocessing import get_archive_image_base64
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Prefetches run on their own small pool so speculative fetches never hold fetch_pool workers
+# (or more than this many S3 connections) that foreground image fetches are waiting for.
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="look-prefetch")
+
+LOOK_NUMBER_PATTERN = re.compile(r'\blook\s*(?:#|no\.?|number)?\s*(\d{1,2})\b', re.IGNORECASE)
+
+
+def look_numbers_in_text(text: str) -> list[int]:
+    return list(dict.fromkeys(int(n) for n in LOOK_NUMBER_PATTERN.findall(text or "")))
+
+
+class PrefetchSession:
+    """Tracks the images speculatively prefetched for one get_look_analysis call."""
+
+    def __init__(self, prefetcher: "LookPrefetcher", tier: str):
+        self._prefetcher = prefetcher
+        self.tier = tier
+        self.prefetched = set()
+        self.used = set()
+        self.looks = set()
+
+    def prefetch_look(self, look_number) -> None:
+        self._prefetcher.prefetch_look(self, look_number)
+
+    def close(self) -> None:
+        self._prefetcher.close(self)
+
+
+class LookPrefetcher:
+    """Warms a look's preprocessed images in the background as soon as its look number is known."""
+
+    def __init__(self, look_index, is_described=None):
+        """
+        Args:
+            look_index: LookIndex the look images are read from.
+            is_described: Optional callable taking a look number; looks for which it returns True
+                (e.g. a current precomputed description exists) are not prefetched.
+        """
+        self.look_index = look_index
+        self.is_described = is_described
+        self._sessions = []
+        self._lock = Lock()
+        self._stats = {"prefetched": 0, "described": 0, "hits": 0, "misses": 0, "wasted": 0}
+
+    def session(self, tier: str) -> PrefetchSession:
+        session = PrefetchSession(self, tier)
+        with self._lock:
+            self._sessions.append(session)
+        return session
+
+    def prefetch_look(self, session: PrefetchSession, look_number) -> None:
+        look_number = parse_look_number(look_number)
+        look = self.look_index.get(look_number) if look_number is not None else None
+        if not look:
+            return
+        with self._lock:
+            if look_number in session.looks:
+                return
+            session.looks.add(look_number)
+        if self.is_described is not None and self.is_described(look_number):
+            with self._lock:
+                self._stats["described"] += 1
+            logger.info(f"Skipping prefetch for Look {look_number}: current description available")
+            return
+        with self._lock:
+            keys = [key for key in look["image_keys"] if key not in session.prefetched]
+            session.prefetched.update(keys)
+            self._stats["prefetched"] += len(keys)
+
+        for key in keys:
+            prefetch_pool.submit(self._warm, key, session.tier)
+        logger.info(f"Prefetching {len(keys)} images for Look {look_number} at tier {session.tier}")
+
+    @staticmethod
+    def _warm(key: str, tier: str) -> None:
+        try:
+            get_archive_image_base64(key, tier)
+        except Exception as e:
+            logger.warning(f"Prefetch of {key} failed: {str(e)}")
+
+    def consume(self, keys: list[str], tier: str) -> None:
+        """Record that a vision call used these images, crediting any open session that prefetched them."""
+        with self._lock:
+            for key in keys:
+                sessions = [s for s in self._sessions if s.tier == tier and key in s.prefetched]
+                for s in sessions:
+                    s.used.add(key)
+                if sessions:
+                    self._stats["hits"] += 1
+                else:
+                    self._stats["misses"] += 1
+
+    def close(self, session: PrefetchSession) -> None:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+                self._stats["wasted"] += len(session.prefetched - session.used)
+        logger.info(f"Prefetch stats: {self.stats()}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["waste_rate"] = round(stats["wasted"] / stats["prefetched"], 4) if stats["prefetched"] else 0.0
+        return stats
@@ -0,0 +1,233 @@
+import io
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from threading import Lock
+
+import numpy as np
+from PIL import Image
+
+from src.tools.aws_clients import get_client
+from src.tools.archive_tools.look_index import LOOK_IMAGE_PATTERN
+from src.tools.archive_tools.vector_index import BUCKET_NAME, ROOT_DIR, VECTOR_INDEX_PREFIX
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+PHASH_INDEX_PATH = os.getenv("PHASH_INDEX_PATH", os.path.join(ROOT_DIR, "data", "phash_index.json"))
+PHASH_INDEX_FILE = "phash_index.json"
+# Hamming distances out of 64 bits; both hashes must be within their limit for a near-duplicate.
+# Runway photos share framing and backdrop, so the limits are tight; tune them with
+# scripts/benchmark_near_duplicates.py.
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "6"))
+DHASH_MAX_DISTANCE = int(os.getenv("DHASH_MAX_DISTANCE", "8"))
+# How much closer (combined pHash + dHash distance) the best match must be than the closest image
+# of any other look.
+PHASH_MIN_MARGIN = int(os.getenv("PHASH_MIN_MARGIN", "10"))
+
+# Regions of each runway image that are hashed, as (left, top, right, bottom) fractions,
+# so that common crops of the official photos also match.
+CROP_VARIANTS = {
+    "full": (0.0, 0.0, 1.0, 1.0),
+    "center": (0.125, 0.125, 0.875, 0.875),
+    "top": (0.0, 0.0, 1.0, 0.5),
+    "bottom": (0.0, 0.5, 1.0, 1.0),
+}
+
+_DCT_SIZE = 32
+_HASH_SIZE = 8
+_dct_matrix = np.array([
+    [np.cos(np.pi * (2 * x + 1) * u / (2 * _DCT_SIZE)) for x in range(_DCT_SIZE)]
+    for u in range(_DCT_SIZE)
+], dtype=np.float64)
+
+
+def _grayscale(image: Image.Image, size: tuple[int, int]) -> np.ndarray:
+    return np.asarray(image.convert("L").resize(size, Image.LANCZOS), dtype=np.float64)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+
+def phash(image: Image.Image) -> int:
+    """64-bit DCT hash: low-frequency 8x8 DCT coefficients of a 32x32 grayscale copy against their median."""
+    pixels = _grayscale(image, (_DCT_SIZE, _DCT_SIZE))
+    low = (_dct_matrix @ pixels @ _dct_matrix.T)[:_HASH_SIZE, :_HASH_SIZE]
+    return _bits_to_int(low > np.median(low))
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit gradient hash: whether each pixel of a 9x8 grayscale copy is brighter than its left neighbour."""
+    pixels = _grayscale(image, (_HASH_SIZE + 1, _HASH_SIZE))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def image_hashes(image_bytes: bytes) -> dict[str, dict[str, str]]:
+    """pHash and dHash (hex) for every crop variant of an image."""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.load()
+        width, height = img.size
+        hashes = {}
+        for variant, (left, top, right, bottom) in CROP_VARIANTS.items():
+            region = img.crop((int(left * width), int(top * height), int(right * width), int(bottom * height)))
+            hashes[variant] = {"phash": f"{phash(region):016x}", "dhash": f"{dhash(region):016x}"}
+    return hashes
+
+
+def look_of(key: str) -> str:
+    match = LOOK_IMAGE_PATTERN.search(key.split('/')[-1])
+    return match.group(1) if match else key
+
+
+def _hamming(hashes: np.ndarray, value: int) -> np.ndarray:
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class PerceptualHashIndex:
+    """
+    Near-duplicate lookup of runway images by perceptual hash.
+
+    Each image contributes one row per crop variant. A query is hashed once (uncropped) and
+    matched against every row; it is a near-duplicate candidate when both its pHash and dHash
+    distances to a row are within the limits, the best rows point at a single look, and that
+    look is clearly closer than every other look (by at least the minimum margin).
+    """
+
+    def __init__(self, keys: list[str], variants: list[str], phashes: np.ndarray, dhashes: np.ndarray, info: dict):
+        self.keys = keys
+        self.variants = variants
+        self.phashes = phashes
+        self.dhashes = dhashes
+        self.info = info
+        self.looks = np.array([look_of(key) for key in keys])
+
+    def __len__(self) -> int:
+        return len(set(self.keys))
+
+    @classmethod
+    def build(cls, path: str, hashes: dict[str, dict[str, dict[str, str]]], **info) -> "PerceptualHashIndex":
+        """
+        Write the index to `path` as JSON.
+
+        Args:
+            hashes: Image key -> image_hashes() output.
+        """
+        rows = [
+            {"key": key, "variant": variant, **values}
+            for key in sorted(hashes)
+            for variant, values in hashes[key].items()
+        ]
+        sidecar = {
+            **info,
+            "crop_variants": list(CROP_VARIANTS),
+            "count": len(hashes),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "rows": rows,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(sidecar, f)
+        os.replace(tmp_path, path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str) -> "PerceptualHashIndex":
+        with open(path) as f:
+            sidecar = json.load(f)
+        rows = sidecar.pop("rows")
+        return cls(
+            keys=[r["key"] for r in rows],
+            variants=[r["variant"] for r in rows],
+            phashes=np.array([int(r["phash"], 16) for r in rows], dtype=np.uint64),
+            dhashes=np.array([int(r["dhash"], 16) for r in rows], dtype=np.uint64),
+            info=sidecar,
+        )
+
+    def match(self, image_bytes: bytes, max_phash: int = PHASH_MAX_DISTANCE, max_dhash: int = DHASH_MAX_DISTANCE,
+              min_margin: int = PHASH_MIN_MARGIN) -> dict | None:
+        """
+        Returns:
+            {"key", "variant", "phash_distance", "dhash_distance", "margin"} for the closest
+            near-duplicate candidate, where margin is how much closer it is than the nearest image of
+            any other look; or None when nothing is within the limits, the closest rows disagree
+            on the look, or another look is within the margin.
+        """
+        if not self.keys:
+            return None
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.load()
+            query_phash, query_dhash = phash(img), dhash(img)
+        return self.match_hashes(query_phash, query_dhash, max_phash, max_dhash, min_margin)
+
+    def match_hashes(self, query_phash: int, query_dhash: int, max_phash: int = PHASH_MAX_DISTANCE,
+                     max_dhash: int = DHASH_MAX_DISTANCE, min_margin: int = PHASH_MIN_MARGIN) -> dict | None:
+        """match() for an already hashed query."""
+        phash_distances = _hamming(self.phashes, query_phash)
+        dhash_distances = _hamming(self.dhashes, query_dhash)
+        within = np.flatnonzero((phash_distances <= max_phash) & (dhash_distances <= max_dhash))
+        if not len(within):
+            return None
+
+        scores = phash_distances + dhash_distances
+        best = within[scores[within] == scores[within].min()]
+        looks = set(self.looks[best])
+        if len(looks) > 1:
+            logger.info(f"Perceptual hash match is ambiguous between looks {sorted(looks)}")
+            return None
+        i = int(best[0])
+        others = scores[self.looks != self.looks[i]]
+        margin = int(others.min() - scores[i]) if len(others) else 128
+        if margin < min_margin:
+            logger.info(f"Perceptual hash match for look {self.looks[i]} is only {margin} closer than another look")
+            return None
+        return {
+            "key": self.keys[i],
+            "variant": self.variants[i],
+            "phash_distance": int(phash_distances[i]),
+            "dhash_distance": int(dhash_distances[i]),
+            "margin": margin,
+        }
+
+
+def upload_phash_index(path: str, bucket: str = BUCKET_NAME, prefix: str = VECTOR_INDEX_PREFIX, s3_client=None) -> None:
+    s3 = s3_client or get_client('s3')
+    s3.upload_file(path, bucket, f"{prefix}{PHASH_INDEX_FILE}")
+
+
+def download_phash_index(path: str, bucket: str = BUCKET_NAME, prefix: str = VECTOR_INDEX_PREFIX, s3_client=None) -> None:
+    s3 = s3_client or get_client('s3')
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    s3.download_file(bucket, f"{prefix}{PHASH_INDEX_FILE}", tmp_path)
+    os.replace(tmp_path, path)
+
+
+_phash_index = None
+_phash_index_loaded = False
+_phash_index_lock = Lock()
+
+
+def get_phash_index() -> PerceptualHashIndex | None:
+    """
+    Open the perceptual hash index once per process, downloading it from S3 if it is not on disk.
+
+    Returns None when no index is available, so callers skip the near-duplicate shortcut.
+    """
+    global _phash_index, _phash_index_loaded
+    with _phash_index_lock:
+        if _phash_index_loaded:
+            return _phash_index
+        _phash_index_loaded = True
+        try:
+            if not os.path.exists(PHASH_INDEX_PATH):
+                download_phash_index(PHASH_INDEX_PATH)
+            _phash_index = PerceptualHashIndex.open(PHASH_INDEX_PATH)
+            logger.info(f"Loaded perceptual hash index: {len(_phash_index)} images")
+        except Exception as e:
+            logger.warning(f"Perceptual hash index unavailable, near-duplicate shortcut disabled: {str(e)}")
+            _phash_index = None
+        return _phash_index
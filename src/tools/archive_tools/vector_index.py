@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from threading import Lock
+
+import numpy as np
+
+from src.tools.aws_clients import get_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", os.path.join(ROOT_DIR, "data", "vector_index"))
+BUCKET_NAME = 'aw04-data'
+VECTOR_INDEX_PREFIX = 'vector_index/'
+
+VECTOR_INDEX_RERANK = os.getenv("VECTOR_INDEX_RERANK", "true").lower() == "true"
+
+VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "metadata.json"
+QUANTIZED_FILES = {"float32": None, "int8": "vectors.i8", "binary": "vectors.bin"}
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def truncate_dimension(matrix: np.ndarray, dimension: int) -> np.ndarray:
+    """
+    Keep the leading `dimension` components and re-normalize.
+
+    Nova multimodal embeddings are trained so that prefixes of the 3072-dim vector remain usable
+    embeddings (1024/384/256), which lets an existing index be shrunk without re-embedding.
+    """
+    if dimension > matrix.shape[1]:
+        raise ValueError(f"Cannot truncate {matrix.shape[1]}-dim vectors to {dimension}")
+    return normalize_rows(np.asarray(matrix[:, :dimension], dtype=np.float32))
+
+
+class LocalVectorIndex:
+    """
+    Cosine top-k over memory-mapped unit-norm vectors, optionally searched through a quantized copy.
+
+    Files:
+        vectors.f32: row-major float32 matrix, one row per vector. Used for exact search and re-ranking;
+            quantized indexes built without it are smaller but cannot re-rank.
+        vectors.i8 / vectors.bin: int8 or sign-bit quantized copy, when quantization is enabled.
+        metadata.json: dimension, quantization, keys and per-vector metadata, in row order.
+
+    With quantization, candidates are scored on the quantized copy; with rerank, the best
+    top_k * rerank_factor candidates are re-scored exactly against the float32 rows, which the
+    memory map only pages in for those candidates.
+    """
+
+    def __init__(self, path: str, vectors: np.ndarray | None, keys: list[str], metadata: list[dict], info: dict,
+                 quantized: np.ndarray | None = None):
+        self.path = path
+        self.vectors = vectors
+        self.quantized = quantized
+        self.keys = keys
+        self.metadata = metadata
+        self.info = info
+
+    @property
+    def dimension(self) -> int:
+        return self.info["dimension"]
+
+    @property
+    def has_float32(self) -> bool:
+        return self.vectors is not None
+
+    def disk_bytes(self) -> int:
+        """Total size of the index files on disk, metadata sidecar included."""
+        names = index_files(self.quantization, self.has_float32) + [METADATA_FILE]
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in names)
+
+    @property
+    def quantization(self) -> str:
+        return self.info.get("quantization", "float32")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, path: str, keys: list[str], vectors, metadata: list[dict], dimension: int | None = None,
+              quantization: str = "float32", keep_float32: bool = True, **info) -> "LocalVectorIndex":
+        """
+        Normalize the vectors and write the matrix, its quantized copy and the metadata sidecar to `path`.
+
+        Args:
+            dimension: Truncate vectors to this many leading components. Keeps all when None.
+            quantization: 'float32', 'int8' or 'binary'.
+            keep_float32: Also write vectors.f32 for a quantized index, which re-ranking needs.
+                Without it only the quantized copy is stored, shipped and mapped.
+        """
+        if quantization not in QUANTIZED_FILES:
+            raise ValueError(f"Unknown quantization '{quantization}'")
+        keep_float32 = keep_float32 or quantization == "float32"
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        if matrix.ndim != 2 or matrix.shape[0] != len(keys) or len(keys) != len(metadata):
+            raise ValueError("keys, vectors and metadata must have the same length")
+        if dimension:
+            matrix = truncate_dimension(matrix, dimension)
+
+        os.makedirs(path, exist_ok=True)
+        files = {VECTORS_FILE: matrix} if keep_float32 else {}
+        if quantization == "int8":
+            max_abs = float(np.abs(matrix).max()) or 1.0
+            info["int8_scale"] = 127.0 / max_abs
+            files[QUANTIZED_FILES["int8"]] = np.round(matrix * info["int8_scale"]).astype(np.int8)
+        elif quantization == "binary":
+            files[QUANTIZED_FILES["binary"]] = np.packbits(matrix > 0, axis=1)
+
+        for name, array in files.items():
+            tmp_path = os.path.join(path, f"{name}.tmp")
+            array.tofile(tmp_path)
+            os.replace(tmp_path, os.path.join(path, name))
+        if not keep_float32 and os.path.exists(os.path.join(path, VECTORS_FILE)):
+            os.remove(os.path.join(path, VECTORS_FILE))
+
+        sidecar = {
+            **info,
+            "dimension": int(matrix.shape[1]),
+            "quantization": quantization,
+            "float32_vectors": keep_float32,
+            "count": len(keys),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "keys": keys,
+            "metadata": metadata,
+        }
+        tmp_metadata = os.path.join(path, f"{METADATA_FILE}.tmp")
+        with open(tmp_metadata, "w") as f:
+            json.dump(sidecar, f)
+        os.replace(tmp_metadata, os.path.join(path, METADATA_FILE))
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str) -> "LocalVectorIndex":
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            sidecar = json.load(f)
+        keys = sidecar.pop("keys")
+        metadata = sidecar.pop("metadata")
+        count, dimension = sidecar["count"], sidecar["dimension"]
+        vectors = None
+        if sidecar.get("float32_vectors", True):
+            vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dimension))
+
+        quantized = None
+        quantization = sidecar.get("quantization", "float32")
+        if quantization == "int8":
+            quantized = np.memmap(os.path.join(path, QUANTIZED_FILES["int8"]), dtype=np.int8, mode="r", shape=(count, dimension))
+        elif quantization == "binary":
+            quantized = np.memmap(os.path.join(path, QUANTIZED_FILES["binary"]), dtype=np.uint8, mode="r",
+                                  shape=(count, (dimension + 7) // 8))
+        return cls(path, vectors, keys, metadata, sidecar, quantized)
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        if self.quantization == "int8":
+            return (self.quantized @ query) / self.info["int8_scale"]
+        if self.quantization == "binary":
+            query_bits = np.packbits(query > 0)
+            hamming = np.unpackbits(np.bitwise_xor(self.quantized, query_bits), axis=1).sum(axis=1)
+            # Sign-bit (SimHash) estimate of the angle between the vectors.
+            return np.cos(np.pi * hamming / self.dimension).astype(np.float32)
+        return self.vectors @ query
+
+    def query(self, vector, top_k: int, rerank: bool = True, rerank_factor: int = 4) -> list[dict]:
+        """
+        Cosine search; exact for float32 indexes and for re-ranked quantized searches. Quantized
+        indexes built without float32 vectors are never re-ranked.
+
+        Returns:
+            Up to top_k results shaped like s3vectors query_vectors output:
+            {"key", "distance", "metadata"}, with distance = 1 - cosine similarity.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape[0] > self.dimension:
+            query = query[:self.dimension]
+        if query.shape != (self.dimension,):
+            raise ValueError(f"Query has dimension {query.shape}, index has {self.dimension}")
+        norm = np.linalg.norm(query)
+        if norm == 0 or top_k <= 0 or not len(self):
+            return []
+        query = query / norm
+
+        scores = self._approximate_scores(query)
+        quantized = self.quantization != "float32"
+        rerank = rerank and self.has_float32
+        candidates = min(len(scores), top_k * rerank_factor if quantized and rerank else top_k)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        if quantized and rerank:
+            scores = np.asarray(self.vectors[top]) @ query
+            order = np.argsort(-scores)[:top_k]
+            ranked = zip(top[order], scores[order])
+        else:
+            top = top[np.argsort(-scores[top])][:top_k]
+            ranked = zip(top, scores[top])
+        return [
+            {"key": self.keys[i], "distance": float(1.0 - score), "metadata": self.metadata[i]}
+            for i, score in ranked
+        ]
+
+
+def index_files(quantization: str, float32_vectors: bool = True) -> list[str]:
+    return [name for name in (VECTORS_FILE if float32_vectors else None, QUANTIZED_FILES[quantization]) if name]
+
+
+def sidecar_files(sidecar: dict) -> list[str]:
+    return index_files(sidecar.get("quantization", "float32"), sidecar.get("float32_vectors", True))
+
+
+def upload_index(path: str, bucket: str = BUCKET_NAME, prefix: str = VECTOR_INDEX_PREFIX, s3_client=None) -> None:
+    s3 = s3_client or get_client('s3')
+    with open(os.path.join(path, METADATA_FILE)) as f:
+        files = sidecar_files(json.load(f))
+    for name in files + [METADATA_FILE]:
+        s3.upload_file(os.path.join(path, name), bucket, f"{prefix}{name}")
+
+
+def download_index(path: str, bucket: str = BUCKET_NAME, prefix: str = VECTOR_INDEX_PREFIX, s3_client=None) -> None:
+    s3 = s3_client or get_client('s3')
+    os.makedirs(path, exist_ok=True)
+    tmp_metadata = os.path.join(path, f"{METADATA_FILE}.tmp")
+    s3.download_file(bucket, f"{prefix}{METADATA_FILE}", tmp_metadata)
+    with open(tmp_metadata) as f:
+        files = sidecar_files(json.load(f))
+    for name in files:
+        tmp_path = os.path.join(path, f"{name}.tmp")
+        s3.download_file(bucket, f"{prefix}{name}", tmp_path)
+        os.replace(tmp_path, os.path.join(path, name))
+    os.replace(tmp_metadata, os.path.join(path, METADATA_FILE))
+
+
+_local_index = None
+_local_index_loaded = False
+_local_index_lock = Lock()
+
+
+def get_local_index(embedding_dimension: int | None = None) -> LocalVectorIndex | None:
+    """
+    Open the local index once per process, downloading it from S3 if it is not on disk.
+
+    Args:
+        embedding_dimension: Dimension of the query embeddings. An index with more dimensions than
+            the queries is refused, since every query against it would fail.
+
+    Returns None when no index is available, so callers can fall back to s3vectors.
+    """
+    global _local_index, _local_index_loaded
+    with _local_index_lock:
+        if _local_index_loaded:
+            return _local_index
+        _local_index_loaded = True
+        try:
+            if not os.path.exists(os.path.join(VECTOR_INDEX_PATH, METADATA_FILE)):
+                download_index(VECTOR_INDEX_PATH)
+            _local_index = LocalVectorIndex.open(VECTOR_INDEX_PATH)
+            if embedding_dimension and _local_index.dimension > embedding_dimension:
+                logger.error(f"Local vector index has dimension {_local_index.dimension} but query embeddings have "
+                             f"{embedding_dimension}; rebuild it with scripts/export_vector_index.py --dimension")
+                _local_index = None
+                return None
+            logger.info(f"Loaded local vector index: {len(_local_index)} vectors, dim {_local_index.dimension}")
+        except Exception as e:
+            logger.warning(f"Local vector index unavailable, using s3vectors: {str(e)}")
+            _local_index = None
+        return _local_index
@@ -0,0 +1,63 @@
+import logging
+import os
+from threading import Lock
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Connections per client; sized above the image fetch (IMAGE_FETCH_WORKERS), comparison
+# (COMPARISON_WORKERS) and prefetch pools that share each client, so threads never queue for one.
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "32"))
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "4"))
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "30"))
+# Vision and long text generations on Bedrock routinely take longer than a storage call.
+AWS_BEDROCK_READ_TIMEOUT = float(os.getenv("AWS_BEDROCK_READ_TIMEOUT", "120"))
+
+READ_TIMEOUTS = {
+    "bedrock-runtime": AWS_BEDROCK_READ_TIMEOUT,
+    "bedrock-agentcore": AWS_BEDROCK_READ_TIMEOUT,
+}
+
+_clients = {}
+_session = None
+_lock = Lock()
+
+
+def client_config(service: str) -> Config:
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        retries={"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS},
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUTS.get(service, AWS_READ_TIMEOUT),
+        tcp_keepalive=True,
+    )
+
+
+def get_client(service: str, region_name: str | None = None):
+    """
+    The process-wide boto3 client for a service and region, created once with tuned pooling,
+    adaptive retries and timeouts. boto3 clients are thread-safe, so every tool, hook and worker
+    thread shares the same client and its warm connection pool.
+
+    Args:
+        service: boto3 service name, e.g. 's3', 'bedrock-runtime', 's3vectors'.
+        region_name: Defaults to AWS_REGION.
+    """
+    region_name = region_name or os.getenv("AWS_REGION")
+    key = (service, region_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    global _session
+    with _lock:
+        if key not in _clients:
+            # Sessions are not thread-safe; clients are only created under the lock.
+            if _session is None:
+                _session = boto3.session.Session()
+            _clients[key] = _session.client(service, region_name=region_name, config=client_config(service))
+            logger.info(f"Created {service} client for {region_name}")
+        return _clients[key]
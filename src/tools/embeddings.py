@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from threading import Lock
+
+import numpy as np
+
+from src.tools import record_replay
+from src.tools.aws_clients import get_client
+from src.tools.image_preprocessing import encode_image_bytes
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+EMBEDDING_MODEL_ID = "amazon.nova-2-multimodal-embeddings-v1:0"
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "3072"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(tempfile.gettempdir(), "dh-agent", "embedding_cache.sqlite"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+
+
+def embedding_cache_key(image_bytes: bytes, model_id: str, dimension: int, tier: str) -> str:
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{digest}:{model_id}:{dimension}:{tier}"
+
+
+class EmbeddingCache:
+    """Entry-bounded SQLite cache of image embeddings keyed by content hash, model, dimension and tier."""
+
+    def __init__(self, path: str | None, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._conn = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"Embedding cache disabled, could not open {path}: {str(e)}")
+                self._conn = None
+
+    def get(self, key: str) -> list[float] | None:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE embeddings SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._stats["hits"] += 1
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put(self, key: str, embedding: list[float]) -> None:
+        if self._conn is None:
+            return
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, accessed) VALUES (?, ?, ?)",
+                (key, blob, time.time()),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed ASC LIMIT ?)",
+                    (excess,),
+                )
+                self._stats["evictions"] += excess
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+embedding_cache = EmbeddingCache(record_replay.persistent_path(EMBEDDING_CACHE_PATH or None), EMBEDDING_CACHE_MAX_ENTRIES)
+
+
+def get_image_embedding(image_bytes: bytes, image_format: str, tier: str = "original",
+                        dimension: int = EMBEDDING_DIM, bedrock=None) -> list[float]:
+    """
+    Embed an image with Nova multimodal embeddings, reusing cached embeddings of identical bytes.
+
+    Args:
+        image_bytes: Raw image bytes as uploaded or stored in S3.
+        image_format: 'jpeg', 'png', 'gif' or 'webp'.
+        tier: Preprocessing tier applied before embedding; part of the cache key.
+        dimension: Embedding dimension requested from the model.
+        bedrock: bedrock-runtime client. Created when not given.
+    """
+    key = embedding_cache_key(image_bytes, EMBEDDING_MODEL_ID, dimension, tier)
+    cached = embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    image_b64, image_format = encode_image_bytes(image_bytes, image_format, tier)
+    body = json.dumps({
+        "schemaVersion": "nova-multimodal-embed-v1",
+        "taskType": "SINGLE_EMBEDDING",
+        "singleEmbeddingParams": {
+            "embeddingPurpose": "IMAGE_RETRIEVAL",
+            "embeddingDimension": dimension,
+            "image": {
+                "detailLevel": "STANDARD_IMAGE",
+                "format": image_format,
+                "source": {
+                    "bytes": image_b64
+                }
+            }
+        }
+    })
+
+    bedrock = bedrock or get_client('bedrock-runtime')
+    response = bedrock.invoke_model(
+        modelId=EMBEDDING_MODEL_ID,
+        body=body,
+        accept="application/json",
+        contentType="application/json"
+    )
+    embedding = json.loads(response["body"].read())["embeddings"][0]["embedding"]
+    embedding_cache.put(key, embedding)
+    return embedding
@@ -0,0 +1,277 @@
+import base64
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Lock, get_ident
+
+from src.tools import record_replay
+from src.tools.aws_clients import get_client
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+BUCKET_NAME = 'aw04-data'
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR")
+IMAGE_CACHE_DISK_MAX_BYTES = int(os.getenv("IMAGE_CACHE_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+IMAGE_FETCH_WORKERS = int(os.getenv("IMAGE_FETCH_WORKERS", "8"))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+
+fetch_pool = ThreadPoolExecutor(max_workers=IMAGE_FETCH_WORKERS, thread_name_prefix="image-fetch")
+
+
+class ImageCache:
+    """Byte-bounded LRU of S3 image objects keyed by (key, ETag), with an optional disk tier."""
+
+    def __init__(self, bucket: str, max_bytes: int, disk_dir: str | None = None, disk_max_bytes: int = 0, s3_client=None):
+        """
+        Initializer.
+
+        Args:
+            bucket: S3 bucket the image keys belong to.
+            max_bytes: Memory budget for raw bytes plus their base64 encoding.
+            disk_dir: Directory for the on-disk tier. Disabled when None.
+            disk_max_bytes: Size limit of the on-disk tier; oldest files are removed first.
+            s3_client: boto3 S3 client. Created lazily when not given.
+        """
+        self.bucket = bucket
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._s3 = s3_client
+        self._entries = OrderedDict()
+        self._etags = {}
+        self._inflight = {}
+        self._size = 0
+        self._lock = Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = get_client('s3')
+        return self._s3
+
+    def register_etags(self, etags: dict[str, str]) -> None:
+        """Record the current ETag per key, e.g. from a list_objects_v2 listing."""
+        with self._lock:
+            self._etags.update({key: etag.strip('"') for key, etag in etags.items()})
+
+    def etag(self, key: str) -> str | None:
+        with self._lock:
+            return self._etags.get(key)
+
+    def get_bytes(self, key: str) -> bytes:
+        return self._get(key)["bytes"]
+
+    def get_base64(self, key: str) -> str:
+        return self._encode(key, self._get(key))
+
+    def get_variant_base64(self, key: str, variant: str, transform) -> str:
+        """
+        Return a derived version of an image (e.g. a resized tier), computing it at most once per ETag.
+
+        Args:
+            key: S3 key of the source image.
+            variant: Name of the derived version, part of the cache key.
+            transform: Callable mapping the source bytes to the variant bytes.
+        """
+        with self._lock:
+            etag = self._etags.get(key)
+            variant_key = (key, f"{etag}:{variant}")
+            entry = self._entries.get(variant_key) if etag else None
+            if entry is not None:
+                self._entries.move_to_end(variant_key)
+                self._stats["hits"] += 1
+                self._stats["bytes_saved"] += len(entry["bytes"])
+        if entry is not None:
+            return self._encode(key, entry)
+
+        return self._encode(key, self._single_flight(("variant", key, variant), lambda: self._load_variant(key, variant, transform)))
+
+    def _load_variant(self, key: str, variant: str, transform) -> dict:
+        source = self._get(key)
+        variant_etag = f"{source['etag']}:{variant}"
+        data = self._read_disk(key, variant_etag)
+        if data is None:
+            data = transform(source["bytes"])
+            self._write_disk(key, variant_etag, data)
+        return self._put(key, variant_etag, data)
+
+    def _encode(self, key: str, entry: dict) -> str:
+        with self._lock:
+            if entry["b64"] is None:
+                entry["b64"] = base64.b64encode(entry["bytes"]).decode("utf-8")
+                if (key, entry["etag"]) in self._entries:
+                    self._size += len(entry["b64"])
+                    self._evict()
+            return entry["b64"]
+
+    def get_many_base64(self, keys: list[str], timeout: float = IMAGE_FETCH_TIMEOUT, fetch=None) -> dict[str, str]:
+        """
+        Fetch several images concurrently on the shared fetch pool.
+
+        Args:
+            keys: S3 keys to fetch.
+            timeout: Deadline in seconds for the whole batch.
+            fetch: Callable mapping a key to its base64 payload. Defaults to get_base64.
+
+        Returns:
+            A dict of key -> base64 for the images that arrived before the deadline,
+            in the order of `keys`. Missing or failed images are skipped.
+        """
+        futures = {key: fetch_pool.submit(fetch or self.get_base64, key) for key in dict.fromkeys(keys)}
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for key, future in futures.items():
+            if not future.done():
+                logger.warning(f"Image fetch for {key} missed the {timeout}s deadline, skipping")
+                continue
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logger.warning(f"Image fetch for {key} failed, skipping: {str(e)}")
+        return results
+
+    def _get(self, key: str) -> dict:
+        with self._lock:
+            etag = self._etags.get(key)
+            entry = self._entries.get((key, etag)) if etag else None
+            if entry is not None:
+                self._entries.move_to_end((key, etag))
+                self._stats["hits"] += 1
+                self._stats["bytes_saved"] += len(entry["bytes"])
+                return entry
+
+        return self._single_flight(("source", key), lambda: self._load(key, etag))
+
+    def _single_flight(self, token: tuple, load):
+        """Run `load` once per token at a time; concurrent callers (e.g. a prefetch and the real call) share the result."""
+        with self._lock:
+            future = self._inflight.get(token)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[token] = future
+        if not owner:
+            return future.result()
+
+        try:
+            result = load()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(token, None)
+
+    def _load(self, key: str, etag: str | None) -> dict:
+        if etag:
+            data = self._read_disk(key, etag)
+            if data is not None:
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                    self._stats["bytes_saved"] += len(data)
+                return self._put(key, etag, data)
+
+        response = self.s3.get_object(Bucket=self.bucket, Key=key)
+        data = response['Body'].read()
+        etag = response.get('ETag', '').strip('"') or hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._stats["misses"] += 1
+            self._etags[key] = etag
+        self._write_disk(key, etag, data)
+        return self._put(key, etag, data)
+
+    def _put(self, key: str, etag: str, data: bytes) -> dict:
+        entry = {"etag": etag, "bytes": data, "b64": None}
+        with self._lock:
+            existing = self._entries.pop((key, etag), None)
+            if existing is not None:
+                self._size -= self._entry_size(existing)
+            self._entries[(key, etag)] = entry
+            self._size += len(data)
+            self._evict()
+        return entry
+
+    @staticmethod
+    def _entry_size(entry: dict) -> int:
+        return len(entry["bytes"]) + len(entry["b64"] or "")
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._entry_size(evicted)
+            self._stats["evictions"] += 1
+
+    def _disk_path(self, key: str, etag: str) -> str:
+        digest = hashlib.sha256(f"{key}:{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.bin")
+
+    def _read_disk(self, key: str, etag: str) -> bytes | None:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key, etag)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Image cache disk read failed for {key}: {str(e)}")
+            return None
+
+    def _write_disk(self, key: str, etag: str, data: bytes) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key, etag)
+        try:
+            tmp_path = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._trim_disk()
+        except Exception as e:
+            logger.error(f"Image cache disk write failed for {key}: {str(e)}")
+
+    def _trim_disk(self) -> None:
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".bin"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["memory_bytes"] = self._size
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+image_cache = ImageCache(
+    bucket=BUCKET_NAME,
+    max_bytes=IMAGE_CACHE_MAX_BYTES,
+    disk_dir=record_replay.persistent_path(IMAGE_CACHE_DIR),
+    disk_max_bytes=IMAGE_CACHE_DISK_MAX_BYTES,
+)
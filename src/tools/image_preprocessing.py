@@ -0,0 +1,86 @@
+import io
+import os
+import base64
+import logging
+
+from PIL import Image
+
+from src.tools.image_cache import image_cache
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# long_edge=None keeps the original image untouched.
+IMAGE_TIERS = {
+    "small": {"long_edge": 512, "quality": 80},
+    "medium": {"long_edge": 1024, "quality": 85},
+    "original": {"long_edge": None, "quality": None},
+}
+
+# Tier used by each tool. Fine construction details (closures, hems, jewelry) need more pixels
+# than judging whether two looks are related. Retrieval queries must be embedded at the tier the
+# vector index was populated with (scripts/populate_image_vectors.py reads the same setting), and
+# IMAGE_RETRIEVE_MAX_DISTANCE was tuned on original-tier embeddings.
+TOOL_TIERS = {
+    "get_image_details": os.getenv("IMAGE_TIER_DETAILS", "medium"),
+    "get_image_comparison": os.getenv("IMAGE_TIER_COMPARISON", "small"),
+    "image_retrieve": os.getenv("IMAGE_TIER_RETRIEVAL", "original"),
+}
+
+
+def tier_for(tool_name: str) -> str:
+    tier = TOOL_TIERS.get(tool_name, "original")
+    if tier not in IMAGE_TIERS:
+        logger.warning(f"Unknown image tier '{tier}' for {tool_name}, using original")
+        return "original"
+    return tier
+
+
+def resize_image(image_bytes: bytes, tier: str) -> bytes:
+    """
+    Downscale an image so its long edge fits the tier and re-encode it as JPEG.
+
+    Images already within the tier's long edge are re-encoded only if they are not JPEG.
+    """
+    spec = IMAGE_TIERS[tier]
+    if spec["long_edge"] is None:
+        return image_bytes
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        if max(img.size) <= spec["long_edge"] and img.format == "JPEG":
+            return image_bytes
+        img = img.convert("RGB")
+        img.thumbnail((spec["long_edge"], spec["long_edge"]), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=spec["quality"], optimize=True)
+        return out.getvalue()
+
+
+def get_archive_image_base64(image_key: str, tier: str) -> str:
+    """Base64 of an archive image at the given tier, served from the shared image cache."""
+    if IMAGE_TIERS[tier]["long_edge"] is None:
+        return image_cache.get_base64(image_key)
+    return image_cache.get_variant_base64(image_key, tier, lambda data: resize_image(data, tier))
+
+
+def get_archive_images_base64(image_keys: list[str], tier: str) -> dict[str, str]:
+    """Concurrently fetch several archive images at the given tier, skipping failures."""
+    return image_cache.get_many_base64(image_keys, fetch=lambda key: get_archive_image_base64(key, tier))
+
+
+def encode_image_bytes(image_bytes: bytes, image_format: str, tier: str) -> tuple[str, str]:
+    """
+    Preprocess a user-supplied image for a model call.
+
+    Returns:
+        The base64 payload and its format ('jpeg' once resized).
+    """
+    if IMAGE_TIERS[tier]["long_edge"] is None:
+        return base64.b64encode(image_bytes).decode("utf-8"), image_format
+    try:
+        resized = resize_image(image_bytes, tier)
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, sending original: {str(e)}")
+        return base64.b64encode(image_bytes).decode("utf-8"), image_format
+    image_format = image_format if resized is image_bytes else "jpeg"
+    return base64.b64encode(resized).decode("utf-8"), image_format
@@ -0,0 +1,161 @@
+import io
+import logging
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from threading import Lock
+
+from PIL import Image
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_IMAGES = int(os.getenv("UPLOAD_MAX_IMAGES", "4"))
+# Uploads larger than this are spooled to a temporary file instead of being kept in memory.
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(4 * 1024 * 1024)))
+
+UPLOAD_SCHEME = "upload://"
+UPLOAD_FORMATS = {"JPEG": "jpeg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+UPLOAD_HANDLE_PATTERN = re.compile(r"upload://[0-9a-f]{32}\.(?:jpeg|png|gif|webp)")
+
+
+class UploadError(ValueError):
+    """Raised when an uploaded image is rejected; `status_code` is the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadedImage:
+    """An uploaded image held for the duration of one request, addressed by its handle."""
+
+    def __init__(self, handle: str, filename: str, image_format: str, data: bytes):
+        self.handle = handle
+        self.filename = filename
+        self.format = image_format
+        self.size = len(data)
+        self._buffer = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+        self._buffer.write(data)
+        self._lock = Lock()
+
+    def read(self) -> bytes:
+        with self._lock:
+            self._buffer.seek(0)
+            return self._buffer.read()
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+class ImageUploadStore:
+    """
+    Process-wide registry of request-scoped image uploads.
+
+    Tools receive an opaque handle such as 'upload://<hex>.jpeg' in place of a file path and
+    read the bytes back through the store, so image queries work on any worker without placing
+    files on its disk. Handles are released when their request scope exits.
+    """
+
+    def __init__(self, max_bytes: int, max_images: int):
+        self.max_bytes = max_bytes
+        self.max_images = max_images
+        self._uploads = {}
+        self._lock = Lock()
+
+    def add(self, data: bytes, filename: str = "") -> UploadedImage:
+        if not data:
+            raise UploadError(f"Uploaded image '{filename}' is empty.")
+        if len(data) > self.max_bytes:
+            raise UploadError(f"Uploaded image '{filename}' is {len(data)} bytes; the limit is {self.max_bytes}.", 413)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                pil_format = img.format
+                img.verify()
+        except Exception:
+            raise UploadError(f"Uploaded file '{filename}' is corrupted or not a valid image.", 415)
+        if pil_format not in UPLOAD_FORMATS:
+            raise UploadError(f"Unsupported image format '{pil_format}'. Use PNG, JPEG, GIF or WebP.", 415)
+
+        image_format = UPLOAD_FORMATS[pil_format]
+        upload = UploadedImage(f"{UPLOAD_SCHEME}{uuid.uuid4().hex}.{image_format}", filename, image_format, data)
+        with self._lock:
+            self._uploads[upload.handle] = upload
+        return upload
+
+    def get(self, handle: str) -> UploadedImage | None:
+        with self._lock:
+            return self._uploads.get(str(handle).strip())
+
+    def release(self, handles: list[str]) -> None:
+        with self._lock:
+            uploads = [self._uploads.pop(handle, None) for handle in handles]
+        for upload in uploads:
+            if upload is not None:
+                upload.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._uploads)
+
+    @contextmanager
+    def request_scope(self, images: list[tuple[bytes, str]]):
+        """
+        Register a request's uploads and release them when the request finishes.
+
+        Args:
+            images: (data, filename) pairs.
+
+        Yields:
+            The UploadedImage objects, in order.
+        """
+        if len(images) > self.max_images:
+            raise UploadError(f"At most {self.max_images} images can be uploaded per request.", 413)
+        uploads = []
+        try:
+            for data, filename in images:
+                uploads.append(self.add(data, filename))
+            yield uploads
+        finally:
+            self.release([upload.handle for upload in uploads])
+
+
+upload_store = ImageUploadStore(UPLOAD_MAX_BYTES, UPLOAD_MAX_IMAGES)
+
+
+def is_upload_handle(value) -> bool:
+    return str(value).strip().startswith(UPLOAD_SCHEME)
+
+
+def image_source_exists(source) -> bool:
+    """True when `source` is a live upload handle or an existing local file."""
+    if not source:
+        return False
+    if is_upload_handle(source):
+        return upload_store.get(source) is not None
+    return os.path.exists(str(source))
+
+
+def read_image_source(source: str) -> tuple[bytes, str]:
+    """
+    Read a query image given either an upload handle or a local file path.
+
+    Returns:
+        (image bytes, Bedrock image format: 'jpeg', 'png', 'gif' or 'webp').
+    """
+    source = str(source).strip()
+    if is_upload_handle(source):
+        upload = upload_store.get(source)
+        if upload is None:
+            raise FileNotFoundError(f"Upload {source} is not available; it may belong to a finished request.")
+        return upload.read(), upload.format
+
+    with open(source, "rb") as f:
+        image_bytes = f.read()
+    image_format = source.split('.')[-1].lower()
+    if image_format == 'jpg':
+        image_format = 'jpeg'
+    return image_bytes, image_format
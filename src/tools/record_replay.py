@@ -0,0 +1,310 @@
+import base64
+import datetime
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import time
+from threading import Lock
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# 'off', 'record' (call the real services and save each response) or 'replay' (serve saved responses, no network).
+REPLAY_MODE = os.getenv("REPLAY_MODE", "off").strip().lower()
+REPLAY_CASSETTE_DIR = os.getenv("REPLAY_CASSETTE_DIR", os.path.join(ROOT_DIR, "data", "cassettes"))
+# boto3 service names and PooledHttpClient names that are recorded and replayed.
+REPLAY_SERVICES = [s.strip() for s in os.getenv(
+    "REPLAY_SERVICES", "bedrock-runtime,bedrock-agent-runtime,s3,s3vectors,tavily,liveness"
+).split(",") if s.strip()]
+# Replay latency: 'recorded', 'none', 'fixed:<s>', 'uniform:<min>,<max>' or 'lognormal:<median>,<sigma>'.
+# REPLAY_LATENCY_<SERVICE> (e.g. REPLAY_LATENCY_BEDROCK_RUNTIME) overrides it per service.
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "recorded")
+REPLAY_SEED = os.getenv("REPLAY_SEED", "0")
+# Largest HTTP body stored per interaction; liveness pages only need their first few hundred KB.
+REPLAY_MAX_BODY_BYTES = int(os.getenv("REPLAY_MAX_BODY_BYTES", str(1024 * 1024)))
+
+# Never written to cassettes.
+REDACTED_FIELDS = {"api_key", "Authorization", "authorization"}
+
+
+class ReplayMissError(RuntimeError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+def _encode(value):
+    """JSON-safe form of a boto3 response, reading streaming bodies into bytes."""
+    from botocore.response import StreamingBody
+
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, StreamingBody):
+        return {"__stream__": base64.b64encode(value.read()).decode("ascii")}
+    return value
+
+
+def _decode(value):
+    from botocore.response import StreamingBody
+
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    if "__datetime__" in value:
+        return datetime.datetime.fromisoformat(value["__datetime__"])
+    if "__stream__" in value:
+        data = base64.b64decode(value["__stream__"])
+        return StreamingBody(io.BytesIO(data), len(data))
+    return {k: _decode(v) for k, v in value.items()}
+
+
+def _digest(value):
+    """Stable JSON form of request parameters for keying; bytes are replaced by their hash."""
+    if isinstance(value, dict):
+        return {k: _digest(v) for k, v in sorted(value.items()) if k not in REDACTED_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [_digest(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(bytes(value)).hexdigest()}
+    if hasattr(value, "read"):
+        return {"stream": type(value).__name__}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def latency_spec(service: str) -> str:
+    return os.getenv(f"REPLAY_LATENCY_{service.upper().replace('-', '_')}", REPLAY_LATENCY).strip().lower()
+
+
+def sample_latency(spec: str, recorded: float, rng: random.Random) -> float:
+    kind, _, args = spec.partition(":")
+    values = [float(a) for a in args.split(",") if a.strip()]
+    if kind == "none":
+        return 0.0
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return rng.lognormvariate(math.log(values[0]), values[1])
+    return recorded
+
+
+class Cassettes:
+    """
+    Recorded service interactions, one JSON file per distinct request under
+    <dir>/<service>/<operation>/<key>.json.
+    """
+
+    def __init__(self, directory: str, mode: str):
+        self.directory = directory
+        self.mode = mode
+        self._lock = Lock()
+        self._calls = {}
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    def key(self, service: str, operation: str, request) -> tuple[str, dict]:
+        summary = {"service": service, "operation": operation, "request": _digest(request)}
+        raw = json.dumps(summary, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest(), summary
+
+    def _path(self, service: str, operation: str, key: str) -> str:
+        return os.path.join(self.directory, service, operation.strip("/").replace("/", "_") or "root", f"{key}.json")
+
+    def save(self, service: str, operation: str, key: str, summary: dict, response, latency_s: float,
+             stream_s: float = 0.0) -> None:
+        path = self._path(service, operation, key)
+        record = {**summary, "response": response, "latency_s": round(latency_s, 4), "stream_s": round(stream_s, 4),
+                  "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._stats["recorded"] += 1
+        except Exception as e:
+            logger.error(f"Could not record {service}.{operation} to {path}: {str(e)}")
+
+    def load(self, service: str, operation: str, key: str) -> dict:
+        path = self._path(service, operation, key)
+        if not os.path.exists(path):
+            with self._lock:
+                self._stats["misses"] += 1
+            raise ReplayMissError(f"No recording for {service}.{operation} ({key[:12]}) in {self.directory}")
+        with open(path) as f:
+            record = json.load(f)
+        with self._lock:
+            self._stats["replayed"] += 1
+        return record
+
+    def delay(self, service: str, key: str, record: dict) -> tuple[float, float]:
+        """Replay delays (to response, spread over the stream) sampled deterministically per key and call."""
+        with self._lock:
+            count = self._calls[key] = self._calls.get(key, 0) + 1
+        rng = random.Random(f"{REPLAY_SEED}:{key}:{count}")
+        recorded = record.get("latency_s", 0.0) + record.get("stream_s", 0.0)
+        total = sample_latency(latency_spec(service), recorded, rng)
+        share = record.get("latency_s", 0.0) / recorded if recorded else 1.0
+        return total * share, total * (1 - share)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+cassettes = Cassettes(REPLAY_CASSETTE_DIR, REPLAY_MODE)
+
+
+def active(service: str) -> bool:
+    return REPLAY_MODE in ("record", "replay") and service in REPLAY_SERVICES
+
+
+def persistent_path(path: str | None) -> str | None:
+    """
+    `path` for an on-disk cache, index or learned-stats file, or None under record/replay. These stores
+    outlive a run: a cache warmed by the recording would skip calls on replay, and stats learned from it
+    would plan different ones. With them off, a replay sends exactly the requests that were recorded.
+    """
+    return None if REPLAY_MODE in ("record", "replay") else path
+
+
+def seeded_random(name: str) -> random.Random:
+    """A generator seeded from REPLAY_SEED under record/replay, so both runs draw the same values."""
+    return random.Random(f"{REPLAY_SEED}:{name}") if REPLAY_MODE in ("record", "replay") else random.Random()
+
+
+def _replayed_events(events: list, stream_s: float):
+    pause = stream_s / len(events) if events else 0.0
+    for event in events:
+        if pause:
+            time.sleep(pause)
+        yield event
+
+
+def _recording_events(stream, on_done):
+    events = []
+    start = time.perf_counter()
+    for event in stream:
+        events.append(event)
+        yield event
+    on_done(events, time.perf_counter() - start)
+
+
+def attach(client) -> None:
+    """Record or replay every call made by a boto3 client, via botocore's before-call short-circuit."""
+    from botocore.awsrequest import AWSResponse
+
+    service = client.meta.service_model.service_name
+
+    def before_parameter_build(params, model, context, **kwargs):
+        context["replay_key"], context["replay_summary"] = cassettes.key(service, model.name, params)
+        context["replay_start"] = time.perf_counter()
+
+    def before_call(model, context, **kwargs):
+        if REPLAY_MODE != "replay":
+            return None
+        key = context["replay_key"]
+        record = cassettes.load(service, model.name, key)
+        response_delay, stream_delay = cassettes.delay(service, key, record)
+        time.sleep(response_delay)
+        parsed = _decode(record["response"]["parsed"])
+        if isinstance(parsed.get("stream"), list):
+            parsed["stream"] = _replayed_events(parsed["stream"], stream_delay)
+        return AWSResponse("", record["response"]["status_code"], {}, None), parsed
+
+    def after_call(http_response, parsed, model, context, **kwargs):
+        if REPLAY_MODE != "record" or "replay_key" not in context:
+            return
+        latency = time.perf_counter() - context["replay_start"]
+        key, summary = context["replay_key"], context["replay_summary"]
+        status = http_response.status_code
+
+        if "stream" in parsed and hasattr(parsed["stream"], "__iter__") and not isinstance(parsed["stream"], list):
+            def done(events, stream_s):
+                response = {"status_code": status, "parsed": _encode({**parsed, "stream": events})}
+                cassettes.save(service, model.name, key, summary, response, latency, stream_s)
+            parsed["stream"] = _recording_events(parsed["stream"], done)
+            return
+
+        encoded = _encode(parsed)
+        cassettes.save(service, model.name, key, summary, {"status_code": status, "parsed": encoded}, latency)
+        for field, value in parsed.items():
+            if isinstance(encoded.get(field), dict) and "__stream__" in encoded[field]:
+                parsed[field] = _decode(encoded[field])
+
+    client.meta.events.register("before-parameter-build", before_parameter_build)
+    client.meta.events.register("before-call", before_call)
+    client.meta.events.register("after-call", after_call)
+
+
+def http_call(service: str, method: str, url: str, kwargs: dict, send):
+    """
+    Record or replay one PooledHttpClient request. `send` performs the real request and returns an
+    httpx.Response; in replay mode it is never called.
+    """
+    import httpx
+
+    key, summary = cassettes.key(service, method, {"url": url, **{k: v for k, v in kwargs.items() if k != "headers"}})
+    operation = httpx.URL(url).host
+    if REPLAY_MODE == "replay":
+        record = cassettes.load(service, operation, key)
+        response_delay, _ = cassettes.delay(service, key, record)
+        time.sleep(response_delay)
+        stored = record["response"]
+        return httpx.Response(stored["status_code"], headers=stored["headers"], content=base64.b64decode(stored["body"]),
+                              request=httpx.Request(method, stored["url"]))
+
+    start = time.perf_counter()
+    response = send()
+    body = response.read()[:REPLAY_MAX_BODY_BYTES]
+    stored = {
+        "status_code": response.status_code,
+        "url": str(response.url),
+        "headers": {k: v for k, v in response.headers.items() if k.lower() in ("content-type", "retry-after", "location")},
+        "body": base64.b64encode(body).decode("ascii"),
+    }
+    cassettes.save(service, operation, key, summary, stored, time.perf_counter() - start)
+    return response
+
+
+def install() -> None:
+    """
+    Route every boto3 client created from now on through the cassettes, including clients created
+    inside libraries such as strands' BedrockModel. No-op unless REPLAY_MODE is 'record' or 'replay'.
+    """
+    if REPLAY_MODE not in ("record", "replay"):
+        return
+    import boto3.session
+
+    if getattr(boto3.session.Session.client, "_record_replay", False):
+        return
+    if REPLAY_MODE == "replay":
+        # Endpoint resolution needs a region even though no request is sent.
+        os.environ.setdefault("AWS_DEFAULT_REGION", os.getenv("AWS_REGION", "us-east-1"))
+
+    original_client = boto3.session.Session.client
+
+    def client(self, *args, **kwargs):
+        created = original_client(self, *args, **kwargs)
+        if active(created.meta.service_model.service_name):
+            attach(created)
+        return created
+
+    client._record_replay = True
+    boto3.session.Session.client = client
+    logger.info(f"Record/replay {REPLAY_MODE} for {REPLAY_SERVICES} using {REPLAY_CASSETTE_DIR}")
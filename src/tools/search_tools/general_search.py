@@ -2,7 +2,9 @@ from strands import tool
 import json
 import logging
 import os
-import urllib.request
+from src.tools.search_tools.http_client import tavily_post
+from src.tools.search_tools.search_cache import search_cache, search_cache_key
+from src.tools.search_tools.search_compaction import compact_for_model
 
 log_level = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
 logging.basicConfig(format="[%(asctime)s] %(levelname)s - %(message)s")
@@ -10,7 +12,6 @@ logger = logging.getLogger(__name__)
 logger.setLevel(log_level)
 
 AWS_REGION = os.getenv("AWS_REGION")
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
 @tool
 def general_search(query: str) -> str:
@@ -23,26 +24,31 @@ def general_search(query: str) -> str:
     query (str): A search query.
 
     Returns:
-    Raw JSON search results from the search API. 
+    Compact JSON search results (title, URL, prices, date and a short snippet per result).
     Return "Research failed." if the request is unsuccessful.
     """
     collection_context = "Dior Homme AW04"
     enriched_query = f"{collection_context} {query}"
 
-    url = "https://api.tavily.com/search"
-    headers = {"Content-Type": "application/json"}
     payload = {
-        "api_key": TAVILY_API_KEY,
         "query": enriched_query,
         "search_depth": "advanced",
         "max_results": 5
     }
 
+    def fetch():
+        return json.dumps(tavily_post("search", payload))
+
+    key = search_cache_key("search", enriched_query, depth=payload["search_depth"], max_results=payload["max_results"])
     try:
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=data, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            return response.read().decode("utf-8")
+        result = search_cache.cached_call(key, "editorial", fetch)
+        logger.info(f"Search cache stats: {search_cache.stats()}")
     except Exception as e:
         logger.error(f"Tavily request failed: {e}")
-        return "Research failed."
\ No newline at end of file
+        return "Research failed."
+
+    try:
+        results = json.loads(result).get("results", [])
+    except (ValueError, AttributeError):
+        return result
+    return json.dumps(compact_for_model("general_search", results), ensure_ascii=False)
\ No newline at end of file
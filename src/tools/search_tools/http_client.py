@@ -0,0 +1,173 @@
+import importlib.util
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlparse
+
+import httpx
+
+from src.tools import record_replay
+
+log_level = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
+logging.basicConfig(format="[%(asctime)s] %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+logger.setLevel(log_level)
+
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.com")
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+# Requests in flight per host; callers queue for a slot rather than opening more connections.
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "9"))
+# Retries after the first attempt, with full-jitter exponential backoff from HTTP_RETRY_BACKOFF seconds.
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+HTTP_RETRY_MAX_WAIT = float(os.getenv("HTTP_RETRY_MAX_WAIT", "4"))
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# HTTP/2 needs the optional h2 package; without it the client uses HTTP/1.1 keep-alive.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Latency samples kept per host for percentiles.
+LATENCY_SAMPLES = 500
+
+
+class PooledHttpClient:
+    """
+    Shared httpx client with keep-alive pooling, connect and read timeouts, a per-host concurrency
+    limit, bounded retries with jitter, and per-host latency metrics.
+    """
+
+    def __init__(self, name: str, per_host_limit: int = HTTP_PER_HOST_LIMIT, max_retries: int = HTTP_MAX_RETRIES,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT, read_timeout: float = HTTP_READ_TIMEOUT,
+                 max_connections: int = HTTP_MAX_CONNECTIONS, **client_kwargs):
+        self.name = name
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.client = httpx.Client(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=HTTP2_AVAILABLE,
+            **client_kwargs,
+        )
+        self._lock = Lock()
+        self._host_limits = {}
+        self._metrics = {}
+
+    def _host_limit(self, host: str) -> BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    def _record(self, host: str, elapsed: float, status: int | None, attempt: int) -> None:
+        with self._lock:
+            metrics = self._metrics.setdefault(host, {"calls": 0, "errors": 0, "retries": 0, "latencies": []})
+            metrics["calls"] += 1
+            metrics["retries"] += int(attempt > 1)
+            metrics["errors"] += int(status is None or status >= 400)
+            metrics["latencies"] = (metrics["latencies"] + [elapsed])[-LATENCY_SAMPLES:]
+
+    @staticmethod
+    def _backoff(attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), HTTP_RETRY_MAX_WAIT)
+        return random.uniform(0, min(HTTP_RETRY_BACKOFF * 2 ** (attempt - 1), HTTP_RETRY_MAX_WAIT))
+
+    def request(self, method: str, url: str, deadline: float | None = None, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying timeouts, connection errors and retryable statuses up to max_retries
+        times. The final response is returned whatever its status; the final exception is raised.
+
+        Args:
+            deadline: time.perf_counter() value by which the call must return. Each attempt's timeout
+                is cut to the time left and no retry starts after it, so the calling thread is free
+                by then.
+        """
+        if record_replay.active(self.name):
+            return record_replay.http_call(self.name, method, url, kwargs,
+                                           lambda: self._request(method, url, deadline, **kwargs))
+        return self._request(method, url, deadline, **kwargs)
+
+    def _request(self, method: str, url: str, deadline: float | None = None, **kwargs) -> httpx.Response:
+        host = urlparse(url).hostname or ""
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            start = time.perf_counter()
+            if deadline is not None:
+                remaining = deadline - start
+                if remaining <= 0:
+                    raise httpx.TimeoutException(f"Deadline passed before {method} {host}{urlparse(url).path}")
+                timeout = self.client.timeout
+                kwargs["timeout"] = httpx.Timeout(min(timeout.read, remaining), connect=min(timeout.connect, remaining))
+            try:
+                with self._host_limit(host):
+                    response = self.client.request(method, url, **kwargs)
+                error = None
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                error = e
+            elapsed = time.perf_counter() - start
+            status = response.status_code if response is not None else None
+            self._record(host, elapsed, status, attempt)
+            logger.info(f"{self.name} {method} {host}{urlparse(url).path} -> {status or type(error).__name__} "
+                        f"in {elapsed:.3f}s (attempt {attempt})")
+
+            retryable = error is not None or status in RETRY_STATUSES
+            backoff = self._backoff(attempt, response)
+            out_of_time = deadline is not None and time.perf_counter() + backoff >= deadline
+            if not retryable or attempt > self.max_retries or out_of_time:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(backoff)
+
+    def post_json(self, url: str, payload: dict, deadline: float | None = None) -> dict:
+        response = self.request("POST", url, deadline=deadline, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs):
+        """Stream a response under the per-host limit, without retries, recording its latency to the headers."""
+        if record_replay.active(self.name):
+            yield record_replay.http_call(self.name, method, url, kwargs,
+                                          lambda: self.client.request(method, url, **kwargs))
+            return
+        host = urlparse(url).hostname or ""
+        start = time.perf_counter()
+        status = None
+        try:
+            with self._host_limit(host):
+                with self.client.stream(method, url, **kwargs) as response:
+                    status = response.status_code
+                    self._record(host, time.perf_counter() - start, status, 1)
+                    yield response
+        finally:
+            if status is None:
+                self._record(host, time.perf_counter() - start, None, 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = {h: {**m, "latencies": sorted(m["latencies"])} for h, m in self._metrics.items()}
+        stats = {}
+        for host, m in metrics.items():
+            latencies = m.pop("latencies")
+            m["p50_s"] = round(latencies[len(latencies) // 2], 3) if latencies else 0.0
+            m["p95_s"] = round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3) if latencies else 0.0
+            stats[host] = m
+        return stats
+
+
+tavily_http = PooledHttpClient("tavily", headers={"Content-Type": "application/json"})
+
+
+def tavily_post(endpoint: str, payload: dict, deadline: float | None = None) -> dict:
+    """POST to a Tavily API endpoint (e.g. 'search', 'extract') over the shared client and return its JSON."""
+    return tavily_http.post_json(f"{TAVILY_API_URL}/{endpoint}", {"api_key": os.getenv("TAVILY_API_KEY"), **payload},
+                                 deadline=deadline)
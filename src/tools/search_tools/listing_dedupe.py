@@ -0,0 +1,184 @@
+import logging
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Title similarity (Jaccard over word and character-trigram shingles) above which two listings on
+# the same marketplace are treated as one physical listing (a relist).
+DEDUPE_TITLE_SIMILARITY = float(os.getenv("DEDUPE_TITLE_SIMILARITY", "0.85"))
+# Image URLs two results must share to be one listing. A single shared image is often a placeholder
+# or a stock photo reused across listings.
+DEDUPE_MIN_SHARED_IMAGES = int(os.getenv("DEDUPE_MIN_SHARED_IMAGES", "2"))
+
+MOBILE_PREFIXES = ("www.", "m.", "mobile.", "sp.", "page.")
+LOCALE_SEGMENT = re.compile(r"^(?:[a-z]{2}(?:[-_][a-z]{2})?)$")
+
+# Marketplace -> (host suffixes, regex extracting the listing id from the path, canonical URL format).
+MARKETPLACES = {
+    "ebay": (("ebay.com", "ebay.co.uk", "ebay.de", "ebay.fr", "ebay.it", "ebay.com.au", "ebay.ca"),
+             re.compile(r"/itm/(?:[^/]+/)?(\d{9,})"), "https://www.ebay.com/itm/{id}"),
+    "grailed": (("grailed.com",), re.compile(r"/listings/(\d+)"), "https://www.grailed.com/listings/{id}"),
+    "mercari": (("mercari.com",), re.compile(r"/(?:item|jp)/(m\d+)"), "https://jp.mercari.com/item/{id}"),
+    "yahoo_auctions": (("auctions.yahoo.co.jp",), re.compile(r"/auction/([a-z]?\d+)"),
+                       "https://auctions.yahoo.co.jp/jp/auction/{id}"),
+    "fril": (("fril.jp",), re.compile(r"/([0-9a-f]{32})"), "https://item.fril.jp/{id}"),
+    "vestiaire": (("vestiairecollective.com",), re.compile(r"-(\d+)\.shtml"),
+                  "https://www.vestiairecollective.com/{id}.shtml"),
+    "1stdibs": (("1stdibs.com",), re.compile(r"/id-([a-z]_\d+)"), "https://www.1stdibs.com/id-{id}/"),
+    "therealreal": (("therealreal.com",), re.compile(r"/products/(.+?)/?$"), "https://www.therealreal.com/products/{id}"),
+    "trefac": (("trefac.jp",), re.compile(r"/store/(?:[^/]+/)?(\d+)"), "https://www.trefac.jp/store/{id}/"),
+}
+# Query parameters that identify a page rather than track a visit; everything else is dropped.
+KEEP_PARAMS = {"id", "item", "itemid", "auction_id", "aid", "p", "product_id"}
+
+
+def marketplace_of(url: str) -> str | None:
+    host = (urlparse(url or "").hostname or "").lower()
+    for name, (suffixes, _, _) in MARKETPLACES.items():
+        if any(host == s or host.endswith(f".{s}") for s in suffixes):
+            return name
+    return None
+
+
+def listing_id(url: str) -> tuple[str, str] | None:
+    """(marketplace, listing id) read from a marketplace listing URL, or None when there is none."""
+    marketplace = marketplace_of(url)
+    if not marketplace:
+        return None
+    match = MARKETPLACES[marketplace][1].search(urlparse(url.strip()).path)
+    if not match:
+        return None
+    return marketplace, match.group(1).lower() if marketplace != "therealreal" else match.group(1)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Canonical form of a listing URL: the marketplace's listing-id URL where the id can be read, else
+    the URL with mobile host prefixes, locale path segments, tracking parameters and fragments removed.
+    """
+    if not url:
+        return ""
+    parsed = urlparse(url.strip())
+    found = listing_id(url)
+    if found:
+        marketplace, item_id = found
+        return MARKETPLACES[marketplace][2].format(id=item_id)
+
+    host = (parsed.hostname or "").lower()
+    for prefix in MOBILE_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    segments = [s for s in parsed.path.split("/") if s]
+    if segments and LOCALE_SEGMENT.match(segments[0].lower()):
+        segments = segments[1:]
+    params = [(k, v) for k, v in parse_qsl(parsed.query) if k.lower() in KEEP_PARAMS]
+    path = "/" + "/".join(segments)
+    return f"https://{host}{path}" + (f"?{urlencode(sorted(params))}" if params else "")
+
+
+def canonical_image_url(url: str) -> str:
+    """Image URL without query parameters or size suffixes (e.g. eBay's s-l1600), so resized copies compare equal."""
+    parsed = urlparse(url or "")
+    path = re.sub(r"s-l\d+(\.\w+)$", r"s-l\1", parsed.path)
+    path = re.sub(r"_(?:\d+x\d+|thumb|small|medium|large)(\.\w+)$", r"\1", path)
+    return f"{(parsed.hostname or '').lower()}{path}"
+
+
+def title_shingles(title: str) -> set[str]:
+    text = re.sub(r"[^\w]+", " ", str(title or "").lower()).strip()
+    words = set(text.split())
+    compact = text.replace(" ", "")
+    return words | {compact[i:i + 3] for i in range(max(len(compact) - 2, 0))}
+
+
+def title_similarity(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def listing_images(listing: dict) -> set[str]:
+    images = listing.get("images") or []
+    if isinstance(images, str):
+        images = [images]
+    if listing.get("image_url"):
+        images = list(images) + [listing["image_url"]]
+    return {canonical_image_url(i if isinstance(i, str) else i.get("url", "")) for i in images} - {""}
+
+
+def dedupe_listings(listings: list[dict]) -> list[dict]:
+    """
+    Collapse copies of the same physical listing, keeping the first occurrence of each.
+
+    Two results are the same listing when their canonical URLs match. When at least one of them has
+    no marketplace listing id, they are also the same listing when they share DEDUPE_MIN_SHARED_IMAGES
+    images or have near-identical titles on the same marketplace (relists). Results with different
+    listing ids are never merged, even through a third result, and images seen under more than one
+    listing id are ignored as stock photos. The kept result keeps its own URL and lists the other
+    URLs seen for it in 'duplicate_urls'.
+    """
+    parent = list(range(len(listings)))
+    ids = [listing_id(l.get("url") or "") for l in listings]
+    # Listing ids in each cluster, keyed by root, so no union can join two different listings.
+    cluster_ids = [{i} - {None} for i in ids]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        ri, rj = find(i), find(j)
+        if ri == rj or (cluster_ids[ri] and cluster_ids[rj] and cluster_ids[ri] != cluster_ids[rj]):
+            return
+        root, child = min(ri, rj), max(ri, rj)
+        parent[child] = root
+        cluster_ids[root] |= cluster_ids[child]
+
+    canonical = [canonical_url(l.get("url")) for l in listings]
+    markets = [marketplace_of(l.get("url")) for l in listings]
+    shingles = [title_shingles(l.get("title")) for l in listings]
+    images = [listing_images(l) for l in listings]
+
+    ids_by_image = {}
+    for i in range(len(listings)):
+        for image in images[i]:
+            ids_by_image.setdefault(image, set()).add(ids[i])
+    stock_images = {image for image, seen in ids_by_image.items() if len(seen - {None}) > 1}
+
+    first_by_url = {}
+    for i in range(len(listings)):
+        if canonical[i] in first_by_url:
+            union(first_by_url[canonical[i]], i)
+        else:
+            first_by_url[canonical[i]] = i
+
+    for i in range(len(listings)):
+        for j in range(i + 1, len(listings)):
+            if find(i) == find(j) or (ids[i] and ids[j]):
+                continue
+            shared_images = len((images[i] & images[j]) - stock_images)
+            relist = (markets[i] is not None and markets[i] == markets[j]
+                      and title_similarity(shingles[i], shingles[j]) >= DEDUPE_TITLE_SIMILARITY)
+            if shared_images >= DEDUPE_MIN_SHARED_IMAGES or relist:
+                union(i, j)
+
+    clusters = {}
+    for i in range(len(listings)):
+        clusters.setdefault(find(i), []).append(i)
+
+    deduped = []
+    for root in sorted(clusters):
+        members = clusters[root]
+        kept = dict(listings[root])
+        duplicates = sorted({listings[i].get("url") for i in members} - {kept.get("url"), None})
+        if duplicates:
+            kept["duplicate_urls"] = duplicates
+        deduped.append(kept)
+    logger.info(f"Listing dedupe: {len(listings)} results -> {len(deduped)} listings")
+    return deduped
@@ -0,0 +1,206 @@
+import logging
+import os
+import re
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Records passed on to the aggregator, and the minimum score to keep when the KB gave attributes.
+PREFILTER_TOP_N = int(os.getenv("PREFILTER_TOP_N", "12"))
+PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", "1.0"))
+
+WEIGHTS = {"reference_code": 5.0, "name": 3.0, "color": 1.0, "material": 1.0}
+# Score multiplier for listings that never name the brand; they stay candidates, ranked lower.
+NO_BRAND_FACTOR = float(os.getenv("PREFILTER_NO_BRAND_FACTOR", "0.5"))
+
+BRAND_TERMS = ["dior", "ディオール"]
+# Phrases that state a listing is not authentic. Bare words like "inspired" or "homage" are not
+# enough: authentic listings describe "punk-inspired" collections and say "not fake".
+REPLICA_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"(?<![a-z0-9])(?:replica|fake|dupe|bootleg|counterfeit|knock-?off)s?(?![a-z0-9])(?!\s+(?:fur|leather|suede))",
+        r"(?<![a-z0-9])dior(?:[\s\-]+homme)?[\s\-]+(?:inspired|style|homage)(?![a-z0-9])",
+        r"(?<![a-z0-9])(?:inspired by|homage to|in the style of)[\s\-]+dior(?![a-z0-9])",
+        r"レプリカ|コピー品|スーパーコピー|偽物|偽造品|ディオール風|ディオールオマージュ",
+    )
+]
+# Words just before (English) or after (Japanese) a replica term that negate it.
+NEGATIONS = re.compile(r"(?<![a-z0-9])(?:not|no|non|never|isn'?t|zero|nor)(?![a-z0-9])[^.!?\n]{0,20}$")
+JAPANESE_NEGATIONS = re.compile(r"^[^。！？\n]{0,4}(?:ではな|じゃな|ではありません|ない|無し|なし)")
+
+# English attribute -> terms that may appear in English or Japanese listings.
+COLOR_TERMS = {
+    "black": ["black", "ブラック", "黒"],
+    "white": ["white", "ホワイト", "白"],
+    "grey": ["grey", "gray", "グレー", "灰"],
+    "beige": ["beige", "ベージュ"],
+    "red": ["red", "レッド", "赤"],
+    "burgundy": ["burgundy", "bordeaux", "バーガンディ", "ボルドー"],
+    "brown": ["brown", "ブラウン", "茶"],
+    "tan": ["tan", "タン"],
+    "mustard": ["mustard", "マスタード"],
+    "indigo": ["indigo", "インディゴ"],
+    "navy": ["navy", "ネイビー", "紺"],
+    "silver": ["silver", "シルバー"],
+    "gold": ["gold", "ゴールド"],
+}
+MATERIAL_TERMS = {
+    "leather": ["leather", "レザー", "革"],
+    "suede": ["suede", "スエード", "スウェード"],
+    "wool": ["wool", "laine", "ウール"],
+    "cotton": ["cotton", "コットン", "綿"],
+    "denim": ["denim", "デニム"],
+    "cashmere": ["cashmere", "カシミヤ", "カシミア"],
+    "silk": ["silk", "シルク"],
+    "nylon": ["nylon", "ナイロン"],
+    "polyester": ["polyester", "ポリエステル"],
+    "brass": ["brass", "真鍮"],
+    "acetate": ["acetate", "アセテート"],
+}
+ITEM_TERMS = {
+    "boot": ["boot", "boots", "ブーツ"],
+    "sneaker": ["sneaker", "sneakers", "スニーカー"],
+    "jacket": ["jacket", "ジャケット"],
+    "riders": ["riders", "rider", "moto", "ライダース"],
+    "bomber": ["bomber", "ボンバー"],
+    "coat": ["coat", "コート"],
+    "peacoat": ["peacoat", "pea coat", "ピーコート"],
+    "blazer": ["blazer", "テーラード", "ブレザー"],
+    "shirt": ["shirt", "シャツ"],
+    "t-shirt": ["t-shirt", "tee", "tシャツ"],
+    "knit": ["knit", "knitwear", "sweater", "ニット", "セーター"],
+    "trousers": ["trousers", "pants", "slacks", "パンツ", "スラックス"],
+    "jeans": ["jeans", "denim", "ジーンズ", "デニム"],
+    "belt": ["belt", "ベルト"],
+    "scarf": ["scarf", "muffler", "スカーフ", "マフラー", "ストール"],
+    "tie": ["tie", "necktie", "ネクタイ"],
+    "bag": ["bag", "バッグ"],
+    "vest": ["vest", "gilet", "ベスト", "ジレ"],
+    "gloves": ["gloves", "グローブ", "手袋"],
+    "bracelet": ["bracelet", "ブレスレット"],
+    "necklace": ["necklace", "ネックレス"],
+    "ring": ["ring", "リング", "指輪"],
+    "brooch": ["brooch", "ブローチ"],
+    "eyewear": ["sunglasses", "glasses", "eyewear", "サングラス", "メガネ"],
+    "handkerchief": ["handkerchief", "ハンカチ"],
+}
+REFERENCE_CODE_PATTERN = re.compile(r"reference code[^a-z0-9\n]*([a-z0-9][a-z0-9\-]{4,}[a-z0-9])", re.IGNORECASE)
+PRICE_PATTERN = re.compile(
+    r"(?:US\s?\$|\$|¥|￥|€|£)\s?\d[\d,]*(?:\.\d{1,2})?"
+    r"|\d[\d,]*(?:\.\d{1,2})?\s?(?:円|USD|JPY|EUR|GBP)(?![a-z])",
+    re.IGNORECASE,
+)
+
+
+def price_spans(text: str) -> list[str]:
+    """Price-like spans in listing text, e.g. '$1,250', '¥38,000', '38,000円', in order of appearance."""
+    return list(dict.fromkeys(" ".join(m.split()) for m in PRICE_PATTERN.findall(str(text or ""))))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text or "").lower().split())
+
+
+def _has_term(text: str, term: str) -> bool:
+    if re.fullmatch(r"[a-z0-9\- ]+", term):
+        return re.search(rf"(?<![a-z0-9]){re.escape(term)}(?![a-z0-9])", text) is not None
+    return term in text
+
+
+def _matching(text: str, vocabulary: dict[str, list[str]]) -> set[str]:
+    return {name for name, terms in vocabulary.items() if any(_has_term(text, t) for t in terms)}
+
+
+def _compact_code(code: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", code.lower())
+
+
+def extract_kb_attributes(kb_text: str, query: str = "") -> dict[str, set[str]]:
+    """
+    Attributes to match listings against, from the knowledge base agent's answer and the user query.
+
+    Returns:
+        {"reference_code", "name", "color", "material"} -> normalized values. Item names come from the
+        query as well as the KB, since the query usually names the piece.
+    """
+    text = _normalize(kb_text)
+    codes = {_compact_code(c) for c in REFERENCE_CODE_PATTERN.findall(text)}
+    codes = {c for c in codes if c not in ("notavailable", "tobeupdated") and any(ch.isdigit() for ch in c)}
+    return {
+        "reference_code": codes,
+        "name": _matching(f"{_normalize(query)} {text}", ITEM_TERMS),
+        "color": _matching(text, COLOR_TERMS),
+        "material": _matching(text, MATERIAL_TERMS),
+    }
+
+
+def replica_phrase(text: str) -> str | None:
+    """The first phrase in normalized listing text that affirmatively calls it a replica, ignoring negated ones."""
+    for pattern in REPLICA_PATTERNS:
+        for match in pattern.finditer(text):
+            if NEGATIONS.search(text[max(0, match.start() - 30):match.start()]):
+                continue
+            if JAPANESE_NEGATIONS.search(text[match.end():match.end() + 12]):
+                continue
+            return match.group(0)
+    return None
+
+
+def score_listing(listing: dict, attributes: dict[str, set[str]]) -> tuple[float | None, list[str]]:
+    """
+    Returns:
+        (score, matched attribute names), or (None, ["replica"]) for a listing that affirmatively
+        says it is a replica. Listings that never name the brand are kept at NO_BRAND_FACTOR of
+        their score, with "no brand" among the matched names.
+    """
+    text = _normalize(" ".join(str(listing.get(k, "")) for k in ("title", "content", "url")))
+    if replica_phrase(text):
+        return None, ["replica"]
+
+    matched = []
+    score = 0.0
+    compact = _compact_code(text)
+    if attributes["reference_code"] and any(code in compact for code in attributes["reference_code"]):
+        score += WEIGHTS["reference_code"]
+        matched.append("reference_code")
+    for name in ("name", "color", "material"):
+        expected = attributes[name]
+        if not expected:
+            continue
+        vocabulary = {"name": ITEM_TERMS, "color": COLOR_TERMS, "material": MATERIAL_TERMS}[name]
+        found = _matching(text, {k: vocabulary[k] for k in expected})
+        if found:
+            score += WEIGHTS[name] * len(found) / len(expected)
+            matched.append(name)
+    if not any(t in text for t in BRAND_TERMS):
+        score *= NO_BRAND_FACTOR
+        matched.append("no brand")
+    return round(score, 3), matched
+
+
+def prefilter_listings(listings: list[dict], kb_text: str, query: str = "", top_n: int = PREFILTER_TOP_N) -> list[dict]:
+    """
+    Score search results against the KB attributes, drop clear non-matches and keep the top-N.
+
+    Returns:
+        The kept results unchanged, with 'score' and 'matched' added. Content is not trimmed here:
+        compact_for_model reads prices and dates from the full text before it cuts the snippet.
+    """
+    attributes = extract_kb_attributes(kb_text, query)
+    has_attributes = any(attributes.values())
+    kept = []
+    dropped = {}
+    for listing in listings:
+        score, matched = score_listing(listing, attributes)
+        if score is None:
+            dropped[matched[0]] = dropped.get(matched[0], 0) + 1
+            continue
+        if has_attributes and score < PREFILTER_MIN_SCORE:
+            dropped["low score"] = dropped.get("low score", 0) + 1
+            continue
+        kept.append({**listing, "score": score, "matched": matched})
+
+    kept.sort(key=lambda r: (r["score"], "no brand" not in r["matched"]), reverse=True)
+    logger.info(f"Listing pre-filter: {len(listings)} results, kept {min(len(kept), top_n)}, dropped {dropped}, "
+                f"attributes {({k: sorted(v) for k, v in attributes.items()})}")
+    return kept[:top_n]
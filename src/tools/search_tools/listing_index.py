@@ -0,0 +1,325 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from threading import Event, Lock, Thread
+
+from src.tools import record_replay
+from src.tools.search_tools.listing_dedupe import canonical_url, marketplace_of
+from src.tools.search_tools.listing_filter import price_spans
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+LISTING_INDEX_PATH = os.getenv("LISTING_INDEX_PATH", os.path.join(ROOT_DIR, "data", "listing_index.sqlite"))
+# Seconds an item's listings are served from the index after it was last watched.
+LISTING_INDEX_MAX_AGE = int(os.getenv("LISTING_INDEX_MAX_AGE", str(12 * 60 * 60)))
+# Seconds between watcher passes over the collection, and between items within a pass.
+LISTING_WATCH_INTERVAL = int(os.getenv("LISTING_WATCH_INTERVAL", str(6 * 60 * 60)))
+LISTING_WATCH_ITEM_DELAY = float(os.getenv("LISTING_WATCH_ITEM_DELAY", "2"))
+# Sold listings returned alongside active ones as recent price history.
+LISTING_INDEX_SOLD_HISTORY = int(os.getenv("LISTING_INDEX_SOLD_HISTORY", "5"))
+
+UNKNOWN_CODES = ("not available", "to be updated", "")
+# Words a query may add to an item's name and reference code and still be answered from the index.
+# Anything else (a size, colour, look number, condition) is a constraint the index cannot apply.
+QUERY_FILLER_WORDS = {
+    "dior", "homme", "aw04", "04aw", "fw04", "2004", "autumn", "winter", "fall", "collection", "archive",
+    "listing", "listings", "for", "sale", "buy", "price", "prices", "find", "search", "show", "me", "any",
+    "the", "a", "an", "of", "from", "on", "online", "available", "currently", "active", "where", "can", "i",
+    "to", "is", "are", "there", "what", "ディオール", "ディオールオム", "オム",
+}
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(text or "").lower())
+
+
+def _whole_word(term: str) -> re.Pattern:
+    return re.compile(rf"(?<![a-z0-9]){re.escape(term.lower())}(?![a-z0-9])")
+
+
+def _code_pattern(code: str) -> re.Pattern:
+    """A reference code written with or without its separators, e.g. '4EH5011601' or '4EH-501-16-01'."""
+    return re.compile(r"[^a-z0-9]*".join(re.escape(c) for c in _compact(code)))
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def archive_items(df) -> list[dict]:
+    """
+    Distinct items in the archive DataFrame, one per name and reference code.
+
+    Returns:
+        Dicts with 'item_key', 'name', 'reference_code' ('' when unknown), 'looks' and 'kb_text', the
+        item's metadata in the same 'Field: value' form the knowledge base returns.
+    """
+    items = {}
+    for row in df.to_dict(orient="records"):
+        name = str(row.get("Name", "")).strip()
+        if not name:
+            continue
+        code = str(row.get("Reference Code", "")).strip()
+        code = "" if code.lower() in UNKNOWN_CODES else code
+        item_key = f"{name.lower()}|{code.lower()}"
+        item = items.setdefault(item_key, {
+            "item_key": item_key,
+            "name": name,
+            "reference_code": code,
+            "looks": [],
+            "kb_text": "\n".join(f"{k}: {v}" for k, v in row.items() if k != "Look Number"),
+        })
+        item["looks"].append(int(row.get("Look Number", 0)))
+    return list(items.values())
+
+
+class ListingIndex:
+    """
+    Local SQLite index of marketplace listings per archive item, kept up to date by ListingWatcher.
+
+    Each listing records when it was first and last seen and its status; each price change is kept in
+    a history table, so sold listings double as price history.
+    """
+
+    def __init__(self, path: str | None, max_age: int = LISTING_INDEX_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = Lock()
+        self._stats = {"hits": 0, "stale": 0, "misses": 0, "ambiguous": 0, "constrained": 0}
+        self._conn = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.executescript(
+                    "CREATE TABLE IF NOT EXISTS items ("
+                    "item_key TEXT PRIMARY KEY, name TEXT NOT NULL, reference_code TEXT NOT NULL, "
+                    "looks TEXT NOT NULL, kb_text TEXT NOT NULL, refreshed REAL);"
+                    "CREATE TABLE IF NOT EXISTS listings ("
+                    "item_key TEXT NOT NULL, canonical_url TEXT NOT NULL, url TEXT NOT NULL, marketplace TEXT, "
+                    "title TEXT, content TEXT, price TEXT, status TEXT NOT NULL, first_seen REAL NOT NULL, "
+                    "last_seen REAL NOT NULL, PRIMARY KEY (item_key, canonical_url));"
+                    "CREATE TABLE IF NOT EXISTS prices ("
+                    "canonical_url TEXT NOT NULL, price TEXT NOT NULL, seen REAL NOT NULL);"
+                    "CREATE INDEX IF NOT EXISTS prices_by_url ON prices (canonical_url, seen);"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"Listing index disabled, could not open {path}: {str(e)}")
+                self._conn = None
+
+    def register_items(self, items: list[dict]) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            for item in items:
+                self._conn.execute(
+                    "INSERT INTO items (item_key, name, reference_code, looks, kb_text, refreshed) VALUES (?, ?, ?, ?, ?, NULL) "
+                    "ON CONFLICT(item_key) DO UPDATE SET looks = excluded.looks, kb_text = excluded.kb_text",
+                    (item["item_key"], item["name"], item["reference_code"], json.dumps(item["looks"]), item["kb_text"]),
+                )
+            self._conn.commit()
+
+    def record(self, item_key: str, listings: list[dict], now: float | None = None) -> None:
+        """
+        Store one watcher pass for an item. Listings carry 'url', 'title', 'content' and 'status'
+        ('alive', 'sold', 'removed' or 'unknown'); listings not seen in this pass keep their last_seen.
+        """
+        if self._conn is None:
+            return
+        now = now or time.time()
+        with self._lock:
+            for listing in listings:
+                url = listing.get("url")
+                if not url:
+                    continue
+                key = canonical_url(url)
+                prices = price_spans(f"{listing.get('title', '')} {listing.get('content', '')}")
+                price = prices[0] if prices else None
+                self._conn.execute(
+                    "INSERT INTO listings (item_key, canonical_url, url, marketplace, title, content, price, status, first_seen, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(item_key, canonical_url) DO UPDATE SET url = excluded.url, title = excluded.title, "
+                    "content = excluded.content, price = COALESCE(excluded.price, listings.price), "
+                    "status = excluded.status, last_seen = excluded.last_seen",
+                    (item_key, key, url, marketplace_of(url), listing.get("title"), listing.get("content"), price,
+                     listing.get("status", "unknown"), now, now),
+                )
+                last = self._conn.execute(
+                    "SELECT price FROM prices WHERE canonical_url = ? ORDER BY seen DESC LIMIT 1", (key,)
+                ).fetchone()
+                if price and (last is None or last[0] != price):
+                    self._conn.execute("INSERT INTO prices (canonical_url, price, seen) VALUES (?, ?, ?)", (key, price, now))
+            self._conn.execute("UPDATE items SET refreshed = ? WHERE item_key = ?", (now, item_key))
+            self._conn.commit()
+
+    def refreshed_at(self) -> dict[str, float | None]:
+        """When each registered item was last watched, None for items never watched."""
+        if self._conn is None:
+            return {}
+        with self._lock:
+            return dict(self._conn.execute("SELECT item_key, refreshed FROM items").fetchall())
+
+    def match_item(self, query: str) -> tuple[dict | None, str]:
+        """
+        The single archive item a listing query is about: by reference code if one appears in the
+        query, else by the longest item name appearing in it as whole words. The query may only add
+        QUERY_FILLER_WORDS to the name and code, since the index cannot apply other constraints.
+
+        Returns:
+            (item, reason) where item is None and reason is 'miss', 'ambiguous' or 'constrained' (the
+            query names an item but asks for more, e.g. a size or colour) when the index cannot answer.
+        """
+        text = " ".join(str(query or "").lower().split())
+        compact = _compact(query)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_key, name, reference_code, looks, kb_text, refreshed FROM items"
+            ).fetchall()
+        items = [dict(zip(("item_key", "name", "reference_code", "looks", "kb_text", "refreshed"), r)) for r in rows]
+
+        matches = [i for i in items if i["reference_code"] and len(_compact(i["reference_code"])) >= 6
+                   and _compact(i["reference_code"]) in compact]
+        if not matches:
+            named = [i for i in items if _whole_word(i["name"]).search(text)]
+            longest = max((len(i["name"]) for i in named), default=0)
+            matches = [i for i in named if len(i["name"]) == longest]
+        if not matches:
+            return None, "miss"
+        if len(matches) > 1:
+            return None, "ambiguous"
+        item = matches[0]
+        rest = _whole_word(item["name"]).sub(" ", text)
+        if item["reference_code"]:
+            rest = _code_pattern(item["reference_code"]).sub(" ", rest)
+        allowed = QUERY_FILLER_WORDS | set(re.findall(r"\w+", item["name"].lower()))
+        extra = [w for w in re.findall(r"\w+", rest) if w not in allowed]
+        if extra:
+            logger.info(f"Listing index: query adds {extra} to {item['name']}, using live search")
+            return None, "constrained"
+        item["looks"] = json.loads(item["looks"])
+        return item, "match"
+
+    def lookup(self, query: str) -> dict | None:
+        """
+        Serve a listing query from the index.
+
+        Returns:
+            {"item", "listings", "recently_sold", "refreshed"} when the query names a single item watched
+            within max_age and nothing more, else None so the caller falls back to a live search.
+        """
+        if self._conn is None:
+            return None
+        item, reason = self.match_item(query)
+        if item is None:
+            with self._lock:
+                self._stats["misses" if reason == "miss" else reason] += 1
+            return None
+        if not item["refreshed"] or time.time() - item["refreshed"] > self.max_age:
+            with self._lock:
+                self._stats["stale"] += 1
+            return None
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT canonical_url, url, marketplace, title, content, price, status, first_seen, last_seen "
+                "FROM listings WHERE item_key = ? ORDER BY last_seen DESC", (item["item_key"],)
+            ).fetchall()
+            listings = []
+            for row in rows:
+                listing = dict(zip(("canonical_url", "url", "marketplace", "title", "content", "price", "status",
+                                    "first_seen", "last_seen"), row))
+                history = self._conn.execute(
+                    "SELECT price, seen FROM prices WHERE canonical_url = ? ORDER BY seen", (listing["canonical_url"],)
+                ).fetchall()
+                listing["price_history"] = [{"price": p, "seen": _iso(s)} for p, s in history]
+                listings.append(listing)
+            self._stats["hits"] += 1
+
+        refreshed = item["refreshed"]
+        active = [l for l in listings if l["last_seen"] >= refreshed and l["status"] in ("alive", "unknown")]
+        sold = [l for l in listings if l["status"] == "sold"][:LISTING_INDEX_SOLD_HISTORY]
+        for listing in active + sold:
+            listing["first_seen"] = _iso(listing["first_seen"])
+            listing["last_seen"] = _iso(listing["last_seen"])
+            listing.pop("canonical_url")
+        return {
+            "item": {k: item[k] for k in ("name", "reference_code", "looks", "kb_text")},
+            "listings": active,
+            "recently_sold": sold,
+            "refreshed": _iso(refreshed),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = sum(stats.values())
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class ListingWatcher:
+    """
+    Background job that searches listings for every archive item and records them in a ListingIndex.
+
+    Args:
+        index: The index to record into.
+        watch_item: Callable taking an item from archive_items and returning its normalized listings.
+        load_items: Callable returning the current archive items.
+    """
+
+    def __init__(self, index: ListingIndex, watch_item, load_items, interval: int = LISTING_WATCH_INTERVAL,
+                 item_delay: float = LISTING_WATCH_ITEM_DELAY):
+        self.index = index
+        self.watch_item = watch_item
+        self.load_items = load_items
+        self.interval = interval
+        self.item_delay = item_delay
+        self._stop = Event()
+        self._thread = None
+
+    def run_once(self) -> dict:
+        """Watch every item once, oldest refresh first, never-watched items before all. Returns counts for the pass."""
+        items = self.load_items()
+        self.index.register_items(items)
+        refreshed = self.index.refreshed_at()
+        items = sorted(items, key=lambda i: (refreshed.get(i["item_key"]) is not None, refreshed.get(i["item_key"]) or 0.0))
+        counts = {"items": 0, "listings": 0, "failures": 0}
+        for item in items:
+            if self._stop.is_set():
+                break
+            try:
+                listings = self.watch_item(item)
+                self.index.record(item["item_key"], listings)
+                counts["listings"] += len(listings)
+            except Exception as e:
+                logger.error(f"Listing watch failed for {item['name']}: {str(e)}")
+                counts["failures"] += 1
+            counts["items"] += 1
+            self._stop.wait(self.item_delay)
+        logger.info(f"Listing watch pass: {counts}")
+        return counts
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="listing-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Listing watcher started, every {self.interval}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+listing_index = ListingIndex(record_replay.persistent_path(LISTING_INDEX_PATH or None))
@@ -1,20 +1,33 @@
 from strands import Agent, tool
 from strands.models import BedrockModel
 from strands_tools import retrieve, stop
-from tavily import TavilyClient
 from src.agents.hooks import LimitToolCounts
 from src.agents.handlers import AgentSteeringHandler
-import urllib.request
+from src.tools.search_tools.http_client import tavily_http, tavily_post
+from src.tools.search_tools.listing_dedupe import canonical_url, dedupe_listings
+from src.tools.search_tools.listing_filter import prefilter_listings
+from src.tools.search_tools.listing_index import ListingWatcher, archive_items, listing_index
+from src.tools.search_tools.search_cache import search_cache, search_cache_key
+from src.tools.search_tools.search_compaction import compact_for_model
+from src.tools.search_tools.search_planner import SEARCH_TARGET_RESULTS, VariantYieldStats, in_domain, plan_variants, watcher_yield_stats, yield_stats
+from src.tools.search_tools.url_liveness import DEAD_STATUSES, check_urls
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import json
 import logging
 import os
+import time
 
 log_level = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
 logging.basicConfig(format="[%(asctime)s] %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 logger.setLevel(log_level)
 
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+# Overall budget for one tavily_search fan-out, in seconds.
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "20"))
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "9"))
+
+search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="tavily-search")
 
 bedrock_model = BedrockModel(
     model_id="us.amazon.nova-2-lite-v1:0",
@@ -44,7 +57,8 @@ kb_handler = AgentSteeringHandler(
 AGGREGATOR_PROMPT = """
 Role:
 Aggregate all web search results and filter out irrelevant or redundant results.
-You must pass all URLs from the search results into the validate_urls tool to help filter out any non-functional URLs.
+You must pass all URLs from the search results into the validate_urls tool to help filter out any non-functional, sold or removed listings.
+Only set include_content when the search result snippets are not enough to decide whether a listing matches.
 """
 
 SYNTHESIS_PROMPT = """
@@ -74,139 +88,240 @@ aggregator_handler = AgentSteeringHandler(
 )
 
 @tool
-def validate_urls(urls: list[str]) -> dict:
+def validate_urls(urls: list[str], include_content: bool = False) -> dict:
     """
     Validate a list of web URLs.
 
-    Use this to verify if clothing listings are still active, and filter out dead links or error pages.
+    Use this to verify if clothing listings are still active, and filter out dead links, error pages,
+    and sold or removed listings. Each URL gets a lightweight liveness check; the page content is only
+    extracted when include_content is set, or when a URL's liveness could not be determined.
 
     Args:
-    urls (list[str]): A list of URLs to be validated and extracted.
+    urls (list[str]): A list of URLs to be validated.
+    include_content (bool): Also extract the page content of live listings. Only set this when the search snippets are not enough to judge a listing.
 
     Returns:
-    A dictionary containing 'valid_listings' with extracted content and 'invalid' listings with failure reasons. Returns an error message if the extraction fails.
+    A dictionary containing 'valid_listings' (with extracted content when requested) and 'invalid' listings with failure reasons. Returns an error message if the extraction fails.
     """
     if not urls:
         return {"valid_listings": [], "invalid": [], "message": "No URLs provided to validate"}
 
-    tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
     results = {"valid_listings": [], "invalid": []}
-    
-    try:
-        extraction = tavily_client.extract(urls=urls)
-        
+    liveness = check_urls(urls)
+    to_extract = [u for u in urls if liveness[u]["status"] == "unknown"
+                  or (include_content and liveness[u]["status"] == "alive")]
+    keys = {u: search_cache_key("extract", u) for u in to_extract}
+
+    def extract(batch: list[str]) -> dict[str, dict]:
+        extraction = tavily_post("extract", {"urls": batch})
+        entries = {}
         for failed in extraction.get("failed_results", []):
-            u = failed.get("url")
-            results["invalid"].append({"url": u, "reason": "Hard 404"})
-
+            entries[failed.get("url")] = {"status": "invalid", "url": failed.get("url"), "reason": "Hard 404"}
         for item in extraction.get("results", []):
-            content = item.get("raw_content", "")
-        
-            results["valid_listings"].append({
+            entries[item['url']] = {
+                "status": "valid",
                 "url": item['url'],
-                "content": content[:6000],
+                "content": item.get("raw_content", "")[:6000],
                 "title": item.get("title")
-            })
-            
+            }
+        return entries
+
+    entries = {}
+    for u in urls:
+        check = liveness[u]
+        if check["status"] in DEAD_STATUSES:
+            entries[u] = {"status": "invalid", "url": u, "reason": f"{check['status'].capitalize()}: {check['reason']}"}
+        elif u not in keys:
+            entries[u] = {"status": "valid", "url": u}
+
+    stale = []
+    for u in to_extract:
+        entry, state = search_cache.lookup(keys[u])
+        if state != "miss":
+            entries[u] = entry
+        if state == "stale":
+            stale.append(u)
+    for u in stale:
+        search_cache.refresh(keys[u], "listing", lambda u=u: extract([u]).get(u) or {"status": "invalid", "url": u, "reason": "Hard 404"})
+
+    missing = [u for u in to_extract if u not in entries]
+    try:
+        if missing:
+            extracted = extract(missing)
+            for u, entry in extracted.items():
+                if u in keys:
+                    search_cache.put(keys[u], entry, "listing")
+            entries.update(extracted)
     except Exception as e:
         return {"error": f"Extraction failed: {str(e)}"}
 
+    for entry in entries.values():
+        if entry["status"] == "invalid":
+            results["invalid"].append({"url": entry["url"], "reason": entry["reason"]})
+        else:
+            results["valid_listings"].append({k: v for k, v in entry.items() if k != "status"})
+    extracted = [l for l in results["valid_listings"] if l.get("content")]
+    if extracted:
+        results["valid_listings"] = ([l for l in results["valid_listings"] if not l.get("content")]
+                                     + compact_for_model("validate_urls", extracted, drop_results=False))
+
+    logger.info(f"Validated {len(urls)} URLs: {len(results['invalid'])} invalid, {len(missing)} extracted")
     return results
 
-def tavily_search(query: str) -> str:
+LISTING_REGIONS = [
+    {
+        "country": "united states",
+        "domains": ["grailed.com", "ebay.com", "vestiairecollective.com", "therealreal.com", "1stdibs.com"],
+        "query_prefixes": ["Dior", "Dior AW04", "Dior Homme", "Dior Homme AW04"]
+    },
+    {
+        "country": "japan",
+        "domains": ["auctions.yahoo.co.jp", "jp.mercari.com", "fril.jp", "trefac.jp"],
+        "query_prefixes": ["ディオール", "ディオール 04AW", "ディオールオム", "ディオールオム 04AW"]
+    }
+]
+MARKETPLACE_DOMAINS = [d for region in LISTING_REGIONS for d in region["domains"]]
+
+def search_variants(query: str) -> list[dict]:
+    """
+    The Tavily requests available for one listing query: a broad search plus marketplace-restricted
+    variants for the US and Japanese resale markets.
+
+    Returns:
+        Dicts with 'label' (for logs), 'template' (the variant independent of the query, for yield
+        stats), 'domains' (where a result counts as a listing) and 'payload' (the request body,
+        without the API key).
+    """
+    variants = [{
+        "label": "united states variant 'Google'",
+        "template": "united states:Dior:broad",
+        "domains": MARKETPLACE_DOMAINS,
+        "payload": {
+            "query": f"Dior {query}",
+            "include_images": True,
+            "country": "united states",
+            "search_depth": "advanced",
+            "max_results": 3
+        }
+    }]
+    for region in LISTING_REGIONS:
+        for prefix in region["query_prefixes"]:
+            variant = f"{prefix} {query}"
+            variants.append({
+                "label": f"{region['country']} variant '{variant}'",
+                "template": f"{region['country']}:{prefix}",
+                "domains": region["domains"],
+                "payload": {
+                    "query": variant,
+                    "include_images": True,
+                    "country": region["country"],
+                    "include_domains": region["domains"],
+                    "search_depth": "advanced",
+                    "max_results": 3
+                }
+            })
+    return variants
+
+def run_search_variant(payload: dict, deadline: float | None = None) -> list[dict]:
+    return tavily_post("search", payload, deadline=deadline).get("results", [])
+
+def cached_search_variant(payload: dict, deadline: float | None = None) -> list[dict]:
+    key = search_cache_key(
+        "search",
+        payload["query"],
+        country=payload.get("country"),
+        domains=payload.get("include_domains"),
+        depth=payload.get("search_depth"),
+        max_results=payload.get("max_results"),
+        include_images=payload.get("include_images"),
+    )
+    return search_cache.cached_call(key, "listing", lambda: run_search_variant(payload, deadline))
+
+def tavily_search(query: str, stats: VariantYieldStats | None = None) -> str:
     """
     Perform a web search for active listings, market data, or reference verification.
 
     Use this to search for clothing listings, reference codes, or prices on the web.
+    Query variants are ordered by their historical yield of new listings and all sent at once over
+    pooled keep-alive connections. Results are collected as they complete until SEARCH_TARGET_RESULTS
+    unique in-domain listings are found or SEARCH_DEADLINE passes; variants still running then finish
+    in the background and only fill the search cache.
 
     Args:
     query (str): A search query.
+    stats (VariantYieldStats): Yield stats that plan the variants and record their results. Defaults to
+        the shared stats of user searches.
 
     Returns:
     Raw JSON search results from the search API. 
     Return "Search failed." if the request is unsuccessful.
     """
-    api_key = TAVILY_API_KEY
-    url = "https://api.tavily.com/search"
-    
-    regions = [
-        {
-            "country": "united states",
-            "domains": ["grailed.com", "ebay.com", "vestiairecollective.com", "therealreal.com", "1stdibs.com"],
-            "query_variants": [
-                f"Dior {query}", 
-                f"Dior AW04 {query}", 
-                f"Dior Homme {query}", 
-                f"Dior Homme AW04 {query}"
-            ]
-        },
-        {
-            "country": "japan",
-            "domains": ["auctions.yahoo.co.jp", "jp.mercari.com", "fril.jp", "trefac.jp"],
-            "query_variants": [
-                f"ディオール {query}", 
-                f"ディオール 04AW {query}", 
-                f"ディオールオム {query}", 
-                f"ディオールオム 04AW {query}"
-            ]
-        }
-    ]
-
-    results = []
-
-    payload = {
-        "api_key": api_key,
-        "query": f"Dior {query}",
-        "include_images": True,
-        "country": "united states",
-        "search_depth": "advanced",
-        "max_results": 3
-    }
+    stats = stats or yield_stats
+    planned, skipped = plan_variants(search_variants(query), stats)
+    deadline = time.perf_counter() + SEARCH_DEADLINE
+    futures = {search_pool.submit(cached_search_variant, v["payload"], deadline): i for i, v in enumerate(planned)}
+    results_by_variant = {}
+    listing_urls = set()
+    early_stop = False
 
     try:
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
-        with urllib.request.urlopen(req, timeout=30) as response:
-            res_data = json.loads(response.read().decode("utf-8"))
-            results.extend(res_data.get("results", []))
-    except Exception as e:
-        logger.error(f"Search failed for united states variant 'Google': {e}")
-
-
-    for region in regions:
-        for variant in region["query_variants"]:
-            payload = {
-                "api_key": api_key,
-                "query": variant,
-                "include_images": True,
-                "country": region["country"],
-                "include_domains": region["domains"],
-                "search_depth": "advanced",
-                "max_results": 3
-            }
-
+        for future in as_completed(futures, timeout=max(deadline - time.perf_counter(), 0)):
+            variant = planned[futures[future]]
             try:
-                data = json.dumps(payload).encode("utf-8")
-                req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
-                with urllib.request.urlopen(req, timeout=30) as response:
-                    res_data = json.loads(response.read().decode("utf-8"))
-                    results.extend(res_data.get("results", []))
+                variant_results = future.result()
             except Exception as e:
-                logger.error(f"Search failed for {region['country']} variant '{variant}': {e}")
+                logger.error(f"Search failed for {variant['label']}: {e}")
+                stats.record(variant["template"], 0)
+                continue
+            new_listings = {canonical_url(r.get("url")) for r in variant_results
+                            if in_domain(r.get("url"), variant["domains"])} - listing_urls
+            listing_urls |= new_listings
+            stats.record(variant["template"], len(new_listings))
+            results_by_variant[futures[future]] = variant_results
+            if len(listing_urls) >= SEARCH_TARGET_RESULTS:
+                early_stop = not all(f.done() for f in futures)
+                break
+    except FuturesTimeoutError:
+        pending = [planned[i]["label"] for f, i in futures.items() if not f.done()]
+        logger.warning(f"Search deadline reached before {pending} completed")
+    # Only variants still queued behind SEARCH_WORKERS can be cancelled; running ones end by the deadline.
+    calls = sum(not f.cancel() for f in futures)
+    results = [r for i in sorted(results_by_variant) for r in results_by_variant[i]]
+
+    stats.record_search(calls, len(skipped), early_stop)
+    logger.info(f"Listing search: {calls}/{len(planned) + len(skipped)} variants, {len(listing_urls)} listings, "
+                f"early stop {early_stop}, search cache {search_cache.stats()}, http {tavily_http.stats()}")
 
     if not results:
         return "No results found."
 
-    unique_results = []
-    seen_urls = set()
+    return json.dumps(dedupe_listings(results), ensure_ascii=False)
 
-    for result in results:
-        url_link = result.get("url")
-        if url_link not in seen_urls:
-            unique_results.append(result)
-            seen_urls.add(url_link)
+def watch_listing_item(item: dict) -> list[dict]:
+    """
+    Search one archive item for the listing watcher: marketplace results, pre-filtered against its metadata
+    and liveness-checked. Titles and content are returned untruncated, so the index reads every price.
+    """
+    query = f"{item['name']} {item['reference_code']}".strip()
+    search_results = tavily_search(query, watcher_yield_stats)
+    if not search_results or search_results == "No results found.":
+        return []
+    listings = [r for r in json.loads(search_results) if in_domain(r.get("url"), MARKETPLACE_DOMAINS)]
+    listings = prefilter_listings(listings, item["kb_text"], item["name"])
+    liveness = check_urls([l["url"] for l in listings])
+    return [{"url": l["url"], "title": l.get("title"), "content": l.get("raw_content") or l.get("content"),
+             "status": liveness[l["url"]]["status"]} for l in listings]
 
-    return json.dumps(unique_results, ensure_ascii=False)
+def load_watch_items() -> list[dict]:
+    from src.tools.archive_tools import collection_inventory
+    return archive_items(collection_inventory.df_archive)
+
+listing_watcher = ListingWatcher(listing_index, watch_listing_item, load_watch_items)
+
+def start_listing_watcher() -> None:
+    """Start the background listing watcher when LISTING_WATCHER is enabled."""
+    if os.getenv("LISTING_WATCHER", "false").strip().lower() in ("1", "true", "yes"):
+        listing_watcher.start()
 
 @tool 
 def listing_search(query: str) -> str:
@@ -214,6 +329,7 @@ def listing_search(query: str) -> str:
     Perform knowledge based filtered web search for active listings, market data, or reference verification.
 
     Use this to search for clothing listings, reference codes, or prices on the web, and have these results verified by knowledge base information.
+    Queries naming a single archive item that the listing watcher has checked recently are answered from the local listing index instead.
 
     Args:
     query (str): A search query.
@@ -221,6 +337,25 @@ def listing_search(query: str) -> str:
     Returns:
     Filtered search results.
     """
+    synthesis_agent = Agent(model=bedrock_model,
+        system_prompt=SYNTHESIS_PROMPT, callback_handler=None)
+
+    indexed = listing_index.lookup(query)
+    logger.info(f"Listing index {'hit' if indexed else 'miss'}: {listing_index.stats()}")
+    if indexed:
+        if not indexed["listings"] and not indexed["recently_sold"]:
+            return "No Dior Homme AW04 listings were found matching your criteria."
+        keep = ("marketplace", "status", "first_seen", "last_seen", "price_history")
+        listings = {"listings": compact_for_model("listing_search", indexed["listings"], keep=keep),
+                    "recently_sold": compact_for_model("listing_search", indexed["recently_sold"], keep=keep),
+                    "checked_at": indexed["refreshed"]}
+        response = synthesis_agent(f"Synthesize a final answer for the query based on the filtered listings. "
+                                   f"Include price history and recently sold listings where relevant. "
+                                   f"Query: {query}. "
+                                   f"Filtered listings: {json.dumps(listings, ensure_ascii=False)}. "
+                                   f"Knowledge base results: {indexed['item']['kb_text']}.")
+        return response
+
     limit_retrieve_hook = LimitToolCounts(max_tool_counts={"retrieve": 3})
     limit_validate_hook = LimitToolCounts(max_tool_counts={"validate_urls": 3})
 
@@ -228,8 +363,6 @@ def listing_search(query: str) -> str:
         system_prompt=KB_PROMPT, tools=[retrieve, stop], hooks=[limit_retrieve_hook], plugins=[kb_handler], callback_handler=None)
     aggregator_agent = Agent(model=bedrock_model,
         system_prompt=AGGREGATOR_PROMPT, tools=[validate_urls], hooks=[limit_validate_hook], plugins=[aggregator_handler], callback_handler=None)
-    synthesis_agent = Agent(model=bedrock_model,
-        system_prompt=SYNTHESIS_PROMPT, callback_handler=None)
 
     kb_results = kb_agent(f"Retrieve relevant information based on this query. "
                           f"Query: {query}")
@@ -238,6 +371,10 @@ def listing_search(query: str) -> str:
     search_results = tavily_search(query)
     if not search_results or search_results == "No results found.":
         return "No Dior Homme AW04 listings were found matching your criteria."
+    prefiltered = prefilter_listings(json.loads(search_results), str(kb_results), query)
+    if not prefiltered:
+        return "No Dior Homme AW04 listings were found matching your criteria."
+    search_results = json.dumps(compact_for_model("listing_search", prefiltered, keep=("score", "matched")), ensure_ascii=False)
     aggregator_results = aggregator_agent(f"Filter out any irrelevant results from the search results, basing the relevancy on the query and knowledge base results. "
                                          f"Search results: {str(search_results)}. "
                                          f"Query: {query}. "
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from src.tools import record_replay
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(tempfile.gettempdir(), "dh-agent", "search_cache.sqlite"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Seconds an entry is fresh, per result class. Listings sell and disappear; editorial and
+# historical results about a 2004 collection rarely change.
+SEARCH_CACHE_TTLS = {
+    "listing": int(os.getenv("SEARCH_CACHE_LISTING_TTL", str(60 * 60))),
+    "editorial": int(os.getenv("SEARCH_CACHE_EDITORIAL_TTL", str(7 * 24 * 60 * 60))),
+    # Whether a listing is still for sale; short, since a listing can sell at any moment.
+    "liveness": int(os.getenv("LIVENESS_TTL", str(10 * 60))),
+}
+# Seconds past its TTL that an entry may still be served while it is refreshed in the background.
+SEARCH_CACHE_STALE_TTLS = {
+    "listing": int(os.getenv("SEARCH_CACHE_LISTING_STALE_TTL", str(6 * 60 * 60))),
+    "editorial": int(os.getenv("SEARCH_CACHE_EDITORIAL_STALE_TTL", str(30 * 24 * 60 * 60))),
+    "liveness": 0,
+}
+
+
+def search_cache_key(endpoint: str, query: str, country: str | None = None, domains: list[str] | None = None,
+                     depth: str | None = None, **params) -> str:
+    """
+    Build the cache key for a search API call.
+
+    Args:
+        endpoint: API endpoint, e.g. 'search' or 'extract'.
+        query: Query text or URL; whitespace and case are normalized.
+        country: Country the search is restricted to.
+        domains: Domains the search is restricted to; order does not matter.
+        depth: Search depth, e.g. 'advanced'.
+        params: Any other request parameters that change the results, e.g. max_results.
+    """
+    raw = json.dumps({
+        "endpoint": endpoint,
+        "query": " ".join(str(query).lower().split()),
+        "country": country,
+        "domains": sorted(domains or []),
+        "depth": depth,
+        "params": params,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    Size-bounded SQLite cache of search API results with per-class TTLs and stale-while-revalidate.
+
+    Values are stored as JSON. An entry is fresh until its TTL, then stale for a grace period during
+    which it is still served while a background refresh replaces it, then expired.
+    """
+
+    def __init__(self, path: str | None, max_bytes: int, refresh_workers: int = 2):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._refreshing = set()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="search-cache-refresh")
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0, "evictions": 0}
+        self._conn = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, ttl_class TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "stored REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"Search cache disabled, could not open {path}: {str(e)}")
+                self._conn = None
+
+    def lookup(self, key: str):
+        """
+        Returns:
+            (value, state) where state is 'fresh', 'stale' or 'miss'; value is None on a miss.
+        """
+        if self._conn is None:
+            return None, "miss"
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, ttl_class, stored FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None, "miss"
+            value, ttl_class, stored = row
+            age = now - stored
+            ttl = SEARCH_CACHE_TTLS.get(ttl_class, 0)
+            if age > ttl + SEARCH_CACHE_STALE_TTLS.get(ttl_class, 0):
+                self._stats["misses"] += 1
+                return None, "miss"
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            state = "fresh" if age <= ttl else "stale"
+            self._stats["hits" if state == "fresh" else "stale_hits"] += 1
+        return json.loads(value), state
+
+    def put(self, key: str, value, ttl_class: str) -> None:
+        if self._conn is None:
+            return
+        if ttl_class not in SEARCH_CACHE_TTLS:
+            raise ValueError(f"Unknown search cache class '{ttl_class}'")
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, ttl_class, size, stored, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encoded, ttl_class, len(encoded.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key: str, ttl_class: str, fetch) -> None:
+        """Re-run `fetch` in the background and store its result, at most once at a time per key."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.put(key, fetch(), ttl_class)
+                with self._lock:
+                    self._stats["refreshes"] += 1
+            except Exception as e:
+                logger.warning(f"Search cache refresh failed: {str(e)}")
+                with self._lock:
+                    self._stats["refresh_failures"] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_pool.submit(run)
+
+    def cached_call(self, key: str, ttl_class: str, fetch):
+        """
+        Serve `key` from the cache, refreshing stale entries in the background, or call `fetch`
+        and cache its result. Exceptions from `fetch` propagate and nothing is cached.
+        """
+        value, state = self.lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            self.refresh(key, ttl_class, fetch)
+            return value
+        value = fetch()
+        self.put(key, value, ttl_class)
+        return value
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+search_cache = SearchCache(record_replay.persistent_path(SEARCH_CACHE_PATH or None), SEARCH_CACHE_MAX_BYTES)
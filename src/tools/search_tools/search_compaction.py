@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import re
+from threading import Lock
+from urllib.parse import urlparse
+
+from src.tools.search_tools.listing_filter import price_spans
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Per-call token budgets for search output handed to a model, and the starting snippet length.
+SEARCH_TOKEN_BUDGETS = {
+    "general_search": int(os.getenv("GENERAL_SEARCH_TOKEN_BUDGET", "1500")),
+    "listing_search": int(os.getenv("LISTING_SEARCH_TOKEN_BUDGET", "2500")),
+    "validate_urls": int(os.getenv("VALIDATE_URLS_TOKEN_BUDGET", "3000")),
+}
+COMPACT_SNIPPET_CHARS = int(os.getenv("COMPACT_SNIPPET_CHARS", "400"))
+# Snippets are shortened down to this length before whole results are dropped to fit the budget.
+MIN_SNIPPET_CHARS = 80
+
+BOILERPLATE_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"^skip to (?:main )?content", r"cookie", r"sign in|log in|create an account|ログイン|会員登録",
+        r"^(?:home|menu|search|cart|share|tweet|pin it)$", r"all rights reserved|©", r"free shipping|送料無料",
+        r"privacy policy|terms of (?:use|service)|利用規約", r"subscribe|newsletter", r"^!\[.*\]\(.*\)$",
+    )
+]
+DATE_PATTERN = re.compile(
+    r"\b\d{4}-\d{2}-\d{2}\b|\b\d{4}/\d{1,2}/\d{1,2}\b|\b\d{4}年\d{1,2}月\d{1,2}日"
+    r"|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2}, \d{4}\b",
+    re.IGNORECASE,
+)
+CJK_PATTERN = re.compile(r"[぀-ヿ㐀-鿿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate model tokens: about 4 characters per token for Latin text, 1 per CJK character."""
+    text = str(text or "")
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _segments(text: str) -> list[str]:
+    segments = re.split(r"\n+|(?<=[.!?。！？])\s+", str(text or ""))
+    return [" ".join(s.split()) for s in segments if s.strip()]
+
+
+def _is_boilerplate(segment: str) -> bool:
+    segment = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", segment).strip(" #*|-")
+    return not segment or any(p.search(segment) for p in BOILERPLATE_PATTERNS)
+
+
+def repeated_segments(results: list[dict]) -> set[str]:
+    """Text segments that appear in more than one result from the same site, e.g. a marketplace's shared footer."""
+    seen = {}
+    for result in results:
+        host = urlparse(result.get("url") or "").hostname
+        for segment in {s.lower() for s in _segments(result.get("content") or result.get("raw_content") or "")}:
+            if len(segment) > 20:
+                seen[(host, segment)] = seen.get((host, segment), 0) + 1
+    return {segment for (_, segment), count in seen.items() if count > 1}
+
+
+def compact_result(result: dict, snippet_chars: int = COMPACT_SNIPPET_CHARS, repeated: set[str] = frozenset(),
+                   keep: tuple[str, ...] = ()) -> dict:
+    """
+    Compact one search result to title, URL, price-like spans, date and a bounded snippet. Prices and
+    dates are read from the full title and content, since they often share a line with boilerplate
+    ("$450 with free shipping"); boilerplate and segments repeated across results are only removed
+    from the snippet. Fields named in `keep` are passed through.
+    """
+    text = result.get("content") or result.get("raw_content") or ""
+    full_text = f"{result.get('title') or ''} {text}"
+    prices = price_spans(full_text)[:3]
+    dates = DATE_PATTERN.findall(full_text)
+    segments = [s for s in _segments(text) if s.lower() not in repeated and not _is_boilerplate(s)]
+    snippet = " ".join(dict.fromkeys(segments))
+    if len(snippet) > snippet_chars:
+        snippet = snippet[:snippet_chars].rsplit(" ", 1)[0] + "…"
+    compact = {
+        "title": result.get("title"),
+        "url": result.get("url"),
+        "price": prices,
+        "date": result.get("published_date") or (dates[0] if dates else None),
+        "snippet": snippet,
+    }
+    compact.update({k: result[k] for k in keep if k in result})
+    return {k: v for k, v in compact.items() if v not in (None, "", [])}
+
+
+def compact_search_results(results: list[dict], budget_tokens: int, snippet_chars: int = COMPACT_SNIPPET_CHARS,
+                           keep: tuple[str, ...] = (), drop_results: bool = True) -> tuple[list[dict], dict]:
+    """
+    Compact search results to fit a token budget, shortening snippets first and then, with
+    drop_results, dropping the lowest-ranked results (results are assumed best first); at least one
+    result is always kept. Without drop_results every result is returned, over budget if need be.
+
+    Returns:
+        (compacted results, report with bytes and estimated tokens before and after).
+    """
+    raw = json.dumps(results, ensure_ascii=False)
+    repeated = repeated_segments(results)
+    compacted = [compact_result(r, snippet_chars, repeated, keep) for r in results]
+    encoded = json.dumps(compacted, ensure_ascii=False)
+    while estimate_tokens(encoded) > budget_tokens and snippet_chars > MIN_SNIPPET_CHARS:
+        snippet_chars = max(int(snippet_chars * 0.7), MIN_SNIPPET_CHARS)
+        compacted = [compact_result(r, snippet_chars, repeated, keep) for r in results]
+        encoded = json.dumps(compacted, ensure_ascii=False)
+    while drop_results and estimate_tokens(encoded) > budget_tokens and len(compacted) > 1:
+        compacted.pop()
+        encoded = json.dumps(compacted, ensure_ascii=False)
+
+    report = {
+        "results_before": len(results),
+        "results_after": len(compacted),
+        "bytes_before": len(raw.encode("utf-8")),
+        "bytes_after": len(encoded.encode("utf-8")),
+        "tokens_before": estimate_tokens(raw),
+        "tokens_after": estimate_tokens(encoded),
+        "snippet_chars": snippet_chars,
+    }
+    return compacted, report
+
+
+class CompactionStats:
+    """Running byte and token totals before and after compaction, per search tool."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._sources = {}
+
+    def record(self, source: str, report: dict) -> None:
+        with self._lock:
+            totals = self._sources.setdefault(source, {"calls": 0, "bytes_before": 0, "bytes_after": 0,
+                                                        "tokens_before": 0, "tokens_after": 0})
+            totals["calls"] += 1
+            for k in ("bytes_before", "bytes_after", "tokens_before", "tokens_after"):
+                totals[k] += report[k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            sources = {s: dict(t) for s, t in self._sources.items()}
+        for totals in sources.values():
+            before = totals["tokens_before"]
+            totals["token_savings"] = round(1 - totals["tokens_after"] / before, 4) if before else 0.0
+        return sources
+
+
+compaction_stats = CompactionStats()
+
+
+def compact_for_model(source: str, results: list[dict], keep: tuple[str, ...] = (),
+                      drop_results: bool = True) -> list[dict]:
+    """Compact `results` to the token budget for `source`, recording and logging the savings."""
+    compacted, report = compact_search_results(results, SEARCH_TOKEN_BUDGETS[source], keep=keep,
+                                               drop_results=drop_results)
+    compaction_stats.record(source, report)
+    logger.info(f"Compacted {source} output: {report}")
+    return compacted
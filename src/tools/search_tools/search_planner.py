@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import tempfile
+from threading import Lock
+from urllib.parse import urlparse
+
+from src.tools import record_replay
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SEARCH_YIELD_STATS_PATH = os.getenv("SEARCH_YIELD_STATS_PATH", os.path.join(tempfile.gettempdir(), "dh-agent", "search_yield.json"))
+# The listing watcher's name and reference-code queries are planned from their own stats, so they do
+# not reorder or skip variants for user searches.
+WATCHER_YIELD_STATS_PATH = os.getenv("WATCHER_YIELD_STATS_PATH",
+                                     os.path.join(tempfile.gettempdir(), "dh-agent", "watcher_search_yield.json"))
+# Stop waiting for further variants once this many unique in-domain listings have been found.
+SEARCH_TARGET_RESULTS = int(os.getenv("SEARCH_TARGET_RESULTS", "12"))
+# After SEARCH_MIN_OBSERVATIONS calls, variants averaging fewer new listings than this are skipped,
+# except for a SEARCH_EXPLORE_RATE share of searches so they can recover.
+SEARCH_MIN_YIELD = float(os.getenv("SEARCH_MIN_YIELD", "0.5"))
+SEARCH_MIN_OBSERVATIONS = int(os.getenv("SEARCH_MIN_OBSERVATIONS", "5"))
+SEARCH_EXPLORE_RATE = float(os.getenv("SEARCH_EXPLORE_RATE", "0.1"))
+
+# Optimistic prior so untried variants are ranked ahead of proven low-yield ones.
+PRIOR_YIELD = 2.0
+PRIOR_CALLS = 2
+
+
+def in_domain(url: str, domains: list[str]) -> bool:
+    host = (urlparse(url or "").hostname or "").lower()
+    return any(host == d or host.endswith(f".{d}") for d in domains)
+
+
+class VariantYieldStats:
+    """
+    Per-variant call and new-listing counts, persisted as JSON so the search plan improves across runs.
+
+    With learn=False the counts are still kept for stats() but do not change the plan: every variant
+    has the prior yield and none is low-value.
+    """
+
+    def __init__(self, path: str | None, learn: bool = True):
+        self.path = path
+        self.learn = learn
+        self._lock = Lock()
+        self._variants = {}
+        self._searches = {"searches": 0, "calls": 0, "skipped": 0, "early_stops": 0}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                self._variants = data.get("variants", {})
+                self._searches.update(data.get("searches", {}))
+            except Exception as e:
+                logger.error(f"Could not read search yield stats from {path}: {str(e)}")
+
+    def expected_yield(self, template: str) -> float:
+        if not self.learn:
+            return PRIOR_YIELD
+        with self._lock:
+            stats = self._variants.get(template, {"calls": 0, "results": 0})
+        return (stats["results"] + PRIOR_YIELD * PRIOR_CALLS) / (stats["calls"] + PRIOR_CALLS)
+
+    def is_low_value(self, template: str) -> bool:
+        if not self.learn:
+            return False
+        with self._lock:
+            stats = self._variants.get(template, {"calls": 0, "results": 0})
+        return stats["calls"] >= SEARCH_MIN_OBSERVATIONS and stats["results"] / stats["calls"] < SEARCH_MIN_YIELD
+
+    def record(self, template: str, new_results: int) -> None:
+        with self._lock:
+            stats = self._variants.setdefault(template, {"calls": 0, "results": 0})
+            stats["calls"] += 1
+            stats["results"] += new_results
+
+    def record_search(self, calls: int, skipped: int, early_stop: bool) -> None:
+        with self._lock:
+            self._searches["searches"] += 1
+            self._searches["calls"] += calls
+            self._searches["skipped"] += skipped
+            self._searches["early_stops"] += int(early_stop)
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            data = {"variants": self._variants, "searches": self._searches}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Could not write search yield stats to {self.path}: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._searches)
+            variants = {t: dict(s) for t, s in self._variants.items()}
+        stats["calls_per_search"] = round(stats["calls"] / stats["searches"], 2) if stats["searches"] else 0.0
+        stats["variants"] = {
+            t: {**s, "yield": round(s["results"] / s["calls"], 2) if s["calls"] else None} for t, s in variants.items()
+        }
+        return stats
+
+
+# Under record/replay the plan must not depend on earlier runs or on the order results arrive in.
+REPLAYABLE_PLAN = record_replay.REPLAY_MODE in ("record", "replay")
+yield_stats = VariantYieldStats(record_replay.persistent_path(SEARCH_YIELD_STATS_PATH or None), learn=not REPLAYABLE_PLAN)
+watcher_yield_stats = VariantYieldStats(record_replay.persistent_path(WATCHER_YIELD_STATS_PATH or None),
+                                        learn=not REPLAYABLE_PLAN)
+planner_random = record_replay.seeded_random("search_planner")
+
+
+def plan_variants(variants: list[dict], stats: VariantYieldStats = yield_stats) -> tuple[list[dict], list[dict]]:
+    """
+    Order variants by expected yield and drop the ones that have proven low-value.
+
+    Args:
+        variants: Dicts with a 'template' naming the variant independently of the query.
+
+    Returns:
+        (planned variants, best first; skipped variants).
+    """
+    ordered = sorted(variants, key=lambda v: stats.expected_yield(v["template"]), reverse=True)
+    explore = planner_random.random() < SEARCH_EXPLORE_RATE
+    planned = [v for v in ordered if explore or not stats.is_low_value(v["template"])]
+    if not planned:
+        planned = ordered[:1]
+    skipped = [v for v in ordered if v not in planned]
+    return planned, skipped
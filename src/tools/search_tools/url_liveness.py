@@ -0,0 +1,186 @@
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import httpx
+
+from src.tools.search_tools.http_client import PooledHttpClient
+from src.tools.search_tools.listing_dedupe import canonical_url, marketplace_of
+from src.tools.search_tools.search_cache import search_cache, search_cache_key
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+LIVENESS_TIMEOUT = float(os.getenv("LIVENESS_TIMEOUT", "5"))
+LIVENESS_DEADLINE = float(os.getenv("LIVENESS_DEADLINE", "15"))
+LIVENESS_WORKERS = int(os.getenv("LIVENESS_WORKERS", "8"))
+LIVENESS_PER_DOMAIN = int(os.getenv("LIVENESS_PER_DOMAIN", "2"))
+# Bytes of the page read for sold/removed markers; listing status is near the top of the HTML.
+LIVENESS_MAX_BYTES = int(os.getenv("LIVENESS_MAX_BYTES", str(256 * 1024)))
+
+USER_AGENT = "Mozilla/5.0 (compatible; dh-agent-liveness/1.0)"
+
+# Page state showing a listing has sold or been taken down, per marketplace: structured JSON flags
+# and full listing-status sentences. Bare "sold out" or "売り切れ" also appears in navigation,
+# filters and carousels of other listings, so it is only a hint (see SOLD_HINTS).
+SOLD_MARKERS = {
+    "ebay": [r"this listing (?:has|was) ended", r"bidding has ended on this item", r"this item is out of stock",
+             r"the item you selected is no longer available"],
+    "grailed": [r'"sold"\s*:\s*true', r"this listing has been (?:sold|deleted)", r"this listing is no longer available"],
+    "mercari": [r'"status"\s*:\s*"(?:sold_out|trading)"', r"この商品は削除されました"],
+    "yahoo_auctions": [r"このオークションは終了しています", r"このオークションは終了しました", r"このオークションは削除されました"],
+    "fril": [r"この商品は削除されました"],
+    "vestiaire": [r'"sold"\s*:\s*true', r"this item (?:is|has been) sold"],
+    "1stdibs": [r'"issold"\s*:\s*true', r"this item has sold", r"this item is no longer available"],
+    "therealreal": [r'"sold_out"\s*:\s*true', r"this item is sold out"],
+    "trefac": [],
+}
+GENERIC_SOLD_MARKERS = [
+    r'"availability"\s*:\s*"(?:https?://schema\.org/)?(?:soldout|discontinued)"',
+    r"this (?:item|listing|product) is no longer available",
+]
+SOLD_MARKER_PATTERNS = {
+    marketplace: [re.compile(m, re.IGNORECASE) for m in markers + GENERIC_SOLD_MARKERS]
+    for marketplace, markers in {**SOLD_MARKERS, None: []}.items()
+}
+# Words that may or may not be about the listing itself. A page with one of these and no sold marker
+# is reported 'unknown', so validate_urls extracts it instead of calling it alive or sold.
+SOLD_HINTS = ["sold out", "no longer available", "item sold", "売り切れ", "売約済", "販売終了"]
+
+# Statuses that mean the listing cannot be bought; anything else is 'alive' or 'unknown'.
+DEAD_STATUSES = ("sold", "removed")
+
+http_client = PooledHttpClient(
+    "liveness",
+    per_host_limit=LIVENESS_PER_DOMAIN,
+    max_retries=0,
+    connect_timeout=LIVENESS_TIMEOUT,
+    read_timeout=LIVENESS_TIMEOUT,
+    max_connections=LIVENESS_WORKERS * 2,
+    headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.8,ja;q=0.6"},
+    follow_redirects=True,
+)
+liveness_pool = ThreadPoolExecutor(max_workers=LIVENESS_WORKERS, thread_name_prefix="url-liveness")
+
+
+def redirected_away(url: str, final_url: str) -> bool:
+    """True when a listing URL redirected to a page that is no longer that listing, e.g. search or home."""
+    if canonical_url(url) == canonical_url(final_url):
+        return False
+    path = urlparse(final_url).path.strip("/")
+    listing_id = re.search(r"[A-Za-z]?\d{5,}|[0-9a-f]{32}", urlparse(canonical_url(url)).path)
+    return not path or (listing_id is not None and listing_id.group(0).lower() not in final_url.lower())
+
+
+def sold_marker(url: str, text: str) -> str | None:
+    """The page state or status sentence showing the listing at `url` has sold, or None."""
+    text = " ".join(text.split())
+    for pattern in SOLD_MARKER_PATTERNS.get(marketplace_of(url), SOLD_MARKER_PATTERNS[None]):
+        match = pattern.search(text)
+        if match:
+            return match.group(0)
+    return None
+
+
+def sold_hint(text: str) -> str | None:
+    text = text.lower()
+    return next((hint for hint in SOLD_HINTS if hint in text), None)
+
+
+def read_head(response: httpx.Response) -> str:
+    chunks = []
+    size = 0
+    for chunk in response.iter_bytes():
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= LIVENESS_MAX_BYTES:
+            break
+    return b"".join(chunks)[:LIVENESS_MAX_BYTES].decode(response.encoding or "utf-8", errors="ignore")
+
+
+def check_url(url: str) -> dict:
+    """
+    Check one listing URL without extracting it.
+
+    Known marketplaces get a light GET (the first LIVENESS_MAX_BYTES) so sold/removed markers can be
+    read; other sites get a HEAD, falling back to GET when HEAD is not allowed. A page that only
+    mentions a sold hint is 'unknown', so it goes to extraction.
+
+    Returns:
+        {"url", "status": 'alive' | 'sold' | 'removed' | 'unknown', "reason", "http_status", "final_url"}
+    """
+    method = "GET" if marketplace_of(url) else "HEAD"
+    result = {"url": url, "status": "unknown", "reason": "", "http_status": None, "final_url": url}
+    try:
+        with http_client.stream(method, url) as response:
+            text = read_head(response) if method == "GET" else ""
+        if method == "HEAD" and response.status_code in (403, 405, 501):
+            with http_client.stream("GET", url) as response:
+                text = read_head(response)
+    except httpx.TimeoutException:
+        result["reason"] = "Timed out"
+        return result
+    except Exception as e:
+        result["reason"] = f"Request failed: {str(e)}"
+        return result
+
+    result["http_status"] = response.status_code
+    result["final_url"] = str(response.url)
+    if response.status_code in (404, 410):
+        result.update(status="removed", reason=f"HTTP {response.status_code}")
+    elif response.status_code >= 400:
+        result["reason"] = f"HTTP {response.status_code}"
+    elif redirected_away(url, result["final_url"]):
+        result.update(status="removed", reason=f"Redirected to {result['final_url']}")
+    elif (marker := sold_marker(url, text)):
+        result.update(status="sold", reason=f"Page says '{marker}'")
+    elif (hint := sold_hint(text)):
+        result["reason"] = f"Page mentions '{hint}' without a listing status"
+    else:
+        result["status"] = "alive"
+    return result
+
+
+def cached_check_url(url: str) -> dict:
+    key = search_cache_key("liveness", url)
+    value, state = search_cache.lookup(key)
+    if state == "fresh":
+        return value
+    result = check_url(url)
+    if result["status"] != "unknown":
+        search_cache.put(key, result, "liveness")
+    return result
+
+
+def check_urls(urls: list[str], deadline: float = LIVENESS_DEADLINE) -> dict[str, dict]:
+    """
+    Check many URLs concurrently, at most LIVENESS_PER_DOMAIN at a time per host, with cached results
+    reused for LIVENESS_TTL. URLs not checked by the deadline are reported as 'unknown'.
+    """
+    start = time.perf_counter()
+    urls = list(dict.fromkeys(urls))
+    futures = {url: liveness_pool.submit(cached_check_url, url) for url in urls}
+    done, not_done = wait(futures.values(), timeout=deadline)
+    for future in not_done:
+        future.cancel()
+
+    results = {}
+    for url, future in futures.items():
+        if future in done:
+            try:
+                results[url] = future.result()
+                continue
+            except Exception as e:
+                reason = f"Check failed: {str(e)}"
+        else:
+            reason = "Liveness deadline reached"
+        results[url] = {"url": url, "status": "unknown", "reason": reason, "http_status": None, "final_url": url}
+
+    counts = {}
+    for r in results.values():
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    logger.info(f"Liveness: {len(urls)} URLs in {time.perf_counter() - start:.2f}s, {counts}, http {http_client.stats()}")
+    return results
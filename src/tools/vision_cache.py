@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from threading import Lock
+
+from src.tools import record_replay
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+VISION_CACHE_PATH = os.getenv("VISION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "dh-agent", "vision_cache.sqlite"))
+VISION_CACHE_MAX_BYTES = int(os.getenv("VISION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def prompt_version(prompt: str, model_id: str, tier: str) -> str:
+    """Short hash identifying the prompt, model and image tier a response was produced with."""
+    return hashlib.sha256(f"{model_id}\n{tier}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", (query or "").lower()).split())
+
+
+def vision_cache_key(model_id: str, prompt_version: str, image_hashes: list[str], query: str, ordered: bool = False) -> str:
+    """
+    Build the cache key for a deterministic (temperature 0) vision call.
+
+    Args:
+        model_id: Bedrock model id.
+        prompt_version: Hash of the prompt and anything else shaping the request, e.g. the image tier.
+        image_hashes: Content hashes (S3 ETags or SHA-256) of the images sent.
+        query: The user question; normalized before hashing.
+        ordered: Keep image order significant, e.g. for query-vs-retrieved comparisons.
+    """
+    hashes = list(image_hashes) if ordered else sorted(image_hashes)
+    raw = "\n".join([model_id, prompt_version, ",".join(hashes), normalize_query(query)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class VisionCache:
+    """Size-bounded SQLite cache of vision model responses, evicting least recently used entries."""
+
+    def __init__(self, path: str | None, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._conn = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"Vision cache disabled, could not open {path}: {str(e)}")
+                self._conn = None
+
+    def get(self, key: str) -> str | None:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+vision_cache = VisionCache(record_replay.persistent_path(VISION_CACHE_PATH or None), VISION_CACHE_MAX_BYTES)
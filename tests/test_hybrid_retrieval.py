@@ -0,0 +1,70 @@
+"""
+Hybrid retrieval query filters: only words that describe a garment select metadata filters.
+
+Usage:
+    uv run python -m unittest tests/test_hybrid_retrieval.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.archive_tools.hybrid_retrieval import parse_query_filters, rerank_candidates
+from src.tools.archive_tools.look_index import LookIndex
+
+
+def item(look: int, category: str, color: str, secondary: str, material: str, pattern: str) -> dict:
+    return {"Look Number": look, "Category": category, "Primary Color": color, "Secondary Color(s)": secondary,
+            "Primary Outer Material": material, "Secondary Outer Material(s)": "None", "Pattern": pattern}
+
+
+def candidate(look: int, distance: float) -> dict:
+    return {"key": f"look{look}_1.jpg", "distance": distance, "metadata": {"filename": f"look{look}_1.jpg"}}
+
+
+class ParseQueryFiltersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.look_index = LookIndex("https://cdn.example.com")
+        self.look_index.build(
+            [item(1, "Outerwear", "Black", "None", "Leather", "Solid"),
+             item(2, "Top", "White", "Dark Grey", "Cotton", "Striped")],
+            ["images/look1_1.jpg", "images/look2_1.jpg"])
+
+    def test_garment_descriptions_select_filters(self):
+        cases = {
+            "what is this black leather jacket": {"category": {"outerwear"}, "color": {"black"}, "material": {"leather"}},
+            "white and dark grey striped top": {"category": {"top"}, "color": {"white", "dark grey"}, "pattern": {"striped"}},
+            "is this top from dior": {"category": {"top"}},
+            "the jacket is black": {"category": {"outerwear"}, "color": {"black"}},
+            "a black tie": {"category": {"accessories"}, "color": {"black"}},
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(parse_query_filters(query, self.look_index), expected)
+
+    def test_unrelated_phrasings_select_nothing(self):
+        cases = {
+            "photo of a jacket on a black background": {"category": {"outerwear"}},
+            "what is in the top left corner": {},
+            "can you tie this to a look": {},
+            "tie-dye shirt": {"category": {"top"}},
+            "is the white text a watermark": {},
+            "cotton candy colored backdrop": {},
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(parse_query_filters(query, self.look_index), expected)
+
+    def test_unrelated_phrasing_keeps_every_candidate(self):
+        candidates = [candidate(1, 0.30), candidate(2, 0.32)]
+        results = rerank_candidates(candidates, "which look is on the top of this black page",
+                                    self.look_index, top_k=3, max_distance=0.5)
+        self.assertEqual([r["look_number"] for r in results], [1, 2])
+        self.assertEqual([r["matched_filters"] for r in results], [[], []])
+
+
+if __name__ == "__main__":
+    unittest.main()
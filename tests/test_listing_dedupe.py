@@ -0,0 +1,78 @@
+"""
+Listing dedupe: canonical URLs, listing-id boundaries and stock images.
+
+Usage:
+    uv run python -m unittest tests/test_listing_dedupe.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.search_tools.listing_dedupe import canonical_url, dedupe_listings
+
+TITLE = "Dior Homme 04AW black leather boots size 42"
+STOCK = ["https://cdn.example.com/dior-boots-front.jpg", "https://cdn.example.com/dior-boots-side.jpg"]
+
+
+def listing(url: str, title: str = TITLE, images: list[str] | None = None) -> dict:
+    return {"url": url, "title": title, "images": images or []}
+
+
+class CanonicalUrlTest(unittest.TestCase):
+
+    def test_ebay_regional_and_mobile_urls_share_one_form(self):
+        for url in ("https://m.ebay.co.uk/itm/Dior-Homme-boots/123456789012?hash=item1c&_trkparms=x",
+                    "https://www.ebay.de/itm/123456789012",
+                    "https://ebay.com/itm/123456789012#viTabs_0",
+                    "https://www.ebay.com.au/itm/dior-boots/123456789012?var=0"):
+            with self.subTest(url=url):
+                self.assertEqual(canonical_url(url), "https://www.ebay.com/itm/123456789012")
+
+
+class DedupeListingsTest(unittest.TestCase):
+
+    def test_ebay_copies_collapse_into_first(self):
+        deduped = dedupe_listings([listing("https://m.ebay.co.uk/itm/Dior-Homme-boots/123456789012?hash=item1c"),
+                                   listing("https://www.ebay.de/itm/123456789012")])
+        self.assertEqual(len(deduped), 1)
+        self.assertEqual(deduped[0]["url"], "https://m.ebay.co.uk/itm/Dior-Homme-boots/123456789012?hash=item1c")
+        self.assertEqual(deduped[0]["duplicate_urls"], ["https://www.ebay.de/itm/123456789012"])
+
+    def test_different_listing_ids_are_never_merged(self):
+        deduped = dedupe_listings([listing("https://www.grailed.com/listings/111"),
+                                   listing("https://www.grailed.com/listings/222")])
+        self.assertEqual([d["url"] for d in deduped],
+                         ["https://www.grailed.com/listings/111", "https://www.grailed.com/listings/222"])
+
+    def test_different_listing_ids_are_not_merged_through_a_third_result(self):
+        # The id-less result is a relist of both, but joins only the first listing it is compared with.
+        deduped = dedupe_listings([listing("https://www.grailed.com/listings/111"),
+                                   listing("https://www.grailed.com/designers/dior-homme?sort=new"),
+                                   listing("https://www.grailed.com/listings/222")])
+        self.assertEqual([d["url"] for d in deduped],
+                         ["https://www.grailed.com/listings/111", "https://www.grailed.com/listings/222"])
+        self.assertEqual(deduped[0]["duplicate_urls"], ["https://www.grailed.com/designers/dior-homme?sort=new"])
+        self.assertNotIn("duplicate_urls", deduped[1])
+
+    def test_stock_images_shared_across_listing_ids_are_ignored(self):
+        deduped = dedupe_listings([
+            listing("https://www.grailed.com/listings/111", "Dior boots", STOCK),
+            listing("https://jp.mercari.com/item/m12345678901", "ディオール ブーツ", STOCK),
+            listing("https://blog.example.com/dior-archive", "Archive notes", STOCK),
+            listing("https://shop.example.jp/p/boots", "Vintage boots", STOCK),
+        ])
+        self.assertEqual(len(deduped), 4)
+
+    def test_shared_own_images_merge_results_without_listing_ids(self):
+        images = ["https://cdn.example.com/boots-1.jpg?w=400", "https://cdn.example.com/boots-2.jpg"]
+        deduped = dedupe_listings([listing("https://blog.example.com/dior-archive", "Archive notes", images),
+                                   listing("https://shop.example.jp/p/boots", "Vintage boots", images[::-1])])
+        self.assertEqual(len(deduped), 1)
+        self.assertEqual(deduped[0]["duplicate_urls"], ["https://shop.example.jp/p/boots"])
+
+
+if __name__ == "__main__":
+    unittest.main()
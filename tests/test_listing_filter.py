@@ -0,0 +1,66 @@
+"""
+Listing pre-filter: replica phrases, brandless listings and what reaches compaction.
+
+Usage:
+    uv run python -m unittest tests/test_listing_filter.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.search_tools.listing_filter import NO_BRAND_FACTOR, prefilter_listings, score_listing
+from src.tools.search_tools.search_compaction import compact_for_model
+
+KB_TEXT = "Item: leather boots. Color: black. Material: leather."
+ATTRIBUTES = {"reference_code": set(), "name": {"boot"}, "color": {"black"}, "material": {"leather"}}
+
+
+def listing(title: str, content: str = "", **fields) -> dict:
+    return {"url": "https://www.grailed.com/listings/111", "title": title, "content": content, **fields}
+
+
+class ScoreListingTest(unittest.TestCase):
+
+    def test_affirmative_replica_phrases_are_rejected(self):
+        for title in ("Dior Homme inspired black leather boots", "REPLICA Dior boots",
+                      "ディオール ブーツ レプリカです", "Boots in the style of Dior"):
+            with self.subTest(title=title):
+                self.assertEqual(score_listing(listing(title), ATTRIBUTES), (None, ["replica"]))
+
+    def test_negated_and_unrelated_terms_are_kept(self):
+        for title in ("Dior Homme 04AW punk-inspired black leather boots, 100% authentic, not fake",
+                      "Dior black leather boots, no fakes, no replicas",
+                      "Dior boots with fake fur lining, black leather",
+                      "ディオール 黒 レザー ブーツ 偽物ではありません"):
+            with self.subTest(title=title):
+                score, matched = score_listing(listing(title), ATTRIBUTES)
+                self.assertIsNotNone(score)
+                self.assertNotIn("replica", matched)
+
+    def test_missing_brand_is_ranked_lower_not_dropped(self):
+        branded, _ = score_listing(listing("Dior black leather boots"), ATTRIBUTES)
+        brandless, matched = score_listing(listing("Black leather boots"), ATTRIBUTES)
+        self.assertEqual(brandless, round(branded * NO_BRAND_FACTOR, 3))
+        self.assertIn("no brand", matched)
+
+
+class PrefilterListingsTest(unittest.TestCase):
+
+    def test_original_records_reach_compaction(self):
+        content = "Dior Homme black leather boots in great condition. " * 13 + "Price: $450"
+        raw = listing("Dior Homme 04AW boots", content, published_date="2024-05-01", raw_content=content)
+        kept = prefilter_listings([raw], KB_TEXT, "boots")
+        self.assertEqual(kept[0]["content"], content)
+        self.assertEqual(kept[0]["published_date"], "2024-05-01")
+
+        compacted = compact_for_model("listing_search", kept, keep=("score", "matched"))
+        self.assertEqual(compacted[0]["price"], ["$450"])
+        self.assertEqual(compacted[0]["date"], "2024-05-01")
+        self.assertIn("matched", compacted[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Listing index and watcher: what is stored, which queries it answers and the order items are watched in.
+
+Usage:
+    uv run python -m unittest tests/test_listing_index.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.search_tools import listing_search
+from src.tools.search_tools.listing_index import ListingIndex, ListingWatcher
+
+ITEM = {
+    "item_key": "leather boots|",
+    "name": "Leather Boots",
+    "reference_code": "",
+    "looks": [12],
+    "kb_text": "Name: Leather Boots\nColor: black\nMaterial: leather",
+}
+
+
+class ListingIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.index = ListingIndex(os.path.join(self.tmp.name, "listing_index.sqlite"))
+        self.index.register_items([ITEM])
+
+    def test_watcher_records_prices_past_the_snippet(self):
+        content = "Dior Homme black leather boots in great condition. " * 13 + "Price: $450"
+        result = {"url": "https://www.grailed.com/listings/111", "title": "Dior Homme Leather Boots", "content": content}
+        search = mock.patch.object(listing_search, "tavily_search", return_value=json.dumps([result]))
+        liveness = mock.patch.object(listing_search, "check_urls", return_value={result["url"]: {"status": "alive"}})
+        with search as fake_search, liveness:
+            listings = listing_search.watch_listing_item(ITEM)
+        self.index.record(ITEM["item_key"], listings)
+        self.assertIs(fake_search.call_args.args[1], listing_search.watcher_yield_stats)
+
+        indexed = self.index.lookup("Leather Boots")
+        self.assertEqual(indexed["listings"][0]["content"], content)
+        self.assertEqual(indexed["listings"][0]["price"], "$450")
+        self.assertEqual([p["price"] for p in indexed["listings"][0]["price_history"]], ["$450"])
+
+    def test_only_whole_name_queries_are_answered(self):
+        self.index.record(ITEM["item_key"], [{"url": "https://www.grailed.com/listings/111", "title": "Leather Boots",
+                                              "content": "", "status": "alive"}])
+        for query in ("Leather Boots", "Dior Homme AW04 leather boots listings", "leather boots for sale"):
+            with self.subTest(query=query):
+                self.assertIsNotNone(self.index.lookup(query))
+        for query, reason in (("Dior leather boots size 42 in grey", "constrained"),
+                              ("leather boots from look 12", "constrained"),
+                              ("patent leather bootsy", "miss"),
+                              ("faux-leather boots", "constrained")):
+            with self.subTest(query=query):
+                self.assertIsNone(self.index.lookup(query))
+                self.assertEqual(self.index.match_item(query)[1], reason)
+
+    def test_watcher_refreshes_oldest_first(self):
+        items = [{**ITEM, "item_key": f"item {n}|", "name": f"Item {n}"} for n in range(4)]
+        self.index.register_items(items)
+        self.index.record("item 0|", [], now=300.0)
+        self.index.record("item 1|", [], now=100.0)
+        self.index.record("item 3|", [], now=200.0)
+
+        watched = []
+        watcher = ListingWatcher(self.index, lambda item: watched.append(item["item_key"]) or [], lambda: items,
+                                 item_delay=0)
+        watcher.run_once()
+        self.assertEqual(watched, ["item 2|", "item 1|", "item 3|", "item 0|"])
+
+
+if __name__ == "__main__":
+    unittest.main()
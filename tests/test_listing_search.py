@@ -0,0 +1,109 @@
+"""
+Listing search fan-out: every planned variant is sent at once and collection stops at the target.
+
+Search requests are answered by a fake with a fixed latency per variant, so wall times can be
+compared with the plain fan-out that waits for every variant.
+
+Usage:
+    uv run python -m unittest tests/test_listing_search.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.search_tools import listing_search
+from src.tools.search_tools.search_planner import VariantYieldStats
+
+FAST_S = 0.05
+SLOW_S = 0.6
+
+
+def payload_key(payload: dict) -> str:
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+
+class FakeSearch:
+    """Answers each variant after its delay with `per_variant` unique grailed listings."""
+
+    def __init__(self, delays: dict[str, float], per_variant: int):
+        self.delays = delays
+        self.per_variant = per_variant
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    def __call__(self, payload: dict, deadline: float | None = None) -> list[dict]:
+        key = payload_key(payload)
+        with self.lock:
+            self.calls.append(key)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(key, FAST_S))
+            return [{"url": f"https://www.grailed.com/listings/{abs(hash((key, i))) % 10**9}",
+                     "title": f"{payload['query']} {i}", "content": ""} for i in range(self.per_variant)]
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class TavilySearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = VariantYieldStats(None)
+        self.payloads = [payload_key(v["payload"]) for v in listing_search.search_variants("boots")]
+        for patch in (mock.patch.object(listing_search, "yield_stats", self.stats),
+                      mock.patch.object(listing_search, "SEARCH_TARGET_RESULTS", 6)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def search(self, fake: FakeSearch) -> tuple[list[dict], float]:
+        with mock.patch.object(listing_search, "cached_search_variant", fake):
+            start = time.perf_counter()
+            results = listing_search.tavily_search("boots")
+            elapsed = time.perf_counter() - start
+        return ([] if results == "No results found." else json.loads(results)), elapsed
+
+    def test_early_stop_returns_before_slow_variants(self):
+        # Two fast variants reach the target of 6 listings; the other seven are slow.
+        delays = {q: SLOW_S for q in self.payloads[2:]}
+        results, elapsed = self.search(FakeSearch(delays, per_variant=3))
+        self.assertEqual(len(results), 6)
+        self.assertLess(elapsed, SLOW_S / 2)
+        self.assertEqual(self.stats.stats()["early_stops"], 1)
+        time.sleep(SLOW_S)
+
+    def test_all_variants_sent_at_once(self):
+        # No variant reaches the target, so the search waits for all of them: one request time, not waves.
+        fake = FakeSearch({q: SLOW_S for q in self.payloads}, per_variant=0)
+        _, elapsed = self.search(fake)
+        self.assertEqual(fake.max_in_flight, len(self.payloads))
+        self.assertLess(elapsed, SLOW_S * 1.5)
+        self.assertEqual(self.stats.stats()["early_stops"], 0)
+
+    def test_deadline_returns_completed_variants(self):
+        delays = {q: SLOW_S for q in self.payloads[1:]}
+        with mock.patch.object(listing_search, "SEARCH_DEADLINE", SLOW_S / 3):
+            results, elapsed = self.search(FakeSearch(delays, per_variant=1))
+        self.assertEqual(len(results), 1)
+        self.assertLess(elapsed, SLOW_S / 2)
+        time.sleep(SLOW_S)
+
+    def test_separate_stats_leave_user_stats_untouched(self):
+        watcher_stats = VariantYieldStats(None)
+        with mock.patch.object(listing_search, "cached_search_variant", FakeSearch({}, per_variant=1)):
+            listing_search.tavily_search("boots", watcher_stats)
+        self.assertEqual(watcher_stats.stats()["searches"], 1)
+        self.assertEqual(self.stats.stats()["searches"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+"""
+Look index: runway image keys are grouped by look and ordered within it.
+
+Usage:
+    uv run python -m unittest tests/test_look_index.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.archive_tools.look_index import LookIndex
+
+
+class LookIndexTest(unittest.TestCase):
+
+    def test_named_suffixes_are_kept_after_numbered_images(self):
+        look_index = LookIndex("https://cdn.example.com")
+        look_index.build([], ["images/look3_back.jpg", "images/look3_10.jpg", "images/look3_2.jpg",
+                              "images/look3_detail.png", "images/look12_1.jpg", "images/cover.jpg"])
+        self.assertEqual(look_index.look_numbers(), [3, 12])
+        self.assertEqual(look_index.get(3)["image_keys"],
+                         ["images/look3_2.jpg", "images/look3_10.jpg", "images/look3_back.jpg", "images/look3_detail.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
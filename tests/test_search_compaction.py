@@ -0,0 +1,55 @@
+"""
+Search result compaction: prices survive boilerplate removal and validated entries are never dropped.
+
+Usage:
+    uv run python -m unittest tests/test_search_compaction.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.search_tools.search_compaction import MIN_SNIPPET_CHARS, compact_result, compact_search_results
+
+
+def result(index: int, content: str) -> dict:
+    return {"url": f"https://www.grailed.com/listings/{index}", "title": f"Dior Homme boots {index}", "content": content}
+
+
+class CompactResultTest(unittest.TestCase):
+
+    def test_price_on_a_shipping_line_is_kept(self):
+        cases = {
+            "Great condition, worn twice.\nPrice $450 with free shipping.": "$450",
+            "美品です。\n¥38,000 送料無料": "¥38,000",
+        }
+        for content, price in cases.items():
+            with self.subTest(content=content):
+                compact = compact_result(result(1, content))
+                self.assertEqual(compact["price"], [price])
+                self.assertNotIn(price, compact["snippet"])
+
+
+class CompactSearchResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.results = [result(i, " ".join(f"Detail {i}.{n}: black leather, size 42." for n in range(20)))
+                        for i in range(10)]
+
+    def test_over_budget_results_are_dropped_by_default(self):
+        compacted, report = compact_search_results(self.results, budget_tokens=200)
+        self.assertLess(len(compacted), len(self.results))
+        self.assertEqual(report["snippet_chars"], MIN_SNIPPET_CHARS)
+
+    def test_without_drop_results_every_entry_is_kept_over_budget(self):
+        compacted, report = compact_search_results(self.results, budget_tokens=200, drop_results=False)
+        self.assertEqual([c["url"] for c in compacted], [r["url"] for r in self.results])
+        self.assertEqual(report["results_after"], len(self.results))
+        self.assertGreater(report["tokens_after"], 200)
+        self.assertEqual(report["snippet_chars"], MIN_SNIPPET_CHARS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+URL liveness checks against a local http.server.
+
+The server is also the HTTP proxy of the client under test, so marketplace URLs such as
+http://www.grailed.com/listings/111 are answered locally by host and path.
+
+Usage:
+    uv run python -m unittest tests/test_url_liveness.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import urlparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.search_tools import search_cache as search_cache_module
+from src.tools.search_tools import url_liveness
+from src.tools.search_tools.http_client import PooledHttpClient
+from src.tools.search_tools.search_cache import SearchCache
+
+# Seconds the slow and hanging pages take to answer.
+SLOW_S = 0.2
+HANG_S = 1.0
+
+# (host, path) -> (status, headers, body). Paths not listed get 404.
+PAGES = {
+    ("www.grailed.com", "/listings/111"): (200, {}, '<script>{"id": 111, "sold": false}</script><nav>Sold</nav>'),
+    ("www.grailed.com", "/listings/222"): (200, {}, '<script>{"id": 222, "sold": true}</script>'),
+    ("www.grailed.com", "/listings/333"): (302, {"Location": "http://www.grailed.com/"}, ""),
+    ("www.grailed.com", "/listings/444"): (200, {}, '<nav><a href="/sold">Sold out</a></nav><h1>Dior Homme boots</h1>'),
+    ("www.grailed.com", "/listings/555"): (410, {}, ""),
+    ("www.grailed.com", "/"): (200, {}, "<h1>Grailed</h1>"),
+    ("www.ebay.com", "/itm/123456789"): (200, {}, "<div>This listing has ended.</div>"),
+    ("jp.mercari.com", "/item/m123"): (200, {}, '<script>{"status":"on_sale"}</script><div>売り切れの商品</div>'),
+    ("shop.example.com", "/alive"): (200, {}, "<h1>Boots</h1>"),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+    in_flight = {}
+    max_in_flight = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, method: str):
+        url = urlparse(self.path)
+        host = url.hostname or self.headers.get("Host", "")
+        with self.lock:
+            self.requests.append((method, host, url.path))
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+        try:
+            if url.path.startswith("/slow"):
+                time.sleep(SLOW_S)
+                status, headers, body = 200, {}, "slow"
+            elif url.path.startswith("/hang"):
+                time.sleep(HANG_S)
+                status, headers, body = 200, {}, "hang"
+            elif url.path == "/no-head":
+                status, headers, body = (405, {}, "") if method == "HEAD" else (200, {}, "<h1>Boots</h1>")
+            else:
+                status, headers, body = PAGES.get((host, url.path), (404, {}, "not found"))
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if method == "GET":
+                self.wfile.write(payload)
+        finally:
+            with self.lock:
+                self.in_flight[host] -= 1
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_HEAD(self):
+        self._respond("HEAD")
+
+
+class UrlLivenessTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.client = PooledHttpClient(
+            "liveness-test",
+            per_host_limit=url_liveness.LIVENESS_PER_DOMAIN,
+            max_retries=0,
+            connect_timeout=url_liveness.LIVENESS_TIMEOUT,
+            read_timeout=url_liveness.LIVENESS_TIMEOUT,
+            proxy=f"http://127.0.0.1:{cls.server.server_port}",
+            follow_redirects=True,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = SearchCache(os.path.join(self.tmp.name, "search_cache.sqlite"), 1024 * 1024)
+        patches = [
+            mock.patch.object(url_liveness, "http_client", self.client),
+            mock.patch.object(url_liveness, "search_cache", self.cache),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        with Handler.lock:
+            Handler.requests.clear()
+            Handler.in_flight.clear()
+            Handler.max_in_flight.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_404_and_410_are_removed(self):
+        for url in ("http://shop.example.com/missing", "http://www.grailed.com/listings/555"):
+            with self.subTest(url=url):
+                result = url_liveness.check_url(url)
+                self.assertEqual(result["status"], "removed")
+                self.assertIn(result["http_status"], (404, 410))
+
+    def test_redirect_to_home_is_removed(self):
+        result = url_liveness.check_url("http://www.grailed.com/listings/333")
+        self.assertEqual(result["status"], "removed")
+        self.assertEqual(result["final_url"], "http://www.grailed.com/")
+
+    def test_sold_markers_are_sold(self):
+        for url in ("http://www.grailed.com/listings/222", "http://www.ebay.com/itm/123456789"):
+            with self.subTest(url=url):
+                self.assertEqual(url_liveness.check_url(url)["status"], "sold")
+
+    def test_navigation_sold_words_are_not_sold(self):
+        self.assertEqual(url_liveness.check_url("http://www.grailed.com/listings/111")["status"], "alive")
+        for url in ("http://www.grailed.com/listings/444", "http://jp.mercari.com/item/m123"):
+            with self.subTest(url=url):
+                self.assertEqual(url_liveness.check_url(url)["status"], "unknown")
+
+    def test_head_405_falls_back_to_get(self):
+        result = url_liveness.check_url("http://shop.example.com/no-head")
+        self.assertEqual(result["status"], "alive")
+        self.assertEqual(result["http_status"], 200)
+        self.assertEqual([r[0] for r in Handler.requests], ["HEAD", "GET"])
+
+    def test_marketplace_pages_get_once(self):
+        url_liveness.check_url("http://www.grailed.com/listings/111")
+        self.assertEqual(Handler.requests, [("GET", "www.grailed.com", "/listings/111")])
+
+    def test_per_domain_concurrency_cap(self):
+        urls = [f"http://{host}/slow/{i}" for host in ("a.example.com", "b.example.com") for i in range(6)]
+        results = url_liveness.check_urls(urls, deadline=10)
+        self.assertTrue(all(r["status"] == "alive" for r in results.values()))
+        self.assertLessEqual(max(Handler.max_in_flight.values()), url_liveness.LIVENESS_PER_DOMAIN)
+        self.assertEqual(set(Handler.max_in_flight), {"a.example.com", "b.example.com"})
+
+    def test_deadline_reports_unknown(self):
+        results = url_liveness.check_urls(["http://shop.example.com/hang", "http://shop.example.com/alive"], deadline=0.5)
+        self.assertEqual(results["http://shop.example.com/hang"]["status"], "unknown")
+        self.assertEqual(results["http://shop.example.com/hang"]["reason"], "Liveness deadline reached")
+        self.assertEqual(results["http://shop.example.com/alive"]["status"], "alive")
+        time.sleep(HANG_S)
+
+    def test_cache_reused_within_ttl(self):
+        url = "http://shop.example.com/alive"
+        first = url_liveness.cached_check_url(url)
+        second = url_liveness.cached_check_url(url)
+        self.assertEqual(first, second)
+        self.assertEqual(len(Handler.requests), 1)
+
+        with mock.patch.dict(search_cache_module.SEARCH_CACHE_TTLS, {"liveness": 0}):
+            time.sleep(0.01)
+            url_liveness.cached_check_url(url)
+        self.assertEqual(len(Handler.requests), 2)
+
+    def test_unknown_results_are_not_cached(self):
+        url = "http://www.grailed.com/listings/444"
+        url_liveness.cached_check_url(url)
+        url_liveness.cached_check_url(url)
+        self.assertEqual(len(Handler.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
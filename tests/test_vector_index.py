@@ -0,0 +1,47 @@
+"""
+Local vector index loading: an index wider than the query embeddings is refused at load.
+
+Usage:
+    uv run python -m unittest tests/test_vector_index.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tools.archive_tools import vector_index
+from src.tools.archive_tools.vector_index import LocalVectorIndex
+
+
+class GetLocalIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        vectors = np.random.default_rng(0).normal(size=(4, 64))
+        LocalVectorIndex.build(tmp.name, [f"look{i}_1.jpg" for i in range(4)], vectors, [{}] * 4, dimension=32)
+        for patch in (mock.patch.object(vector_index, "VECTOR_INDEX_PATH", tmp.name),
+                      mock.patch.object(vector_index, "_local_index", None),
+                      mock.patch.object(vector_index, "_local_index_loaded", False)):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.vectors = vectors
+
+    def test_index_wider_than_embeddings_is_refused(self):
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(vector_index.get_local_index(16))
+
+    def test_truncated_index_answers_full_dimension_queries(self):
+        index = vector_index.get_local_index(64)
+        self.assertEqual(index.dimension, 32)
+        self.assertEqual(index.query(self.vectors[2], top_k=1)[0]["key"], "look2_1.jpg")
+
+
+if __name__ == "__main__":
+    unittest.main()